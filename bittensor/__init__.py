@@ -104,9 +104,15 @@ from bittensor._wallet.wallet_impl import Wallet as Wallet
 from bittensor._keyfile.keyfile_impl import Keyfile as Keyfile
 from bittensor._receptor.receptor_impl import Receptor as Receptor
 from bittensor._endpoint.endpoint_impl import Endpoint as Endpoint
+from bittensor._endpoint.endpoint_columns_impl import EndpointColumns as EndpointColumns
 from bittensor._dendrite.dendrite_impl import Dendrite as Dendrite
 from bittensor._metagraph.metagraph_impl import Metagraph as Metagraph
+from bittensor._metagraph.changes_impl import MetagraphChanges as MetagraphChanges
 from bittensor._subtensor.subtensor_impl import Subtensor as Subtensor
+from bittensor._subtensor.query_cache_impl import QueryCache as QueryCache
+from bittensor._subtensor.chain_clock_impl import ChainClock as ChainClock
+from bittensor._subtensor.connection_pool_impl import SubstratePool as SubstratePool
+from bittensor._subtensor.subtensor_mock_impl import MockSubtensor as MockSubtensor
 from bittensor._serializer.serializer_impl import Serializer as Serializer
 from bittensor._dataset.dataset_impl import Dataset as Dataset
 from bittensor._receptor.receptor_pool_impl import ReceptorPool as ReceptorPool
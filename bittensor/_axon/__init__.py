@@ -22,8 +22,11 @@ import os
 import copy
 import inspect
 import time
+import multiprocessing
+import threading
 from concurrent import futures
-from typing import List, Callable
+from types import SimpleNamespace
+from typing import List, Callable, Tuple
 from bittensor._threadpool import prioritythreadpool
 
 import torch
@@ -31,7 +34,10 @@ import grpc
 from substrateinterface import Keypair
 
 import bittensor
+import bittensor.utils.stats as stat_utils
 from . import axon_impl
+from . import frontend_impl
+from . import rate_limiter_impl
 
 class axon:
     """ Create and init Axon, whcih services Forward and Backward requests from other neurons.
@@ -57,6 +63,11 @@ class axon:
             priority: 'Callable' = None,
             forward_timeout: int = None,
             backward_timeout: int = None,
+            stats_port: int = None,
+            stats_ip: str = None,
+            frontends: int = None,
+            rate_limit: bool = None,
+            stake: 'Callable' = None,
         ) -> 'bittensor.Axon':
         r""" Creates a new bittensor.Axon object from passed arguments.
             Args:
@@ -96,6 +107,17 @@ class axon:
                     timeout on the forward requests. 
                 backward_timeout (:type:`int`, `optional`):
                     timeout on the backward requests.              
+                stats_port (:type:`int`, `optional`):
+                    If set, serves the axon latency histograms as json over http on this port.
+                stats_ip (:type:`str`, `optional`):
+                    Address the latency histograms are served on, 127.0.0.1 by default.
+                frontends (:type:`int`, `optional`):
+                    If greater than 0, requests are served by this many frontend processes sharing the axon port,
+                    which hand the decoded tensors to this process through shared memory.
+                rate_limit (:type:`bool`, `optional`):
+                    If True, limits the request rate of each pubkey with token buckets sized by stake tier.
+                stake (:obj:`callable`, `optional`):
+                    function from pubkey to stake, used to place callers in rate limit tiers.
         """   
 
         if config == None: 
@@ -107,14 +129,30 @@ class axon:
         config.axon.maximum_concurrent_rpcs = maximum_concurrent_rpcs if maximum_concurrent_rpcs != None else config.axon.maximum_concurrent_rpcs
         config.axon.forward_timeout = forward_timeout if forward_timeout != None else config.axon.forward_timeout
         config.axon.backward_timeout = backward_timeout if backward_timeout != None else config.axon.backward_timeout
+        config.axon.stats_port = stats_port if stats_port != None else config.axon.stats_port
+        config.axon.stats_ip = stats_ip if stats_ip != None else config.axon.stats_ip
+        config.axon.frontends = frontends if frontends != None else config.axon.frontends
+        config.axon.rate_limit.enabled = rate_limit if rate_limit != None else config.axon.rate_limit.enabled
         axon.check_config( config )
         if wallet == None:
             wallet = bittensor.wallet( config = config )
         if thread_pool == None:
             thread_pool = futures.ThreadPoolExecutor( max_workers = config.axon.max_workers )
-        if server == None:
+        if config.axon.rate_limit.enabled:
+            rate_limiter = rate_limiter_impl.RateLimiter.from_config( config, stake = stake )
+        else:
+            rate_limiter = None
+        if config.axon.frontends > 0:
+            # The frontend processes bind the port, this process only serves their requests.
+            frontend_pool = frontend_impl.FrontendPool( config = config, wallet = wallet, frontends = config.axon.frontends, blacklist = blacklist, rate_limiter = rate_limiter )
+            server = None
+        else:
+            frontend_pool = None
+        interceptor = None
+        if server == None and frontend_pool == None:
+            interceptor = AuthInterceptor( blacklist = blacklist, rate_limiter = rate_limiter, verifier_workers = config.axon.verifier_workers )
             server = grpc.server( thread_pool,
-                                  interceptors=(AuthInterceptor(blacklist=blacklist),),
+                                  interceptors=(interceptor,),
                                   maximum_concurrent_rpcs = config.axon.maximum_concurrent_rpcs,
                                   options = [('grpc.keepalive_time_ms', 100000),
                                              ('grpc.keepalive_timeout_ms', 500000)]
@@ -139,10 +177,20 @@ class axon:
             priority_threadpool = priority_threadpool,
             forward_timeout = config.axon.forward_timeout,
             backward_timeout = config.axon.backward_timeout,
+            stats_port = config.axon.stats_port,
+            stats_ip = config.axon.stats_ip,
+            request_limits = {
+                bittensor.proto.Modality.TEXT: config.axon.text,
+                bittensor.proto.Modality.IMAGE: config.axon.image,
+                bittensor.proto.Modality.TENSOR: config.axon.tensor,
+            },
+            frontend_pool = frontend_pool,
+            interceptor = interceptor,
         )
-        bittensor.grpc.add_BittensorServicer_to_server( axon_instance, server )
-        full_address = str( config.axon.ip ) + ":" + str( config.axon.port )
-        server.add_insecure_port( full_address )
+        if server != None:
+            bittensor.grpc.add_BittensorServicer_to_server( axon_instance, server )
+            full_address = str( config.axon.ip ) + ":" + str( config.axon.port )
+            server.add_insecure_port( full_address )
         return axon_instance 
 
     @classmethod   
@@ -172,10 +220,45 @@ class axon:
                 help='Number of seconds to wait for backward axon request', default=20)
             parser.add_argument('--axon.forward_timeout', type=int,
                 help='Number of seconds to wait for forward axon request', default=10)
+            parser.add_argument('--axon.stats_port', type=int,
+                help='''If set, serves the axon latency histograms as json over http on this port''', default = bittensor.defaults.axon.stats_port)
+            parser.add_argument('--axon.stats_ip', type=str,
+                help='''Address the axon latency histograms are served on, set to 0.0.0.0 to expose them on every interface''', default = bittensor.defaults.axon.stats_ip)
+            parser.add_argument('--axon.frontends', type=int,
+                help='''If greater than 0, serves requests from this many frontend processes sharing the axon port through SO_REUSEPORT''', default = bittensor.defaults.axon.frontends)
+            parser.add_argument('--axon.shm_slots', type=int,
+                help='''Number of shared memory slots used to pass tensors between the frontend processes and the model''', default = bittensor.defaults.axon.shm_slots)
+            parser.add_argument('--axon.shm_slot_bytes', type=int,
+                help='''Size in bytes of each shared memory slot, larger tensors are pickled instead''', default = bittensor.defaults.axon.shm_slot_bytes)
+            for modality in [ 'text', 'image', 'tensor' ]:
+                parser.add_argument('--axon.{}.max_batch_size'.format(modality), type=int,
+                    help='''Maximum batch size of {} requests, larger requests are rejected before deserialization'''.format(modality), default = bittensor.defaults.axon[modality].max_batch_size)
+                parser.add_argument('--axon.{}.max_sequence_length'.format(modality), type=int,
+                    help='''Maximum sequence length of {} requests, longer requests are rejected before deserialization'''.format(modality), default = bittensor.defaults.axon[modality].max_sequence_length)
+                parser.add_argument('--axon.{}.max_bytes'.format(modality), type=int,
+                    help='''Maximum serialized size in bytes of {} request tensors, larger requests are rejected before deserialization'''.format(modality), default = bittensor.defaults.axon[modality].max_bytes)
+            parser.add_argument('--axon.verifier_workers', type=int,
+                help='''If greater than 0, request signatures are verified in this many processes instead of the grpc threads''', default = bittensor.defaults.axon.verifier_workers)
+            parser.add_argument('--axon.rate_limit.enabled', action='store_true',
+                help='''If set, limits the request rate of each pubkey with token buckets whose rate is set by the caller's stake tier''', default = bittensor.defaults.axon.rate_limit.enabled)
+            parser.add_argument('--axon.rate_limit.stake_tiers', type=float, nargs='+',
+                help='''Ascending minimum stake of each rate limit tier''', default = bittensor.defaults.axon.rate_limit.stake_tiers)
+            parser.add_argument('--axon.rate_limit.forward_rates', type=float, nargs='+',
+                help='''Forward requests per second allowed from a pubkey in each stake tier''', default = bittensor.defaults.axon.rate_limit.forward_rates)
+            parser.add_argument('--axon.rate_limit.backward_rates', type=float, nargs='+',
+                help='''Backward requests per second allowed from a pubkey in each stake tier''', default = bittensor.defaults.axon.rate_limit.backward_rates)
+            parser.add_argument('--axon.rate_limit.burst_seconds', type=float,
+                help='''Seconds of requests at its tier rate a pubkey can send in a burst''', default = bittensor.defaults.axon.rate_limit.burst_seconds)
+            parser.add_argument('--axon.rate_limit.idle_seconds', type=float,
+                help='''Seconds after which the rate limit state of an idle pubkey is dropped''', default = bittensor.defaults.axon.rate_limit.idle_seconds)
+            parser.add_argument('--axon.rate_limit.max_pubkeys', type=int,
+                help='''Maximum number of pubkeys whose rate limit state is held''', default = bittensor.defaults.axon.rate_limit.max_pubkeys)
             parser.add_argument('--axon.priority.max_workers', type = int,
                 help='''maximum number of threads in thread pool''', default = bittensor.defaults.axon.priority.max_workers)
             parser.add_argument('--axon.priority.maxsize', type=int, 
                 help='''maximum size of tasks in priority queue''', default = bittensor.defaults.axon.priority.maxsize)
+            parser.add_argument('--axon.priority.fair_share', action='store_true',
+                help='''If set, schedules requests by weighted fair queuing across pubkeys (weights from the priority function) instead of strict priority''', default = bittensor.defaults.axon.priority.fair_share)
         except argparse.ArgumentError:
             # re-parsing arguments.
             pass
@@ -191,16 +274,53 @@ class axon:
         defaults.axon.ip = os.getenv('BT_AXON_IP') if os.getenv('BT_AXON_IP') != None else '[::]'
         defaults.axon.max_workers = os.getenv('BT_AXON_MAX_WORERS') if os.getenv('BT_AXON_MAX_WORERS') != None else 10
         defaults.axon.maximum_concurrent_rpcs = os.getenv('BT_AXON_MAXIMUM_CONCURRENT_RPCS') if os.getenv('BT_AXON_MAXIMUM_CONCURRENT_RPCS') != None else 400
+        defaults.axon.stats_port = int(os.getenv('BT_AXON_STATS_PORT')) if os.getenv('BT_AXON_STATS_PORT') != None else None
+        defaults.axon.stats_ip = os.getenv('BT_AXON_STATS_IP') if os.getenv('BT_AXON_STATS_IP') != None else '127.0.0.1'
+        defaults.axon.frontends = int(os.getenv('BT_AXON_FRONTENDS')) if os.getenv('BT_AXON_FRONTENDS') != None else 0
+        defaults.axon.shm_slots = int(os.getenv('BT_AXON_SHM_SLOTS')) if os.getenv('BT_AXON_SHM_SLOTS') != None else 32
+        defaults.axon.shm_slot_bytes = int(os.getenv('BT_AXON_SHM_SLOT_BYTES')) if os.getenv('BT_AXON_SHM_SLOT_BYTES') != None else 8 * 1024 * 1024
+
+        for modality in [ 'text', 'image', 'tensor' ]:
+            prefix = 'BT_AXON_{}_'.format( modality.upper() )
+            defaults.axon[modality] = bittensor.Config()
+            defaults.axon[modality].max_batch_size = int(os.getenv(prefix + 'MAX_BATCH_SIZE')) if os.getenv(prefix + 'MAX_BATCH_SIZE') != None else 4096
+            defaults.axon[modality].max_sequence_length = int(os.getenv(prefix + 'MAX_SEQUENCE_LENGTH')) if os.getenv(prefix + 'MAX_SEQUENCE_LENGTH') != None else 4096
+            defaults.axon[modality].max_bytes = int(os.getenv(prefix + 'MAX_BYTES')) if os.getenv(prefix + 'MAX_BYTES') != None else 256 * 1024 * 1024
         
+        defaults.axon.verifier_workers = int(os.getenv('BT_AXON_VERIFIER_WORKERS')) if os.getenv('BT_AXON_VERIFIER_WORKERS') != None else 0
+
+        defaults.axon.rate_limit = bittensor.Config()
+        defaults.axon.rate_limit.enabled = os.getenv('BT_AXON_RATE_LIMIT_ENABLED') == 'True' if os.getenv('BT_AXON_RATE_LIMIT_ENABLED') != None else False
+        defaults.axon.rate_limit.stake_tiers = [ float(x) for x in os.getenv('BT_AXON_RATE_LIMIT_STAKE_TIERS').split(',') ] if os.getenv('BT_AXON_RATE_LIMIT_STAKE_TIERS') != None else [ 0, 10, 100, 1000 ]
+        defaults.axon.rate_limit.forward_rates = [ float(x) for x in os.getenv('BT_AXON_RATE_LIMIT_FORWARD_RATES').split(',') ] if os.getenv('BT_AXON_RATE_LIMIT_FORWARD_RATES') != None else [ 0.5, 2, 10, 50 ]
+        defaults.axon.rate_limit.backward_rates = [ float(x) for x in os.getenv('BT_AXON_RATE_LIMIT_BACKWARD_RATES').split(',') ] if os.getenv('BT_AXON_RATE_LIMIT_BACKWARD_RATES') != None else [ 0.1, 0.5, 2, 10 ]
+        defaults.axon.rate_limit.burst_seconds = float(os.getenv('BT_AXON_RATE_LIMIT_BURST_SECONDS')) if os.getenv('BT_AXON_RATE_LIMIT_BURST_SECONDS') != None else 5
+        defaults.axon.rate_limit.idle_seconds = float(os.getenv('BT_AXON_RATE_LIMIT_IDLE_SECONDS')) if os.getenv('BT_AXON_RATE_LIMIT_IDLE_SECONDS') != None else 600
+        defaults.axon.rate_limit.max_pubkeys = int(os.getenv('BT_AXON_RATE_LIMIT_MAX_PUBKEYS')) if os.getenv('BT_AXON_RATE_LIMIT_MAX_PUBKEYS') != None else 10000
+
         defaults.axon.priority = bittensor.Config()
         defaults.axon.priority.max_workers = os.getenv('BT_AXON_PRIORITY_MAX_WORKERS') if os.getenv('BT_AXON_PRIORITY_MAX_WORKERS') != None else 10
         defaults.axon.priority.maxsize = os.getenv('BT_AXON_PRIORITY_MAXSIZE') if os.getenv('BT_AXON_PRIORITY_MAXSIZE') != None else -1
+        defaults.axon.priority.fair_share = os.getenv('BT_AXON_PRIORITY_FAIR_SHARE') == 'True' if os.getenv('BT_AXON_PRIORITY_FAIR_SHARE') != None else False
 
     @classmethod   
     def check_config(cls, config: 'bittensor.Config' ):
         """ Check config for axon port and wallet
         """
         assert config.axon.port > 1024 and config.axon.port < 65535, 'port must be in range [1024, 65535]'
+        for modality in [ 'text', 'image', 'tensor' ]:
+            assert config.axon[modality].max_batch_size > 0, 'axon.{}.max_batch_size must be positive'.format(modality)
+            assert config.axon[modality].max_sequence_length > 0, 'axon.{}.max_sequence_length must be positive'.format(modality)
+            assert config.axon[modality].max_bytes > 0, 'axon.{}.max_bytes must be positive'.format(modality)
+        assert config.axon.frontends >= 0, 'axon.frontends must be non negative'
+        assert config.axon.verifier_workers >= 0, 'axon.verifier_workers must be non negative'
+        assert config.axon.shm_slots > 0 and config.axon.shm_slot_bytes > 0, 'axon.shm_slots and axon.shm_slot_bytes must be positive'
+        rate_limit = config.axon.rate_limit
+        assert len(rate_limit.stake_tiers) == len(rate_limit.forward_rates) == len(rate_limit.backward_rates), 'axon.rate_limit.stake_tiers, forward_rates and backward_rates must have the same length'
+        assert list(rate_limit.stake_tiers) == sorted(rate_limit.stake_tiers), 'axon.rate_limit.stake_tiers must be ascending'
+        assert min(rate_limit.forward_rates + rate_limit.backward_rates) > 0, 'axon.rate_limit rates must be positive'
+        assert rate_limit.burst_seconds > 0 and rate_limit.idle_seconds > 0 and rate_limit.max_pubkeys > 0, 'axon.rate_limit.burst_seconds, idle_seconds and max_pubkeys must be positive'
+        assert config.axon.stats_port == None or (config.axon.stats_port >= 0 and config.axon.stats_port < 65535), 'stats_port must be in range [0, 65535]'
         bittensor.wallet.check_config( config )
 
     @staticmethod
@@ -254,31 +374,87 @@ class axon:
             sample_input = torch.rand(1,1,1)
             forward_callback(sample_input)
 
+# Keypairs decoded from ss58 addresses in this process, bounded by evicting the oldest.
+_keypairs = {}
+MAX_CACHED_KEYPAIRS = 10000
+
+def verify_signature( pubkey: str, data: str, signature: str ) -> Tuple[bool, bool]:
+    r""" Verifies a signature of data by the ss58 pubkey, run by the interceptor or in its verifier processes.
+        Returns:
+            verification (:type:`bool`):
+                True if the signature is valid.
+            cache_hit (:type:`bool`):
+                True if the keypair of the pubkey was already decoded.
+    """
+    keypair = _keypairs.get( pubkey )
+    cache_hit = keypair != None
+    if not cache_hit:
+        keypair = Keypair( ss58_address = pubkey )
+        if len( _keypairs ) >= MAX_CACHED_KEYPAIRS:
+            try:
+                _keypairs.pop( next( iter( _keypairs ) ), None )
+            except ( StopIteration, RuntimeError ):
+                pass
+        _keypairs[ pubkey ] = keypair
+    return keypair.verify( data, signature ), cache_hit
+
+# Metadata keys sent by the receptor, in the order the checks index them.
+METADATA_KEYS = ( 'rpc-auth-header', 'bittensor-signature', 'bittensor-version', 'request_type' )
+
+def order_metadata( metadata ) -> list:
+    r""" Returns the request metadata with the receptor keys first, in the order they were sent. grpc may add
+        its own entries, e.g. the user-agent, ahead of them.
+    """
+    metadata = list( metadata )
+    ordered = [ datum for key in METADATA_KEYS for datum in metadata if datum.key == key ]
+    return ordered + [ datum for datum in metadata if datum.key not in METADATA_KEYS ]
+
 class AuthInterceptor(grpc.ServerInterceptor):
     """ Creates a new server interceptor that authenticates incoming messages from passed arguments.
     """
-    def __init__(self, key:str = 'Bittensor',blacklist:List = []):
+    def __init__(self, key:str = 'Bittensor',blacklist:List = [], rate_limiter: 'rate_limiter_impl.RateLimiter' = None, verifier_workers: int = 0):
         r""" Creates a new server interceptor that authenticates incoming messages from passed arguments.
         Args:
             key (str, `optional`):
                  key for authentication header in the metadata (default= Bittensor)
             black_list (Fucntion, `optional`): 
                 black list function that prevents certain pubkeys from sending messages
+            rate_limiter (:obj:`RateLimiter`, `optional`):
+                per pubkey rate limiter, callers over their rate are told to back off with RESOURCE_EXHAUSTED.
+            verifier_workers (:type:`int`, `optional`):
+                if greater than 0, signatures are verified in a pool of this many processes, off the grpc threads.
         """
         super().__init__()
         self._valid_metadata = ('rpc-auth-header', key)
         self.nounce_dic = {}
         self.message = 'Invalid key'
         self.blacklist = blacklist
+        self.rate_limiter = rate_limiter
+        self.verifier_workers = verifier_workers
+        self.verifier_pool = None
+        self.start()
+        # Verify runs on concurrent grpc threads.
+        self.stats_lock = threading.Lock()
+        self.stats = SimpleNamespace(
+            n_verified = 0,
+            n_failed = 0,
+            cache_hits = 0,
+            cache_misses = 0,
+            verify_time = stat_utils.LatencyHistogram(),
+        )
         def deny(_, context):
             context.abort(grpc.StatusCode.UNAUTHENTICATED, self.message)
 
+        def backoff(_, context):
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, 'Rate limited')
+
         self._deny = grpc.unary_unary_rpc_method_handler(deny)
+        self._backoff = grpc.unary_unary_rpc_method_handler(backoff)
 
     def intercept_service(self, continuation, handler_call_details):
         r""" Authentication between bittensor nodes. Intercepts messages and checks them
         """
-        meta = handler_call_details.invocation_metadata
+        meta = order_metadata( handler_call_details.invocation_metadata )
 
         try: 
             #version checking
@@ -290,6 +466,10 @@ class AuthInterceptor(grpc.ServerInterceptor):
             #blacklist checking
             self.black_list_checking(meta)
 
+            #rate limit checking, before the request is deserialized
+            if not self.rate_limit_checking(meta):
+                return self._backoff
+
             return continuation(handler_call_details)
 
         except Exception as e:
@@ -305,7 +485,6 @@ class AuthInterceptor(grpc.ServerInterceptor):
         pubkey = variable_length_messages[1]
         message = variable_length_messages[2]
         unique_receptor_uid = variable_length_messages[3]
-        _keypair = Keypair(ss58_address=pubkey)
 
         # Unique key that specifies the endpoint.
         endpoint_key = str(pubkey) + str(unique_receptor_uid)
@@ -317,15 +496,60 @@ class AuthInterceptor(grpc.ServerInterceptor):
                 self.nounce_dic[ endpoint_key ] = nounce
 
                 #decrypting the message and verify that message is correct
-                verification = _keypair.verify( str(nounce) + str(pubkey) + str(unique_receptor_uid), message)
+                verification = self.verify( pubkey, str(nounce) + str(pubkey) + str(unique_receptor_uid), message)
             else:
                 verification = False
         else:
             self.nounce_dic[ endpoint_key ] = nounce
-            verification = _keypair.verify( str( nounce ) + str(pubkey) + str(unique_receptor_uid), message)
+            verification = self.verify( pubkey, str( nounce ) + str(pubkey) + str(unique_receptor_uid), message)
 
         return verification
 
+    def verify(self, pubkey: str, data: str, signature: str) -> bool:
+        r""" Verifies the signature with the cached keypair of the pubkey, in the verifier pool if there is one.
+        """
+        start_time = time.time()
+        if self.verifier_pool != None:
+            verification, cache_hit = self.verifier_pool.submit( verify_signature, pubkey, data, signature ).result()
+        else:
+            verification, cache_hit = verify_signature( pubkey, data, signature )
+        self.stats.verify_time.observe( time.time() - start_time )
+        with self.stats_lock:
+            if cache_hit:
+                self.stats.cache_hits += 1
+            else:
+                self.stats.cache_misses += 1
+            if verification:
+                self.stats.n_verified += 1
+            else:
+                self.stats.n_failed += 1
+        return verification
+
+    def verification_stats(self) -> dict:
+        r""" Returns the signature verification counts, keypair cache hits and verify time histogram.
+        """
+        with self.stats_lock:
+            return {
+                'n_verified': self.stats.n_verified,
+                'n_failed': self.stats.n_failed,
+                'cache_hits': self.stats.cache_hits,
+                'cache_misses': self.stats.cache_misses,
+                'verify_time': self.stats.verify_time.to_dict(),
+            }
+
+    def start(self):
+        r""" Creates the verifier pool if there is none, e.g. after stop().
+        """
+        if self.verifier_workers > 0 and self.verifier_pool == None:
+            self.verifier_pool = futures.ProcessPoolExecutor( max_workers = self.verifier_workers, mp_context = multiprocessing.get_context('spawn') )
+
+    def stop(self):
+        r""" Shuts down the verifier pool, start() creates a new one.
+        """
+        if self.verifier_pool != None:
+            self.verifier_pool.shutdown( wait = False )
+            self.verifier_pool = None
+
     def signature_checking(self,meta):
         r""" Calls the vertification of the signature and raises an error if failed
         """
@@ -342,6 +566,14 @@ class AuthInterceptor(grpc.ServerInterceptor):
         else:
             raise Exception('Incorrect Metadata format')
 
+    def rate_limit_checking(self,meta) -> bool:
+        r""" Returns False if the caller is over its rate limit for this request type.
+        """
+        if self.rate_limiter == None:
+            return True
+        pubkey = meta[1].value.split('bitxx')[1]
+        return self.rate_limiter.allow( pubkey, int(meta[3].value) )
+
     def black_list_checking(self,meta):
         r"""Tries to call to blacklist function in the miner and checks if it should blacklist the pubkey 
         """
@@ -17,10 +17,11 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
 # DEALINGS IN THE SOFTWARE.
 
-import sys
+import json
+import threading
 import time as clock
 from types import SimpleNamespace
-from typing import List, Tuple, Callable
+from typing import List, Optional, Tuple, Callable
 
 import torch
 import grpc
@@ -29,12 +30,31 @@ import pandas
 from loguru import logger
 import torch.nn.functional as F
 import concurrent
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 import bittensor
 import bittensor.utils.stats as stat_utils
 
 logger = logger.opt(colors=True)
 
+# Request stages timed by the axon latency histograms.
+LATENCY_STAGES = [ 'deserialize', 'queue', 'compute', 'serialize', 'total' ]
+
+# Rank of the forward inputs for each modality.
+MODALITY_RANKS = {
+    bittensor.proto.Modality.TEXT: 2,
+    bittensor.proto.Modality.IMAGE: 5,
+    bittensor.proto.Modality.TENSOR: 3,
+}
+
+# Bytes per element of the deserializable dtypes.
+DTYPE_BYTES = {
+    bittensor.proto.DataType.FLOAT32: 4,
+    bittensor.proto.DataType.FLOAT64: 8,
+    bittensor.proto.DataType.INT32: 4,
+    bittensor.proto.DataType.INT64: 8,
+}
+
 class Axon( bittensor.grpc.BittensorServicer ):
     r""" Services Forward and Backward requests from other neurons.
     """
@@ -50,6 +70,11 @@ class Axon( bittensor.grpc.BittensorServicer ):
         priority_threadpool: 'bittensor.prioritythreadpool' = None,
         forward_timeout: int = None,
         backward_timeout: int = None,
+        stats_port: int = None,
+        stats_ip: str = '127.0.0.1',
+        request_limits: dict = None,
+        frontend_pool: 'bittensor._axon.frontend_impl.FrontendPool' = None,
+        interceptor: 'bittensor._axon.AuthInterceptor' = None,
     ):
         r""" Initializes a new Axon tensor processing endpoint.
             
@@ -68,6 +93,16 @@ class Axon( bittensor.grpc.BittensorServicer ):
                     function to assign priority on requests.
                 priority_threadpool (:obj:`bittensor.prioritythreadpool`, `optional`):
                     bittensor priority_threadpool.                
+                stats_port (:type:`int`, `optional`):
+                    if set, latency histograms are served as json over http on this port.
+                stats_ip (:type:`str`, `optional`):
+                    address the latency histograms are served on, loopback only by default.
+                request_limits (:obj:`dict`, `optional`):
+                    maps each modality to its max_batch_size, max_sequence_length and max_bytes request limits.
+                frontend_pool (:obj:`bittensor._axon.frontend_impl.FrontendPool`, `optional`):
+                    if set, requests are served by these frontend processes instead of the grpc server.
+                interceptor (:obj:`bittensor._axon.AuthInterceptor`, `optional`):
+                    authentication interceptor of the grpc server, whose verification stats are reported.
         """
         self.ip = ip
         self.port = port
@@ -77,6 +112,7 @@ class Axon( bittensor.grpc.BittensorServicer ):
         self.backward_callback = backwards
         self.forward_timeout = forward_timeout
         self.backward_timeout = backward_timeout
+        self.request_limits = request_limits if request_limits != None else {}
         self.modality = self.find_modality()
         self.stats = self._init_stats()
         self.started = None
@@ -85,6 +121,17 @@ class Axon( bittensor.grpc.BittensorServicer ):
         self.priority = priority 
         self.priority_threadpool= priority_threadpool
 
+        # -- Stats endpoint
+        self.stats_port = stats_port
+        self.stats_ip = stats_ip
+        self.stats_server = None
+
+        # -- Frontend processes
+        self.frontend_pool = frontend_pool
+
+        # -- Authentication
+        self.interceptor = interceptor
+
     def __str__(self) -> str:
         return "Axon({}, {}, {}, {})".format( self.ip, self.port, self.wallet.hotkey.ss58_address, "started" if self.started else "stopped")
 
@@ -152,7 +199,8 @@ class Axon( bittensor.grpc.BittensorServicer ):
             self, 
             public_key: str, 
             inputs_x: torch.Tensor, 
-            modality: bittensor.proto.Modality
+            modality: bittensor.proto.Modality,
+            timings: dict = None,
         ) -> Tuple[ torch.FloatTensor, int, str ]:
         r""" Calls the forward callback served by the nucleus.
             
@@ -163,6 +211,8 @@ class Axon( bittensor.grpc.BittensorServicer ):
                     torch inputs to be forward processed.
                 modality ( bittensor.proto.Modality, `required`):
                     modality of inputs.
+                timings (:obj:`dict`, `optional`):
+                    if passed, filled with the queue and compute durations of the call.
             
             Returns:
                 response (:obj:`torch.FloatTensor, `required`): 
@@ -180,20 +230,26 @@ class Axon( bittensor.grpc.BittensorServicer ):
             return None, bittensor.proto.ReturnCode.NotImplemented, message
         
         # Make forward call.
+        forward_callback = self.forward_callback[modality]
+        if timings != None:
+            forward_callback = Axon._timed_callback( forward_callback, timings )
         try:
             if self.priority != None:
                 priority = self.priority(public_key,inputs_x=inputs_x, request_type = bittensor.proto.RequestType.FORWARD)
-                future = self.priority_threadpool.submit(self.forward_callback[modality],inputs_x=inputs_x,priority=priority)
+                deadline = clock.time() + self.forward_timeout if self.forward_timeout != None else None
+                future = self.priority_threadpool.submit(forward_callback,inputs_x=inputs_x,priority=priority,pubkey=public_key,deadline=deadline,queue_class=self._queue_class(public_key))
                 
                 try:
                     response_tensor = future.result(timeout= self.forward_timeout)
                 except concurrent.futures.TimeoutError :
+                    # Drop the queued work, nobody is waiting on it anymore.
+                    future.cancel()
                     raise TimeoutError('TimeOutError')
                 except Exception as e:
                     logger.error('Error found: {}, with message {}'.format(repr(e), e))
 
             else:
-                response_tensor = self.forward_callback[modality]( inputs_x= inputs_x)
+                response_tensor = forward_callback( inputs_x= inputs_x)
 
             message = "Success"
             code = bittensor.proto.ReturnCode.Success
@@ -213,7 +269,8 @@ class Axon( bittensor.grpc.BittensorServicer ):
             public_key: str, 
             inputs_x: torch.Tensor, 
             grads_dy: torch.FloatTensor,
-            modality: bittensor.proto.Modality
+            modality: bittensor.proto.Modality,
+            timings: dict = None,
         ) -> Tuple[ torch.FloatTensor, int, str ]:
         r""" Calls the backward callback.
             
@@ -226,6 +283,8 @@ class Axon( bittensor.grpc.BittensorServicer ):
                     torch gradient inputs to be backward processed with inputs.
                 modality ( bittensor.proto.Modality, `required`):
                     modality of inputs.
+                timings (:obj:`dict`, `optional`):
+                    if passed, filled with the queue and compute durations of the call.
             
             Returns:
                 response (:obj:`torch.FloatTensor, `required`): 
@@ -240,17 +299,22 @@ class Axon( bittensor.grpc.BittensorServicer ):
             message = "Backward callback is not yet subscribed on this axon."
             return None, bittensor.proto.ReturnCode.NotImplemented, message
 
+        backward_callback = self.backward_callback[modality]
+        if timings != None:
+            backward_callback = Axon._timed_callback( backward_callback, timings )
+
         if modality == bittensor.proto.Modality.TEXT:
             if self.priority != None:
                 try:
                     priority = self.priority(public_key,inputs_x=inputs_x, request_type = bittensor.proto.RequestType.BACKWARD)
-                    future = self.priority_threadpool.submit(self.backward_callback[modality],inputs_x=inputs_x,grads_dy=grads_dy,priority=priority)
+                    deadline = clock.time() + self.backward_timeout if self.backward_timeout != None else None
+                    future = self.priority_threadpool.submit(backward_callback,inputs_x=inputs_x,grads_dy=grads_dy,priority=priority,pubkey=public_key,deadline=deadline,queue_class=self._queue_class(public_key))
                 except concurrent.futures.TimeoutError :
                     raise TimeoutError('TimeOutError')
                 except Exception as e:
                     logger.error('Error found: {}, with message {}'.format(repr(e), e))
             else:
-                self.backward_callback[modality](inputs_x, grads_dy)
+                backward_callback(inputs_x, grads_dy)
 
             response_tensor = torch.ones(inputs_x.size())
             message = "Success"
@@ -259,7 +323,7 @@ class Axon( bittensor.grpc.BittensorServicer ):
             
         # Make backward call.
         try:
-            response_tensor = self.backward_callback[modality]( inputs_x, grads_dy)
+            response_tensor = backward_callback( inputs_x, grads_dy)
             message = "Success"
             code = bittensor.proto.ReturnCode.Success
             return response_tensor, code, message
@@ -301,12 +365,21 @@ class Axon( bittensor.grpc.BittensorServicer ):
                 bittensor.logging.rpc_log( axon=True, forward=True, is_response=False, code=code, call_time = call_time, pubkey=request.hotkey, inputs=None, outputs=None, message=message  )
                 return None, code, call_time, message
 
-            # ---- Check deserialization ----
+            # ---- Check request header ----
             tensor_inputs = request.tensors[0]
             modality = tensor_inputs.modality
+            code, message = self._check_request_tensor( tensor_inputs, modality, rank = MODALITY_RANKS.get( modality ) )
+            if code != bittensor.proto.ReturnCode.Success:
+                call_time = clock.time() - start_time
+                bittensor.logging.rpc_log( axon=True, forward=True, is_response=False, code=code, call_time = call_time, pubkey=request.hotkey, inputs=list(tensor_inputs.shape), outputs=None, message=message  )
+                return None, code, call_time, message
+
+            # ---- Check deserialization ----
+            timings = {}
             try:
                 deserializer = bittensor.serializer( serialzer_type = tensor_inputs.serializer )
                 torch_inputs = deserializer.deserialize(tensor_inputs, to_type = bittensor.proto.TensorType.TORCH)
+                timings['deserialize'] = clock.time() - start_time
             except Exception as e:
                 code = bittensor.proto.ReturnCode.RequestDeserializationException
                 message = "Request deserialization exception: {}".format(str(e))
@@ -371,10 +444,13 @@ class Axon( bittensor.grpc.BittensorServicer ):
             outputs, code, message = self._call_forward( 
                 public_key = request.hotkey, 
                 inputs_x = torch_inputs, 
-                modality = modality
+                modality = modality,
+                timings = timings
             )
             if code != bittensor.proto.ReturnCode.Success:
                 call_time = clock.time() - start_time
+                timings['total'] = call_time
+                self._record_latency( bittensor.proto.RequestType.FORWARD, modality, timings )
                 bittensor.logging.rpc_log( axon=True, forward=True, is_response=True, code=code, call_time = call_time, pubkey=request.hotkey, inputs=list(torch_inputs.shape), outputs=None, message=message  )
                 return None, code, call_time, message
 
@@ -388,8 +464,10 @@ class Axon( bittensor.grpc.BittensorServicer ):
 
             # ---- Serialize response ----
             try:
+                serialize_start = clock.time()
                 serializer = bittensor.serializer ( bittensor.proto.Serializer.MSGPACK )
                 outputs_serialized = serializer.serialize ( outputs, modality = bittensor.proto.Modality.TENSOR, from_type = bittensor.proto.TensorType.TORCH )
+                timings['serialize'] = clock.time() - serialize_start
             except Exception as e:
                 code = bittensor.proto.ReturnCode.ResponseDeserializationException
                 message = e
@@ -406,6 +484,8 @@ class Axon( bittensor.grpc.BittensorServicer ):
 
         # ---- Return successful response ----
         call_time = clock.time() - start_time
+        timings['total'] = call_time
+        self._record_latency( bittensor.proto.RequestType.FORWARD, modality, timings )
         bittensor.logging.rpc_log( axon=True, forward=True, is_response=True, code=code, call_time = call_time, pubkey=request.hotkey, inputs=list(list(torch_inputs.shape)), outputs=outputs_serialized.shape, message=None  )
         return outputs_serialized, code, call_time, message
  
@@ -438,11 +518,21 @@ class Axon( bittensor.grpc.BittensorServicer ):
             bittensor.logging.rpc_log( axon=True, forward=False, is_response=False, code=code, call_time = call_time, pubkey = request.hotkey, inputs=None, outputs=None, message = message  )
             return None, code, call_time, message
 
+        # ---- Check request header ----
+        for tensor, rank in [ (inputs_x, MODALITY_RANKS.get( modality_x )), (grads_dy, 3) ]:
+            code, message = self._check_request_tensor( tensor, modality_x, rank = rank )
+            if code != bittensor.proto.ReturnCode.Success:
+                call_time = clock.time() - start_time
+                bittensor.logging.rpc_log( axon=True, forward=False, is_response=False, code=code, call_time = call_time, pubkey=request.hotkey, inputs=list(tensor.shape), outputs=None, message=message  )
+                return None, code, call_time, message
+
         # ---- Deserialize request ---
+        timings = {}
         try:
             serializer = bittensor.serializer( inputs_x.serializer )
             inputs_x = serializer.deserialize( inputs_x, to_type = bittensor.proto.TensorType.TORCH )
             grads_dy = serializer.deserialize( grads_dy, to_type = bittensor.proto.TensorType.TORCH )
+            timings['deserialize'] = clock.time() - start_time
         except Exception as e:
             code = bittensor.proto.ReturnCode.RequestDeserializationException
             message = "Request serialization exception with error: {}".format(str(e))
@@ -496,10 +586,13 @@ class Axon( bittensor.grpc.BittensorServicer ):
             public_key = request.hotkey, 
             inputs_x = inputs_x, 
             grads_dy = grads_dy, 
-            modality = modality_x
+            modality = modality_x,
+            timings = timings
         )
         if code != bittensor.proto.ReturnCode.Success:
             call_time = clock.time() - start_time
+            timings['total'] = call_time
+            self._record_latency( bittensor.proto.RequestType.BACKWARD, modality_x, timings )
             bittensor.logging.rpc_log( axon=True, forward=False, is_response=True, code=code, call_time = call_time, pubkey=request.hotkey, inputs=list(grads_dy.shape), outputs=None, message=message  )
             return None, code, call_time, message
 
@@ -513,8 +606,10 @@ class Axon( bittensor.grpc.BittensorServicer ):
 
         # ---- Deserialize response ----
         try:
+            serialize_start = clock.time()
             serializer = bittensor.serializer( bittensor.proto.Serializer.MSGPACK )
             outputs_serialized = serializer.serialize( outputs, modality = bittensor.proto.Modality.TENSOR, from_type = bittensor.proto.TensorType.TORCH )
+            timings['serialize'] = clock.time() - serialize_start
         except Exception as e:
             code = bittensor.proto.ReturnCode.ResponseSerializationException
             message = "Backward request serialization failed with error {} and inputs {}".format(e, outputs)
@@ -524,9 +619,94 @@ class Axon( bittensor.grpc.BittensorServicer ):
 
         # ---- Finaly return ----
         call_time = clock.time() - start_time
+        timings['total'] = call_time
+        self._record_latency( bittensor.proto.RequestType.BACKWARD, modality_x, timings )
         bittensor.logging.rpc_log( axon=True, forward=False, is_response=True, code=code, call_time = call_time, pubkey=request.hotkey, inputs=list(grads_dy.shape), outputs=list(outputs_serialized.shape), message=None  )
         return outputs_serialized, code, call_time, message
 
+    def _check_request_tensor( self, tensor: bittensor.proto.Tensor, modality: int, rank: int = None ) -> Tuple[ int, str ]:
+        r""" Checks a request tensor using only its proto shape, dtype and buffer length, so that malformed or
+            oversized requests are rejected before their buffer is decoded.
+
+            Args:
+                tensor (:obj:`bittensor.proto.Tensor`, `required`):
+                    serialized request tensor.
+                modality ( bittensor.proto.Modality, `required`):
+                    modality whose request limits apply.
+                rank (:type:`int`, `optional`):
+                    if set, the rank the tensor must have.
+
+            Returns:
+                code (:obj:`bittensor.proto.ReturnCode, `required`)
+                    Success if the tensor is admitted, otherwise the rejection code.
+                message (str, `required`): 
+                    reason for the rejection or None.
+        """
+        shape = list(tensor.shape)
+        n_bytes = len(tensor.buffer)
+        if tensor.dtype not in DTYPE_BYTES or n_bytes == 0:
+            return bittensor.proto.ReturnCode.RequestDeserializationException, "Request tensor with dtype {} and {} buffer bytes cannot be deserialized".format(tensor.dtype, n_bytes)
+
+        if rank != None and len(shape) != rank:
+            return bittensor.proto.ReturnCode.RequestShapeException, "Request tensor shape exception with len(shape) = {} must have rank {}".format(len(shape), rank)
+
+        if len(shape) < 2 or shape[0] < 1:
+            return bittensor.proto.ReturnCode.RequestShapeException, "Request batch dim exception with shape = {}".format(shape)
+
+        if shape[1] < 1:
+            return bittensor.proto.ReturnCode.RequestShapeException, "Request sequence dim exception with shape = {}".format(shape)
+
+        numel = 1
+        for dim in shape:
+            if dim < 0:
+                return bittensor.proto.ReturnCode.RequestShapeException, "Request tensor shape exception with negative dim in shape = {}".format(shape)
+            numel *= dim
+        if numel * DTYPE_BYTES[ tensor.dtype ] > n_bytes:
+            return bittensor.proto.ReturnCode.RequestShapeException, "Request tensor with shape = {} needs {} bytes, but its buffer has {}".format(shape, numel * DTYPE_BYTES[ tensor.dtype ], n_bytes)
+
+        limits = self.request_limits.get( modality )
+        if limits != None:
+            if shape[0] > limits.max_batch_size:
+                return bittensor.proto.ReturnCode.RequestShapeException, "Request batch_size = {} exceeds the max_batch_size = {}".format(shape[0], limits.max_batch_size)
+            if shape[1] > limits.max_sequence_length:
+                return bittensor.proto.ReturnCode.RequestShapeException, "Request sequence_length = {} exceeds the max_sequence_length = {}".format(shape[1], limits.max_sequence_length)
+            if n_bytes > limits.max_bytes:
+                return bittensor.proto.ReturnCode.RequestShapeException, "Request size = {} bytes exceeds the max_bytes = {}".format(n_bytes, limits.max_bytes)
+
+        return bittensor.proto.ReturnCode.Success, None
+
+    def _queue_class( self, public_key: str ) -> Optional[int]:
+        r""" Returns the stake tier of the caller, under which its queue statistics are aggregated,
+            or None if the axon has no rate limiter to place callers in tiers.
+        """
+        rate_limiter = getattr( self.interceptor, 'rate_limiter', None )
+        if rate_limiter == None:
+            return None
+        return rate_limiter.tier( public_key )
+
+    @staticmethod
+    def _timed_callback( callback: Callable, timings: dict ) -> Callable:
+        r""" Wraps a nucleus callback so that its queue wait and compute durations are written to timings.
+        """
+        submit_time = clock.time()
+        def timed_callback( *args, **kwargs ):
+            start_time = clock.time()
+            timings['queue'] = start_time - submit_time
+            try:
+                return callback( *args, **kwargs )
+            finally:
+                timings['compute'] = clock.time() - start_time
+        return timed_callback
+
+    def _record_latency( self, request_type: int, modality: int, timings: dict ):
+        r""" Adds the per stage durations of a request to the latency histograms.
+        """
+        latency = self.stats.latency
+        for stage, seconds in timings.items():
+            histogram = latency.get( (request_type, modality, stage) )
+            if histogram != None:
+                histogram.observe( seconds )
+
     def attach( self, servicer:object, modality:int):
         """
             Attaches the forward and backward callbacks to the passed object.
@@ -594,14 +774,22 @@ class Axon( bittensor.grpc.BittensorServicer ):
 
 
     def start(self) -> 'Axon':
-        r""" Starts the standalone axon GRPC server thread.
+        r""" Starts the standalone axon GRPC server thread, or the frontend processes if this axon has a frontend pool.
         """
-        if self.server != None:
-            self.server.stop( grace = 1 )  
-            logger.success("Axon Stopped:".ljust(20) + "<blue>{}</blue>", self.ip + ':' + str(self.port))
+        if self.frontend_pool != None:
+            self.frontend_pool.stop()
+            self.frontend_pool.start( self )
+        else:
+            if self.server != None:
+                self.server.stop( grace = 1 )  
+                logger.success("Axon Stopped:".ljust(20) + "<blue>{}</blue>", self.ip + ':' + str(self.port))
 
-        self.server.start()
+            if self.interceptor != None:
+                self.interceptor.start()
+            self.server.start()
         logger.success("Axon Started:".ljust(20) + "<blue>{}</blue>", self.ip + ':' + str(self.port))
+        if self.stats_port != None and self.stats_server == None:
+            self.stats_server = self._start_stats_server( self.stats_ip, self.stats_port )
         self.started = True
         return self
 
@@ -611,9 +799,39 @@ class Axon( bittensor.grpc.BittensorServicer ):
         if self.server != None:
             self.server.stop( grace = 1 )
             logger.success("Axon Stopped:".ljust(20) + "<blue>{}</blue>", self.ip + ':' + str(self.port))
+        if getattr( self, 'frontend_pool', None ) != None:
+            self.frontend_pool.stop()
+        if getattr( self, 'interceptor', None ) != None:
+            self.interceptor.stop()
+        if getattr( self, 'stats_server', None ) != None:
+            self.stats_server.shutdown()
+            self.stats_server.server_close()
+            self.stats_server = None
         self.started = False
         return self
 
+    def _start_stats_server( self, ip: str, port: int ) -> 'ThreadingHTTPServer':
+        r""" Serves latency_stats() as json on GET requests to the passed address from a daemon thread.
+        """
+        axon = self
+        class StatsHandler( BaseHTTPRequestHandler ):
+            def do_GET( self ):
+                body = json.dumps( axon.latency_stats() ).encode('utf-8')
+                self.send_response( 200 )
+                self.send_header( 'Content-Type', 'application/json' )
+                self.send_header( 'Content-Length', str(len(body)) )
+                self.end_headers()
+                self.wfile.write( body )
+
+            def log_message( self, format, *args ):
+                pass
+
+        stats_server = ThreadingHTTPServer( (ip, port), StatsHandler )
+        stats_server.daemon_threads = True
+        threading.Thread( target = stats_server.serve_forever, daemon = True ).start()
+        logger.success("Axon Stats:".ljust(20) + "<blue>{}</blue>", ip + ':' + str(stats_server.server_address[1]))
+        return stats_server
+
     def find_modality(self):
         r""" Detects modality from forward callbacks
         """
@@ -658,20 +876,15 @@ class Axon( bittensor.grpc.BittensorServicer ):
             avg_in_bytes_per_second = stat_utils.AmountPerSecondRollingAverage( 0, 0.01 ),
             # Bytes responded per second.
             avg_out_bytes_per_second = stat_utils.AmountPerSecondRollingAverage( 0, 0.01 ),
-            # Requests per pubkey.
-            requests_per_pubkey = {},
-            # Success per pubkey.
-            successes_per_pubkey = {},
-            # Query time per pubkey.
-            query_times_per_pubkey = {},
-            # Queries per second per pubkey.
-            qps_per_pubkey = {},
-            # Codes recieved per pubkey.
-            codes_per_pubkey = {},
-            # Bytes recieved per pubkey.
-            avg_in_bytes_per_pubkey = {},
-            # Bytes sent per pubkey.
-            avg_out_bytes_per_pubkey = {}
+            # Requests, successes, query times, qps, bytes and codes per pubkey.
+            pubkeys = stat_utils.PubkeyStatsTable( n_codes = max( bittensor.proto.ReturnCode.values() ) + 1 ),
+            # Latency histograms per (request type, modality, stage).
+            latency = {
+                (request_type, modality, stage): stat_utils.LatencyHistogram()
+                for request_type in [ bittensor.proto.RequestType.FORWARD, bittensor.proto.RequestType.BACKWARD ]
+                for modality in bittensor.proto.Modality.values()
+                for stage in LATENCY_STAGES
+            }
         )
 
     def update_stats_for_request(self, request, response, time, code):
@@ -686,59 +899,137 @@ class Axon( bittensor.grpc.BittensorServicer ):
                 code (:obj:`bittensor.proto.ReturnCode, `required`)
                     Return code associated with the call i.e. Success of Timeout.
         """
+        # Wire sizes of the messages.
+        in_bytes = request.ByteSize()
+        out_bytes = response.ByteSize() if response != None else 0
         self.stats.qps.event()
         self.stats.total_requests += 1
-        self.stats.total_in_bytes += sys.getsizeof(request) 
-        self.stats.total_out_bytes += sys.getsizeof(response) 
-        self.stats.avg_in_bytes_per_second.event( float(sys.getsizeof(request)) )
-        self.stats.avg_out_bytes_per_second.event( float(sys.getsizeof(response)) )
-        pubkey = request.hotkey
-        if pubkey not in self.stats.requests_per_pubkey:
-            self.stats.requests_per_pubkey[ pubkey ] = 0
-            self.stats.successes_per_pubkey[ pubkey ] = 0
-            self.stats.query_times_per_pubkey[ pubkey ] = stat_utils.AmountPerSecondRollingAverage(0, 0.05)
-            self.stats.qps_per_pubkey[ pubkey ] = stat_utils.EventsPerSecondRollingAverage(0, 0.05)
-            self.stats.codes_per_pubkey[ pubkey ] = dict([(k,0) for k in bittensor.proto.ReturnCode.keys()])
-            self.stats.avg_in_bytes_per_pubkey[ pubkey ] = stat_utils.AmountPerSecondRollingAverage(0, 0.01)
-            self.stats.avg_out_bytes_per_pubkey[ pubkey ] = stat_utils.AmountPerSecondRollingAverage(0, 0.01)
-
-        # Add values.
-        self.stats.requests_per_pubkey[ pubkey ] += 1
-        self.stats.successes_per_pubkey[ pubkey ] += 1 if code == 1 else 0
-        self.stats.query_times_per_pubkey[ pubkey ].event( float(time) )
-        self.stats.avg_in_bytes_per_pubkey[ pubkey ].event( float(sys.getsizeof(request)) )
-        self.stats.avg_out_bytes_per_pubkey[ pubkey ].event( float(sys.getsizeof(response)) )
-        self.stats.qps_per_pubkey[ pubkey ].event()    
-        try:
-            if bittensor.proto.ReturnCode.Name( code ) in self.stats.codes_per_pubkey[ pubkey ].keys():
-                self.stats.codes_per_pubkey[ pubkey ][bittensor.proto.ReturnCode.Name( code )] += 1
-        except:
-            pass  
+        self.stats.total_in_bytes += in_bytes
+        self.stats.total_out_bytes += out_bytes
+        self.stats.avg_in_bytes_per_second.event( float(in_bytes) )
+        self.stats.avg_out_bytes_per_second.event( float(out_bytes) )
+        self.stats.pubkeys.record( request.hotkey, float(time), in_bytes, out_bytes, code )
+
+    def stats_snapshot( self ) -> dict:
+        r""" Returns a picklable summary of the request stats, used to aggregate the stats of frontend processes.
+            Return:
+                snapshot (:obj:`Dict`):
+                    totals, a row of per pubkey stats and the (counts, sum) of each non empty latency histogram.
+        """
+        pubkeys = self.stats.pubkeys.rows()
+        return {
+            'qps': self.stats.qps.get(),
+            'total_requests': self.stats.total_requests,
+            'total_in_bytes': self.stats.total_in_bytes,
+            'total_out_bytes': self.stats.total_out_bytes,
+            'avg_in_bytes_per_second': self.stats.avg_in_bytes_per_second.get(),
+            'avg_out_bytes_per_second': self.stats.avg_out_bytes_per_second.get(),
+            'pubkeys': pubkeys,
+            'latency': { key: ( list(histogram.counts), histogram.sum ) for key, histogram in list(self.stats.latency.items()) if histogram.count() > 0 },
+        }
+
+    @staticmethod
+    def merge_stats_snapshots( snapshots: List[dict] ) -> dict:
+        r""" Merges axon stats snapshots, summing counts and rates and averaging per request values by request count.
+        """
+        merged = {
+            'qps': 0.0,
+            'total_requests': 0,
+            'total_in_bytes': 0,
+            'total_out_bytes': 0,
+            'avg_in_bytes_per_second': 0.0,
+            'avg_out_bytes_per_second': 0.0,
+            'pubkeys': {},
+            'latency': {},
+        }
+        for snapshot in snapshots:
+            for key in [ 'qps', 'total_requests', 'total_in_bytes', 'total_out_bytes', 'avg_in_bytes_per_second', 'avg_out_bytes_per_second' ]:
+                merged[ key ] += snapshot[ key ]
+            for pubkey, row in snapshot['pubkeys'].items():
+                if pubkey not in merged['pubkeys']:
+                    merged['pubkeys'][ pubkey ] = dict( row )
+                    continue
+                merged_row = merged['pubkeys'][ pubkey ]
+                n_requested = merged_row['n_requested'] + row['n_requested']
+                for key in [ 'query_time', 'avg_inbytes', 'avg_outbytes' ]:
+                    merged_row[ key ] = ( merged_row[ key ] * merged_row['n_requested'] + row[ key ] * row['n_requested'] ) / max( n_requested, 1 )
+                merged_row['n_requested'] = n_requested
+                merged_row['n_success'] += row['n_success']
+                merged_row['qps'] += row['qps']
+                merged_row['codes'] = dict( merged_row['codes'] )
+                for code, count in row['codes'].items():
+                    merged_row['codes'][ code ] = merged_row['codes'].get( code, 0 ) + count
+            for key, ( counts, total ) in snapshot['latency'].items():
+                if key not in merged['latency']:
+                    merged['latency'][ key ] = ( list( counts ), total )
+                else:
+                    merged_counts, merged_total = merged['latency'][ key ]
+                    merged['latency'][ key ] = ( [ a + b for a, b in zip( merged_counts, counts ) ], merged_total + total )
+        return merged
+
+    def _merged_stats( self ) -> dict:
+        r""" Returns the stats snapshot of this axon, merged with the snapshots of its frontend processes.
+        """
+        snapshots = [ self.stats_snapshot() ]
+        if self.frontend_pool != None:
+            snapshots += self.frontend_pool.stats_snapshots()
+        return Axon.merge_stats_snapshots( snapshots )
 
-    def to_dataframe ( self, metagraph ):
+    def latency_stats( self ) -> dict:
+        r""" Returns a snapshot of the non empty latency histograms.
+            Return:
+                latency_stats (:obj:`Dict`):
+                    nested as { request_type: { modality: { stage: histogram dict } } } using the proto enum names.
+        """
+        latency_stats = {}
+        for (request_type, modality, stage), (counts, total) in self._merged_stats()['latency'].items():
+            histogram = stat_utils.LatencyHistogram()
+            histogram.counts = counts
+            histogram.sum = total
+            request_name = bittensor.proto.RequestType.Name( request_type )
+            modality_name = bittensor.proto.Modality.Name( modality )
+            latency_stats.setdefault( request_name, {} ).setdefault( modality_name, {} )[ stage ] = histogram.to_dict()
+        return latency_stats
+
+    def to_dataframe ( self, metagraph, latency: bool = False ):
         r""" Return a stats info as a pandas dataframe indexed by the metagraph or pubkey if not existend.
             Args:
                 metagraph: (bittensor.Metagraph):
                     Indexes the stats data using uids.
+                latency (:type:`bool`, `optional`):
+                    If True, returns the latency histograms with a row per request type, modality and stage instead.
             Return:
                 dataframe (:obj:`pandas.Dataframe`)
         """
+        if latency:
+            return self._latency_dataframe()
+
         # Reindex the pubkey to uid if metagraph is present.
         try:
-            index = [ metagraph.hotkeys.index(pubkey) for pubkey in self.stats.requests_per_pubkey.keys() if pubkey in metagraph.hotkeys ]
-            columns = [ 'axon_n_requested', 'axon_n_success', 'axon_query_time','axon_avg_inbytes','axon_avg_outbytes', 'axon_qps' ]
-            dataframe = pandas.DataFrame(columns = columns, index = index)
-            for pubkey in self.stats.requests_per_pubkey.keys():
-                if pubkey in metagraph.hotkeys:
-                    uid = metagraph.hotkeys.index(pubkey)
-                    dataframe.loc[ uid ] = pandas.Series( {
-                        'axon_n_requested': int(self.stats.requests_per_pubkey[pubkey]),
-                        'axon_n_success': int(self.stats.requests_per_pubkey[pubkey]),
-                        'axon_query_time': float(self.stats.query_times_per_pubkey[pubkey].get()),             
-                        'axon_avg_inbytes': float(self.stats.avg_in_bytes_per_pubkey[pubkey].get()),
-                        'axon_avg_outbytes': float(self.stats.avg_out_bytes_per_pubkey[pubkey].get()),
-                        'axon_qps': float(self.stats.qps_per_pubkey[pubkey].get())
-                    } )
+            pubkey_stats = self._merged_stats()['pubkeys']
+            hotkey_index = metagraph.hotkey_index
+            columns = [ 'axon_n_requested', 'axon_n_success', 'axon_query_time','axon_avg_inbytes','axon_avg_outbytes', 'axon_qps', 'axon_queue_wait', 'axon_queue_depth', 'axon_queue_expired' ]
+            queue_stats = self.priority_threadpool.queue_stats() if self.priority_threadpool != None else {}
+            index = []
+            rows = []
+            for pubkey, row in pubkey_stats.items():
+                uid = hotkey_index.get( pubkey )
+                if uid == None:
+                    continue
+                pubkey_queue_stats = queue_stats.get( pubkey, {} )
+                index.append( uid )
+                rows.append( [
+                    row['n_requested'],
+                    row['n_success'],
+                    row['query_time'],
+                    row['avg_inbytes'],
+                    row['avg_outbytes'],
+                    row['qps'],
+                    float(pubkey_queue_stats.get('wait', 0.0)),
+                    int(pubkey_queue_stats.get('depth', 0)),
+                    int(pubkey_queue_stats.get('expired', 0)),
+                ] )
+            dataframe = pandas.DataFrame( rows, columns = columns, index = index )
             dataframe['uid'] = dataframe.index
             return dataframe
 
@@ -746,6 +1037,17 @@ class Axon( bittensor.grpc.BittensorServicer ):
             bittensor.logging.error(prefix='failed axon.to_dataframe()', sufix=str(e))
             return pandas.DataFrame()
 
+    def _latency_dataframe( self ):
+        r""" Return the non empty latency histograms as a pandas dataframe.
+        """
+        columns = [ 'request_type', 'modality', 'stage', 'count', 'mean', 'p50', 'p90', 'p99' ]
+        rows = []
+        for request_name, modalities in self.latency_stats().items():
+            for modality_name, stages in modalities.items():
+                for stage, histogram in stages.items():
+                    rows.append( [ request_name, modality_name, stage ] + [ histogram[ column ] for column in columns[3:] ] )
+        return pandas.DataFrame( rows, columns = columns )
+
     def to_wandb( self ):
         r""" Return a dictionary of axon stat info for wandb logging
             Args:
@@ -755,19 +1057,41 @@ class Axon( bittensor.grpc.BittensorServicer ):
                 wandb_info (:obj:`Dict`)
         """
         try:
+            stats = self._merged_stats()
             avg_query_time = 0.0
-            for pubkey in self.stats.query_times_per_pubkey:
-                avg_query_time += self.stats.query_times_per_pubkey[pubkey].get() / len( self.stats.query_times_per_pubkey )
+            for row in stats['pubkeys'].values():
+                avg_query_time += row['query_time'] / len( stats['pubkeys'] )
             # ---- Axon summary for wandb
             wandb_data = {
-                'axon/qps': self.stats.qps.get(),
+                'axon/qps': stats['qps'],
                 'axon/avg_query_time': avg_query_time,
-                'axon/total_requests': self.stats.total_requests,
-                'axon/total_in_bytes' : self.stats.total_in_bytes,
-                'axon/total_out_bytes' : self.stats.total_out_bytes,
-                'axon/avg_in_bytes_per_second' : self.stats.avg_in_bytes_per_second.get(),
-                'axon/avg_out_bytes_per_second' : self.stats.avg_out_bytes_per_second.get(),
+                'axon/total_requests': stats['total_requests'],
+                'axon/total_in_bytes' : stats['total_in_bytes'],
+                'axon/total_out_bytes' : stats['total_out_bytes'],
+                'axon/avg_in_bytes_per_second' : stats['avg_in_bytes_per_second'],
+                'axon/avg_out_bytes_per_second' : stats['avg_out_bytes_per_second'],
             }
+            if self.priority_threadpool != None:
+                class_stats = self.priority_threadpool.class_stats()
+                wandb_data['axon/queue_depth'] = sum( [ stats['depth'] for stats in class_stats.values() ] )
+                wandb_data['axon/queue_expired'] = sum( [ stats['expired'] for stats in class_stats.values() ] )
+                wandb_data['axon/avg_queue_wait'] = sum( [ stats['wait'] for stats in class_stats.values() ] ) / max( len(class_stats), 1 )
+                for queue_class, stats in class_stats.items():
+                    if queue_class != None:
+                        wandb_data['axon/queue/tier{}/depth'.format( queue_class )] = stats['depth']
+                        wandb_data['axon/queue/tier{}/wait'.format( queue_class )] = stats['wait']
+            if self.interceptor != None:
+                verification_stats = self.interceptor.verification_stats()
+                wandb_data['axon/verify/n_failed'] = verification_stats['n_failed']
+                wandb_data['axon/verify/cache_hit_rate'] = verification_stats['cache_hits'] / max( verification_stats['cache_hits'] + verification_stats['cache_misses'], 1 )
+                wandb_data['axon/verify/p50'] = verification_stats['verify_time']['p50']
+                wandb_data['axon/verify/p99'] = verification_stats['verify_time']['p99']
+            for request_name, modalities in self.latency_stats().items():
+                for modality_name, stages in modalities.items():
+                    for stage, histogram in stages.items():
+                        prefix = 'axon/latency/{}/{}/{}'.format( request_name.lower(), modality_name.lower(), stage )
+                        wandb_data[ prefix + '/p50' ] = histogram['p50']
+                        wandb_data[ prefix + '/p99' ] = histogram['p99']
             return wandb_data
         except Exception as e:
             bittensor.logging.error(prefix='failed during axon.to_wandb()', sufix=str(e))
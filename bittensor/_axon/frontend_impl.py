@@ -0,0 +1,356 @@
+""" Multi-process axon frontends which share the axon port and hand tensors to the model owning process.
+"""
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import queue
+import itertools
+import threading
+import time
+import multiprocessing
+import concurrent
+from collections import OrderedDict
+from concurrent import futures
+from typing import List, Tuple
+
+import grpc
+import torch
+from loguru import logger
+
+import bittensor
+from bittensor.utils.tensor_ring import TensorRing
+from . import axon_impl
+from . import rate_limiter_impl
+
+logger = logger.opt(colors=True)
+
+# Seconds a frontend rejects a caller the model owner blacklisted, before letting a request through to check again.
+BLACKLIST_SECONDS = 60
+
+class CallerCache():
+    r""" The stake and blacklist verdicts of callers, as reported by the model owner with each response. Frontends check
+        them in their interceptor, so blacklisted and rate limited callers are rejected before their requests are
+        deserialized and copied to the owner. Unknown callers have no stake and are not blacklisted until the owner
+        has seen one of their requests.
+    """
+    def __init__( self, max_pubkeys: int = 10000, blacklist_seconds: float = BLACKLIST_SECONDS ):
+        self.max_pubkeys = max_pubkeys
+        self.blacklist_seconds = blacklist_seconds
+        # pubkey -> [ stake, { request_type: blacklisted }, time of the last verdict ], least recently updated first.
+        self.callers = OrderedDict()
+        self.lock = threading.Lock()
+
+    def update( self, pubkey: str, request_type: int, stake: float, blacklisted: bool ):
+        with self.lock:
+            caller = self.callers.pop( pubkey, None )
+            if caller == None:
+                caller = [ 0.0, {}, 0.0 ]
+            caller[0] = stake
+            caller[1][ request_type ] = blacklisted
+            caller[2] = time.time()
+            self.callers[ pubkey ] = caller
+            while len( self.callers ) > self.max_pubkeys:
+                self.callers.popitem( last = False )
+
+    def stake( self, pubkey: str ) -> float:
+        caller = self.callers.get( pubkey )
+        return caller[0] if caller != None else 0.0
+
+    def blacklisted( self, pubkey: str, request_type: int ) -> bool:
+        caller = self.callers.get( pubkey )
+        if caller == None or time.time() - caller[2] > self.blacklist_seconds:
+            return False
+        return caller[1].get( request_type, False )
+
+class FrontendPool():
+    r""" Runs frontend processes which each serve the axon port through SO_REUSEPORT. The frontends do the request
+        authentication, admission checks and (de)serialization, and hand the decoded tensors through shared memory
+        to this process, which owns the model and calls the axon's forward and backward callbacks.
+    """
+    def __init__(
+        self,
+        config: 'bittensor.Config',
+        wallet: 'bittensor.wallet',
+        frontends: int,
+        blacklist: 'Callable' = None,
+        stats_interval: float = 5,
+        rate_limiter: 'RateLimiter' = None,
+    ):
+        r""" Initializes the frontend pool, processes are only created on start().
+            Args:
+                config (:obj:`bittensor.Config`, `required`):
+                    bittensor.axon.config(), passed to each frontend.
+                wallet (:obj:`bittensor.wallet`, `required`):
+                    bittensor wallet, passed to each frontend.
+                frontends (:type:`int`, `required`):
+                    number of frontend processes.
+                blacklist (:obj:`callable`, `optional`):
+                    function to blacklist requests, called in this process before the callbacks. Its verdicts are
+                    sent back to the frontends, which then reject the caller before deserializing its requests.
+                stats_interval (:type:`float`, `optional`):
+                    seconds between the stats snapshots sent by each frontend.
+                rate_limiter (:obj:`RateLimiter`, `optional`):
+                    per pubkey rate limiter, applied in this process where the stakes are known. Each frontend also
+                    limits callers at their tier rate in its interceptor, with the stakes reported by this process.
+        """
+        self.config = config
+        self.wallet = wallet
+        self.frontends = frontends
+        self.blacklist = blacklist
+        self.stats_interval = stats_interval
+        self.rate_limiter = rate_limiter
+        self.axon = None
+        self.processes = []
+        self.snapshots = {}
+        self.stats_queue = None
+        self.context = multiprocessing.get_context('spawn')
+
+    def start( self, axon: 'axon_impl.Axon' ):
+        r""" Starts the frontend processes and the dispatcher thread which services their requests through the passed axon.
+        """
+        self._open( axon )
+        for index in range( self.frontends ):
+            process = self.context.Process(
+                target = serve_frontend,
+                args = ( index, self.config, self.wallet, self.requests_ring, self.responses_ring, self.requests, self.responses[index], self.stats_queue, self.stop_event, self.stats_interval ),
+                daemon = True
+            )
+            process.start()
+            self.processes.append( process )
+        logger.success("Axon Frontends:".ljust(20) + "<blue>{}</blue>", self.frontends)
+        return self
+
+    def _open( self, axon: 'axon_impl.Axon' ):
+        r""" Creates the shared memory rings and queues and starts the dispatcher thread.
+        """
+        self.axon = axon
+        self.requests_ring = TensorRing( self.config.axon.shm_slots, self.config.axon.shm_slot_bytes, context = self.context )
+        self.responses_ring = TensorRing( self.config.axon.shm_slots, self.config.axon.shm_slot_bytes, context = self.context )
+        self.requests = self.context.Queue()
+        self.responses = [ self.context.Queue() for _ in range( self.frontends ) ]
+        self.stats_queue = self.context.Queue()
+        self.stop_event = self.context.Event()
+        self.executor = futures.ThreadPoolExecutor( max_workers = self.config.axon.max_workers )
+        self.dispatcher = threading.Thread( target = self._dispatch, daemon = True )
+        self.dispatcher.start()
+
+    def stop( self ):
+        r""" Stops the frontend processes and the dispatcher.
+        """
+        if self.axon == None:
+            return self
+        self.axon = None
+        self.stop_event.set()
+        self.requests.put( None )
+        for process in self.processes:
+            process.join( timeout = 5 )
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        # Let in flight calls finish before their shared memory is unmapped.
+        self.executor.shutdown( wait = True )
+        self.requests_ring.close( unlink = True )
+        self.responses_ring.close( unlink = True )
+        return self
+
+    def _dispatch( self ):
+        r""" Hands requests from the frontends to the executor until stopped.
+        """
+        while not self.stop_event.is_set():
+            try:
+                message = self.requests.get( timeout = 1 )
+            except queue.Empty:
+                continue
+            if message == None:
+                break
+            self.executor.submit( self._call, *message )
+
+    def _call( self, index: int, request_id: int, public_key: str, request_type: int, modality: int, handles: List[Tuple] ):
+        r""" Runs a frontend request through the axon callbacks and sends the response back to the frontend.
+        """
+        tensors = [ self.requests_ring.get( handle ) for handle in handles ]
+        timings = {}
+        stake, blacklisted = 0.0, False
+        try:
+            stake, blacklisted = self._caller( public_key, request_type )
+            if blacklisted:
+                outputs, code, message = None, bittensor.proto.ReturnCode.Unauthenticated, 'Black listed'
+            elif self.rate_limiter != None and not self.rate_limiter.allow( public_key, request_type ):
+                outputs, code, message = None, bittensor.proto.ReturnCode.Backoff, 'Rate limited'
+            elif request_type == bittensor.proto.RequestType.FORWARD:
+                outputs, code, message = self.axon._call_forward( public_key = public_key, inputs_x = tensors[0], modality = modality, timings = timings )
+            else:
+                outputs, code, message = self.axon._call_backward( public_key = public_key, inputs_x = tensors[0], grads_dy = tensors[1], modality = modality, timings = timings )
+        except Exception as e:
+            outputs, code, message = None, bittensor.proto.ReturnCode.UnknownException, 'Error in the axon model owner: {}'.format(e)
+
+        if outputs != None and not isinstance( outputs, torch.Tensor ):
+            outputs, code, message = None, bittensor.proto.ReturnCode.ResponseSerializationException, 'Callback returned {}, expected a torch.Tensor'.format( type(outputs) )
+        handle = self.responses_ring.put( outputs ) if outputs != None else None
+        self.responses[ index ].put( ( request_id, handle, code, message, timings, ( public_key, request_type, stake, blacklisted ) ) )
+
+    def _caller( self, public_key: str, request_type: int ) -> Tuple[ float, bool ]:
+        r""" Returns the stake and blacklist verdict of a caller, which the frontends cache for their own checks.
+        """
+        blacklisted = bool( self.blacklist( public_key, request_type ) ) if self.blacklist != None else False
+        stake = 0.0
+        if self.rate_limiter != None and self.rate_limiter.stake != None:
+            try:
+                stake = float( self.rate_limiter.stake( public_key ) )
+            except Exception:
+                pass
+        return stake, blacklisted
+
+    def stats_snapshots( self ) -> List[dict]:
+        r""" Returns the latest stats snapshot received from each frontend.
+        """
+        while self.stats_queue != None:
+            try:
+                index, snapshot = self.stats_queue.get_nowait()
+                self.snapshots[ index ] = snapshot
+            except queue.Empty:
+                break
+        return list( self.snapshots.values() )
+
+
+class FrontendAxon( axon_impl.Axon ):
+    r""" An axon served in a frontend process, which forwards the decoded tensors of each request to the
+        model owning process instead of calling the callbacks itself.
+    """
+    def __init__(
+        self,
+        index: int,
+        requests_ring: TensorRing,
+        responses_ring: TensorRing,
+        requests: 'multiprocessing.Queue',
+        responses: 'multiprocessing.Queue',
+        callers: CallerCache = None,
+        **kwargs
+    ):
+        super().__init__( **kwargs )
+        self.index = index
+        self.callers = callers
+        self.requests_ring = requests_ring
+        self.responses_ring = responses_ring
+        self.requests = requests
+        self.responses = responses
+        self.pending = {}
+        self.request_ids = itertools.count()
+        self.receiver = threading.Thread( target = self._receive, daemon = True )
+        self.receiver.start()
+
+    def _receive( self ):
+        r""" Resolves pending requests as responses arrive from the model owner.
+        """
+        while True:
+            response = self.responses.get()
+            if response == None:
+                break
+            request_id, handle, code, message, timings, caller = response
+            # Always read the response, even if the request timed out, so its slot is freed.
+            outputs = self.responses_ring.get( handle ) if handle != None else None
+            if self.callers != None:
+                self.callers.update( *caller )
+            future = self.pending.pop( request_id, None )
+            if future != None:
+                future.set_result( ( outputs, code, message, timings ) )
+
+    def _call_remote( self, request_type: int, public_key: str, modality: int, tensors: List[torch.Tensor], timeout: float, timings: dict = None ):
+        r""" Sends a request to the model owner and waits for its response.
+        """
+        request_id = next( self.request_ids )
+        future = concurrent.futures.Future()
+        self.pending[ request_id ] = future
+        handles = [ self.requests_ring.put( tensor ) for tensor in tensors ]
+        self.requests.put( ( self.index, request_id, public_key, request_type, modality, handles ) )
+        try:
+            # The model owner applies the timeout itself, allow it a second to report back.
+            outputs, code, message, remote_timings = future.result( timeout = timeout + 1 if timeout != None else None )
+        except concurrent.futures.TimeoutError:
+            self.pending.pop( request_id, None )
+            return None, bittensor.proto.ReturnCode.Timeout, 'Timed out waiting on the axon model owner'
+        if timings != None:
+            timings.update( remote_timings )
+        return outputs, code, message
+
+    def _call_forward( self, public_key: str, inputs_x: torch.Tensor, modality: bittensor.proto.Modality, timings: dict = None ) -> Tuple[ torch.FloatTensor, int, str ]:
+        return self._call_remote( bittensor.proto.RequestType.FORWARD, public_key, modality, [ inputs_x ], self.forward_timeout, timings )
+
+    def _call_backward( self, public_key: str, inputs_x: torch.Tensor, grads_dy: torch.FloatTensor, modality: bittensor.proto.Modality, timings: dict = None ) -> Tuple[ torch.FloatTensor, int, str ]:
+        return self._call_remote( bittensor.proto.RequestType.BACKWARD, public_key, modality, [ inputs_x, grads_dy ], self.backward_timeout, timings )
+
+
+def serve_frontend(
+        index: int,
+        config: 'bittensor.Config',
+        wallet: 'bittensor.wallet',
+        requests_ring: TensorRing,
+        responses_ring: TensorRing,
+        requests: 'multiprocessing.Queue',
+        responses: 'multiprocessing.Queue',
+        stats: 'multiprocessing.Queue',
+        stop_event: 'multiprocessing.Event',
+        stats_interval: float,
+    ):
+    r""" Entry point of a frontend process, serves the axon port until the stop event is set.
+    """
+    from . import AuthInterceptor
+    # Callers are checked against the verdicts of the model owner before their requests are deserialized.
+    callers = CallerCache( max_pubkeys = config.axon.rate_limit.max_pubkeys )
+    if config.axon.rate_limit.enabled:
+        rate_limiter = rate_limiter_impl.RateLimiter.from_config( config, stake = callers.stake )
+    else:
+        rate_limiter = None
+    interceptor = AuthInterceptor( blacklist = callers.blacklisted, rate_limiter = rate_limiter )
+    server = grpc.server(
+        futures.ThreadPoolExecutor( max_workers = config.axon.max_workers ),
+        interceptors = ( interceptor, ),
+        maximum_concurrent_rpcs = config.axon.maximum_concurrent_rpcs,
+        options = [ ('grpc.keepalive_time_ms', 100000),
+                    ('grpc.keepalive_timeout_ms', 500000),
+                    ('grpc.so_reuseport', 1) ]
+    )
+    frontend = FrontendAxon(
+        index = index,
+        requests_ring = requests_ring,
+        responses_ring = responses_ring,
+        requests = requests,
+        responses = responses,
+        callers = callers,
+        interceptor = interceptor,
+        wallet = wallet,
+        server = server,
+        ip = config.axon.ip,
+        port = config.axon.port,
+        forwards = [ None, None, None ],
+        backwards = [ None, None, None ],
+        forward_timeout = config.axon.forward_timeout,
+        backward_timeout = config.axon.backward_timeout,
+        request_limits = {
+            bittensor.proto.Modality.TEXT: config.axon.text,
+            bittensor.proto.Modality.IMAGE: config.axon.image,
+            bittensor.proto.Modality.TENSOR: config.axon.tensor,
+        },
+    )
+    bittensor.grpc.add_BittensorServicer_to_server( frontend, server )
+    server.add_insecure_port( str( config.axon.ip ) + ":" + str( config.axon.port ) )
+    server.start()
+    while not stop_event.wait( stats_interval ):
+        stats.put( ( index, frontend.stats_snapshot() ) )
+    server.stop( grace = 1 )
+    responses.put( None )
+
@@ -0,0 +1,150 @@
+""" Per pubkey token bucket rate limiting of axon requests.
+"""
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import bisect
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List
+
+import bittensor
+
+class RateLimiter():
+    r""" Limits the request rate of each pubkey with a token bucket per (pubkey, request type).
+        The refill rate of a bucket is set by the stake tier of its pubkey, and its burst is the number of
+        requests that rate allows in burst_seconds. Buckets idle for longer than idle_seconds, or the least
+        recently used ones past max_pubkeys, are dropped, a returning caller then starts with a full bucket.
+    """
+    def __init__(
+        self,
+        stake_tiers: List[float],
+        forward_rates: List[float],
+        backward_rates: List[float],
+        burst_seconds: float = 5,
+        idle_seconds: float = 600,
+        max_pubkeys: int = 10000,
+        stake: Callable = None,
+    ):
+        r""" Initializes a new rate limiter.
+            Args:
+                stake_tiers (:obj:`List[float]`, `required`):
+                    ascending minimum stake of each tier, callers below the first tier use the first tier.
+                forward_rates (:obj:`List[float]`, `required`):
+                    forward requests per second allowed in each tier.
+                backward_rates (:obj:`List[float]`, `required`):
+                    backward requests per second allowed in each tier.
+                burst_seconds (:type:`float`, `optional`):
+                    seconds of requests at the tier rate a caller can burst.
+                idle_seconds (:type:`float`, `optional`):
+                    seconds after which the bucket of an idle caller is dropped.
+                max_pubkeys (:type:`int`, `optional`):
+                    maximum number of buckets held per request type.
+                stake (:obj:`callable`, `optional`):
+                    function from pubkey to stake, None or unknown pubkeys are placed in the first tier.
+        """
+        assert len(stake_tiers) == len(forward_rates) == len(backward_rates), 'stake_tiers, forward_rates and backward_rates must have the same length'
+        assert list(stake_tiers) == sorted(stake_tiers), 'stake_tiers must be ascending'
+        self.stake_tiers = list(stake_tiers)
+        self.rates = {
+            bittensor.proto.RequestType.FORWARD: list(forward_rates),
+            bittensor.proto.RequestType.BACKWARD: list(backward_rates),
+        }
+        self.burst_seconds = burst_seconds
+        self.idle_seconds = idle_seconds
+        self.max_pubkeys = max_pubkeys
+        self.stake = stake
+        self.buckets = { request_type: OrderedDict() for request_type in self.rates }
+        self.n_allowed = 0
+        self.n_rejected = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def from_config( config: 'bittensor.Config', stake: Callable = None ) -> 'RateLimiter':
+        r""" Creates a rate limiter from the axon.rate_limit config.
+        """
+        return RateLimiter(
+            stake_tiers = config.axon.rate_limit.stake_tiers,
+            forward_rates = config.axon.rate_limit.forward_rates,
+            backward_rates = config.axon.rate_limit.backward_rates,
+            burst_seconds = config.axon.rate_limit.burst_seconds,
+            idle_seconds = config.axon.rate_limit.idle_seconds,
+            max_pubkeys = config.axon.rate_limit.max_pubkeys,
+            stake = stake,
+        )
+
+    def __len__( self ) -> int:
+        return sum( [ len(buckets) for buckets in self.buckets.values() ] )
+
+    def tier( self, pubkey: str ) -> int:
+        r""" Returns the stake tier of a pubkey.
+        """
+        if self.stake == None:
+            return 0
+        try:
+            stake = float( self.stake( pubkey ) )
+        except Exception:
+            return 0
+        return max( bisect.bisect_right( self.stake_tiers, stake ) - 1, 0 )
+
+    def allow( self, pubkey: str, request_type: int, now: float = None ) -> bool:
+        r""" Takes a token from the bucket of the pubkey for this request type.
+            Args:
+                pubkey (:type:`str`, `required`):
+                    the public key of the caller.
+                request_type (:obj:`bittensor.proto.RequestType`, `required`):
+                    the request type ('FORWARD' or 'BACKWARD').
+                now (:type:`float`, `optional`):
+                    the current time, defaults to time.time().
+            Returns:
+                allowed (:type:`bool`):
+                    False if the caller is over its rate and should back off.
+        """
+        rates = self.rates.get( request_type )
+        if rates == None:
+            return True
+        now = time.time() if now == None else now
+        rate = rates[ self.tier( pubkey ) ]
+        burst = max( rate * self.burst_seconds, 1.0 )
+        with self.lock:
+            buckets = self.buckets[ request_type ]
+            bucket = buckets.get( pubkey )
+            if bucket == None:
+                bucket = [ burst, now ]
+                buckets[ pubkey ] = bucket
+            else:
+                bucket[0] = min( burst, bucket[0] + ( now - bucket[1] ) * rate )
+                bucket[1] = now
+                buckets.move_to_end( pubkey )
+            allowed = bucket[0] >= 1.0
+            if allowed:
+                bucket[0] -= 1.0
+                self.n_allowed += 1
+            else:
+                self.n_rejected += 1
+            self._expire( buckets, now )
+        return allowed
+
+    def _expire( self, buckets: OrderedDict, now: float ):
+        r""" Drops the least recently used buckets which are idle or over the max_pubkeys bound.
+        """
+        while len(buckets) > 0:
+            _, ( _, last ) = next( iter( buckets.items() ) )
+            if len(buckets) <= self.max_pubkeys and now - last <= self.idle_seconds:
+                break
+            buckets.popitem( last = False )
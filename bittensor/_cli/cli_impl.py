@@ -328,27 +328,33 @@ class CLI:
         """
         console = bittensor.__console__
         subtensor = bittensor.subtensor( config = self.config )
-        metagraph = bittensor.metagraph( subtensor = subtensor )
+        metagraph = bittensor.metagraph( subtensor = subtensor, sparse = True )
         wallet = bittensor.wallet( config = self.config )
         with console.status(":satellite: Syncing with chain: [white]{}[/white] ...".format(self.config.subtensor.network)):
             metagraph.load()
             metagraph.sync()
             metagraph.save()
 
+        def weights_row( uid ):
+            # Rows of the sparse weights are densified one at a time.
+            row = metagraph.W[uid]
+            row = row.to_dense() if row.is_sparse else row
+            return ["[bold white]{}".format(uid) ] + ['{:.3f}'.format(v) for v in row.tolist()]
+
         table = Table()
         rows = []
         table.add_column("[bold white]uid", style='white', no_wrap=False)
         for uid in metagraph.uids.tolist():
             table.add_column("[bold white]{}".format(uid), style='white', no_wrap=False)
             if self.config.all_weights:
-                rows.append(["[bold white]{}".format(uid) ] + ['{:.3f}'.format(v) for v in metagraph.W[uid].tolist()])
+                rows.append( weights_row( uid ) )
             else:
                 if metagraph.coldkeys[uid] == wallet.coldkeypub.ss58_address:
                     if not self.config.all_hotkeys:
                         if metagraph.hotkeys[uid] == wallet.hotkey.ss58_address:
-                            rows.append(["[bold white]{}".format(uid) ] + ['{:.3f}'.format(v) for v in metagraph.W[uid].tolist()])
+                            rows.append( weights_row( uid ) )
                     else:
-                        rows.append(["[bold white]{}".format(uid) ] + ['{:.3f}'.format(v) for v in metagraph.W[uid].tolist()])
+                        rows.append( weights_row( uid ) )
 
         for row in rows:
             table.add_row(*row)
@@ -30,6 +30,7 @@ from transformers.utils.logging import enable_explicit_format
 
 import bittensor
 from bittensor._endpoint.endpoint_impl import Endpoint
+from bittensor._endpoint.endpoint_columns_impl import EndpointColumns
 import bittensor.utils.stats as stat_utils
 import bittensor.utils.codes as codes
 
@@ -254,7 +255,7 @@ class Dendrite(torch.autograd.Function):
 
     def forward_image(
             self,
-            endpoints: Union[List['bittensor.Endpoint'], 'bittensor.Endpoint'],
+            endpoints: Union[List['bittensor.Endpoint'], 'bittensor.Endpoint', 'bittensor.EndpointColumns'],
             inputs: List[torch.FloatTensor],
             timeout: int = None,
             requires_grad: bool = None
@@ -262,8 +263,8 @@ class Dendrite(torch.autograd.Function):
         r""" Forward image inputs to endpoints.
 
           Args:
-                endpoints (:obj:`Union[List[bittensor.Endpoint], bittensor.Endpoint]` of shape :obj:`(num_endpoints)`, `required`):
-                    List or single of endpoints which match the length of inputs. Inputs are sent forward to these endpoints.
+                endpoints (:obj:`Union[List[bittensor.Endpoint], bittensor.Endpoint, bittensor.EndpointColumns]` of shape :obj:`(num_endpoints)`, `required`):
+                    List, single or column view of endpoints which match the length of inputs. Inputs are sent forward to these endpoints.
 
                 inputs (:obj:`Union[List[torch.FloatTensor], torch.FloatTensor]` of shape :obj:`(num_endpoints * [ batch_size, sequence_len, channels, rows, cols ])`, `required`):
                     List or single of image-tensors to send to corresponding endpoints. Tensors are images encoded using the
@@ -286,6 +287,8 @@ class Dendrite(torch.autograd.Function):
                     times per call.
         """
         # Check types.
+        if isinstance(endpoints, EndpointColumns):
+            endpoints = endpoints.objects()
         if not isinstance(endpoints, list) and not isinstance(endpoints, Endpoint):
             raise ValueError('endpoints must be of type list or bittensor.Endpoint. Got {}'.format(type(endpoints)))
 
@@ -350,7 +353,7 @@ class Dendrite(torch.autograd.Function):
 
     def forward_tensor(
             self,
-            endpoints: Union[List['bittensor.Endpoint'], 'bittensor.Endpoint'],
+            endpoints: Union[List['bittensor.Endpoint'], 'bittensor.Endpoint', 'bittensor.EndpointColumns'],
             inputs: List[torch.FloatTensor],
             timeout: int = None,
             requires_grad: bool = None
@@ -358,8 +361,8 @@ class Dendrite(torch.autograd.Function):
         r""" Forward tensor inputs to endpoints.
 
             Args:
-                endpoints (:obj:`Union[List[bittensor.Endpoint], bittensor.Endpoint]` of shape :obj:`(num_endpoints)`, `required`):
-                    List or single of endpoints which match the length of inputs. Inputs are sent forward to these endpoints.
+                endpoints (:obj:`Union[List[bittensor.Endpoint], bittensor.Endpoint, bittensor.EndpointColumns]` of shape :obj:`(num_endpoints)`, `required`):
+                    List, single or column view of endpoints which match the length of inputs. Inputs are sent forward to these endpoints.
 
                 inputs (:obj:`Union[List[torch.LongTensor], torch.LongTensor]` of shape :obj:`(num_endpoints * [batch_size, sequence_len])`, `required`):
                     List or single tensors to send to corresponding endpoints. Tensors are of float type and
@@ -382,6 +385,8 @@ class Dendrite(torch.autograd.Function):
                     times per call.
         """
         # Check types.
+        if isinstance(endpoints, EndpointColumns):
+            endpoints = endpoints.objects()
         if not isinstance(endpoints, list) and not isinstance(endpoints, Endpoint):
             raise ValueError('endpoints must be of type list or bittensor.Endpoint. Got {}'.format(type(endpoints)))
 
@@ -450,7 +455,7 @@ class Dendrite(torch.autograd.Function):
     def forward_text(
             self,
             endpoints: Union[
-                torch.LongTensor, List[torch.LongTensor], List['bittensor.Endpoint'], 'bittensor.Endpoint'],
+                torch.LongTensor, List[torch.LongTensor], List['bittensor.Endpoint'], 'bittensor.Endpoint', 'bittensor.EndpointColumns'],
             inputs: Union[str, List[str], List[torch.LongTensor], torch.LongTensor],
             timeout: int = None,
             requires_grad: bool = None
@@ -458,13 +463,14 @@ class Dendrite(torch.autograd.Function):
         r""" Forward text inputs to a list of neuron endpoints and block until responses or timeout.
 
                 Args:
-                    endpoints (:obj:`Union[torch.LongTensor, List[torch.LongTensor], List[bittensor.Endpoint], bittensor.Endpoint]` of shape :obj:`(num_endpoints)`, `required`):
+                    endpoints (:obj:`Union[torch.LongTensor, List[torch.LongTensor], List[bittensor.Endpoint], bittensor.Endpoint, bittensor.EndpointColumns]` of shape :obj:`(num_endpoints)`, `required`):
                         Endpoints to send inputs to. Endpoint can be one of the following types:
                             - a single endpoint tensor shape [250]
                             - a set of endpoint tensors shape [n, 250]
                             - a list of endpoints tensors each of shape [250]
                             - a single endpoint object. Inputs will be sent to this endpoint alone.
                             - a list of endpoint objects. All inputs will be sent to these endpoints.
+                            - endpoint columns, e.g. metagraph.endpoints[ uids ]. All inputs will be sent to these endpoints.
 
                     inputs (:obj:`Union[str,  List[str], List[torch.LongTensor], torch.LongTensor]` of shape :obj:`(num_endpoints * [batch_size, sequence_len])`, `required`):
                         Tokenized sentences to send on the wire. Inputs can be one of the following types:
@@ -526,6 +532,10 @@ class Dendrite(torch.autograd.Function):
         elif isinstance(endpoints, list) and len(endpoints) > 0 and isinstance(endpoints[0], bittensor.Endpoint):
             formatted_endpoints = endpoints
 
+        # ---- Endpoints are metagraph endpoint columns.
+        elif isinstance(endpoints, EndpointColumns):
+            formatted_endpoints = endpoints.objects()
+
         # ---- Endpoints is a torch tensor.
         elif isinstance(endpoints, torch.LongTensor):
             if len(endpoints.shape) == 1:
@@ -554,6 +564,7 @@ class Dendrite(torch.autograd.Function):
                             - a list of endpoints tensors each of shape [250]
                             - a single endpoint object. Inputs will be sent to this endpoint alone.
                             - a list of endpoint objects. All inputs will be sent to these endpoints.
+                            - endpoint columns, e.g. metagraph.endpoints[ uids ]. All inputs will be sent to these endpoints.
                         Got {} """.format(endpoints)
             raise ValueError(error_msg)
 
@@ -703,12 +714,13 @@ class Dendrite(torch.autograd.Function):
                 dataframe (:obj:`pandas.Dataframe`)
         """
         try:
-            index = [ metagraph.hotkeys.index(pubkey) for pubkey in self.stats.requests_per_pubkey.keys() if pubkey in metagraph.hotkeys]
+            hotkey_index = metagraph.hotkey_index
+            index = [ hotkey_index[pubkey] for pubkey in self.stats.requests_per_pubkey.keys() if pubkey in hotkey_index ]
             columns = [ 'dendrite_n_requested', 'dendrite_n_success', 'dendrite_query_time', 'dendrite_avg_inbytes', 'dendrite_avg_outbytes', 'dendrite_qps' ]
             dataframe = pandas.DataFrame(columns = columns, index = index)
             for pubkey in self.stats.requests_per_pubkey.keys():
-                if pubkey in metagraph.hotkeys:
-                    uid = metagraph.hotkeys.index(pubkey)
+                if pubkey in hotkey_index:
+                    uid = hotkey_index[pubkey]
                     dataframe.loc[ uid ] = pandas.Series( {
                         'dendrite_n_requested': int(self.stats.requests_per_pubkey[pubkey]),
                         'dendrite_n_success': int(self.stats.successes_per_pubkey[pubkey]),
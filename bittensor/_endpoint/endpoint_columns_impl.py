@@ -0,0 +1,179 @@
+""" Endpoints held as typed columns, one row per uid.
+"""
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+from typing import Dict, Iterator, List, Union
+
+import numpy
+import torch
+
+import bittensor.utils.networking as net
+from .endpoint_impl import Endpoint, SS58_LENGTH
+
+IP_BYTES = 16
+INT_FIELDS = ( 'version', 'uid', 'ip_type', 'port', 'modality' )
+FIELDS = INT_FIELDS + ( 'ip', 'hotkey', 'coldkey' )
+# Column values of a row without an endpoint, matching bittensor.endpoint.dummy().
+DUMMY = { 'version': 0, 'uid': -1, 'ip_type': 4, 'port': 0, 'modality': 0 }
+
+def _ip_to_int( ip: Union[ int, str ] ) -> int:
+    r""" Chain ips are integers, endpoint ips are strings.
+    """
+    if isinstance( ip, str ):
+        return int( ip ) if ip.isdigit() else net.ip_to_int( ip )
+    return int( ip )
+
+def _encode_ips( ips: List[ Union[ int, str ] ] ) -> numpy.ndarray:
+    # Copied, frombuffer views the immutable bytes and torch.from_numpy warns on read-only arrays.
+    return numpy.frombuffer( b''.join( [ _ip_to_int( ip ).to_bytes( IP_BYTES, 'big' ) for ip in ips ] ), dtype = numpy.uint8 ).reshape( len(ips), IP_BYTES ).copy()
+
+def _encode_keys( keys: List[str] ) -> numpy.ndarray:
+    return numpy.array( list( keys ), dtype = 'S{}'.format( SS58_LENGTH ) ).view( numpy.uint8 ).reshape( len(keys), SS58_LENGTH )
+
+def _decode_keys( keys: torch.Tensor ) -> List[str]:
+    return numpy.ascontiguousarray( keys.numpy() ).view( 'S{}'.format( SS58_LENGTH ) ).reshape( -1 ).astype( str ).tolist()
+
+class EndpointColumns( torch.nn.Module ):
+    r""" Endpoints held as typed columns, one row per uid: the version, uid, ip_type, port and modality as int64,
+        the ip as 16 big endian bytes, and the hotkey and coldkey as 48 ascii bytes, about 150 bytes per row.
+        Endpoint objects are only built when a row is read, and are cached.
+        Indexing with an int returns the Endpoint of the row, any other index returns the selected rows as EndpointColumns.
+    """
+    def __init__( self, columns: Dict[ str, torch.Tensor ] ):
+        r""" Initializes the columns.
+            Args:
+                columns (:obj:`Dict[str, torch.Tensor]`, `required`):
+                    int64 tensors of shape [n] for version, uid, ip_type, port and modality, uint8 tensors of shape [n, 16] for ip
+                    and of shape [n, 48] for hotkey and coldkey.
+        """
+        super(EndpointColumns, self).__init__()
+        for field in FIELDS:
+            setattr( self, field, torch.nn.Parameter( columns[field], requires_grad = False ) )
+        self._objects = [ None ] * len( columns['uid'] )
+
+    @staticmethod
+    def empty( n: int ) -> 'EndpointColumns':
+        r""" Returns n rows without endpoints.
+        """
+        columns = { field: torch.full( [ n ], DUMMY[field], dtype = torch.int64 ) for field in INT_FIELDS }
+        columns['ip'] = torch.zeros( [ n, IP_BYTES ], dtype = torch.uint8 )
+        columns['hotkey'] = torch.zeros( [ n, SS58_LENGTH ], dtype = torch.uint8 )
+        columns['coldkey'] = torch.zeros( [ n, SS58_LENGTH ], dtype = torch.uint8 )
+        return EndpointColumns( columns )
+
+    @staticmethod
+    def from_arrays( n: int, rows: numpy.ndarray, **values ) -> 'EndpointColumns':
+        r""" Returns n rows where the passed rows hold the passed values and the others hold no endpoint.
+            Args:
+                n (:type:`int`, `required`):
+                    number of rows.
+                rows (:obj:`numpy.ndarray`, `required`):
+                    row of each value.
+                values (:obj:`Dict[str, numpy.ndarray]`, `required`):
+                    per row values of each field, ips as ints or strings and keys as strings.
+        """
+        endpoints = EndpointColumns.empty( n )
+        if len( rows ) == 0:
+            return endpoints
+        rows = torch.as_tensor( numpy.asarray( rows, dtype = numpy.int64 ) )
+        for field in INT_FIELDS:
+            getattr( endpoints, field ).data[ rows ] = torch.as_tensor( numpy.asarray( values[field], dtype = numpy.int64 ) )
+        endpoints.ip.data[ rows ] = torch.from_numpy( _encode_ips( list( values['ip'] ) ) )
+        endpoints.hotkey.data[ rows ] = torch.from_numpy( _encode_keys( values['hotkey'] ) )
+        endpoints.coldkey.data[ rows ] = torch.from_numpy( _encode_keys( values['coldkey'] ) )
+        return endpoints
+
+    @staticmethod
+    def from_endpoints( endpoints: List[Endpoint] ) -> 'EndpointColumns':
+        r""" Returns one row per endpoint.
+        """
+        values = { field: [ getattr( endpoint, field ) for endpoint in endpoints ] for field in FIELDS }
+        return EndpointColumns.from_arrays( len(endpoints), numpy.arange( len(endpoints) ), **values )
+
+    @staticmethod
+    def from_tensor( tensor: torch.LongTensor ) -> 'EndpointColumns':
+        r""" Returns the rows of a [n, 250] tensor of Endpoint.to_tensor rows.
+        """
+        import bittensor
+        return EndpointColumns.from_endpoints( [ bittensor.endpoint.from_tensor( row ) for row in tensor ] )
+
+    @staticmethod
+    def from_state_dict( state_dict: Dict[ str, torch.Tensor ], prefix: str = '' ) -> 'EndpointColumns':
+        r""" Returns the columns held in a state dict under prefix.
+        """
+        return EndpointColumns( { field: state_dict[ prefix + field ] for field in FIELDS } )
+
+    def __len__( self ) -> int:
+        return len( self.uid )
+
+    def __getitem__( self, index: Union[ int, torch.Tensor, slice ] ) -> Union[ Endpoint, 'EndpointColumns' ]:
+        if isinstance( index, int ) or ( isinstance( index, torch.Tensor ) and index.dim() == 0 ):
+            index = int( index )
+            if self._objects[ index ] == None:
+                self._objects[ index ] = Endpoint(
+                    version = int( self.version[ index ] ),
+                    uid = int( self.uid[ index ] ),
+                    hotkey = _decode_keys( self.hotkey[ index: index + 1 ] )[0],
+                    ip = int.from_bytes( bytes( self.ip[ index ].tolist() ), 'big' ),
+                    ip_type = int( self.ip_type[ index ] ),
+                    port = int( self.port[ index ] ),
+                    modality = int( self.modality[ index ] ),
+                    coldkey = _decode_keys( self.coldkey[ index: index + 1 ] )[0],
+                )
+            return self._objects[ index ]
+        if isinstance( index, torch.Tensor ):
+            index = index.to( self.uid.device )
+        return EndpointColumns( { field: getattr( self, field ).data[ index ] for field in FIELDS } )
+
+    def __iter__( self ) -> Iterator[Endpoint]:
+        for index in range( len(self) ):
+            yield self[ index ]
+
+    def objects( self ) -> List[Endpoint]:
+        r""" Returns the Endpoint of each row.
+        """
+        return list( self )
+
+    def hotkeys( self ) -> List[str]:
+        return _decode_keys( self.hotkey.data )
+
+    def coldkeys( self ) -> List[str]:
+        return _decode_keys( self.coldkey.data )
+
+    def serving_mask( self ) -> torch.BoolTensor:
+        r""" Returns True for rows which hold an endpoint.
+        """
+        empty = torch.ones( len(self), dtype = torch.bool )
+        for field in INT_FIELDS:
+            empty &= getattr( self, field ).data == DUMMY[field]
+        for field in ( 'ip', 'hotkey', 'coldkey' ):
+            empty &= ( getattr( self, field ).data == 0 ).all( dim = 1 )
+        return ~empty
+
+    def reuse( self, previous: 'EndpointColumns' ) -> 'EndpointColumns':
+        r""" Takes over the built Endpoint objects of the rows which are unchanged from previous.
+        """
+        rows = min( len(self), len(previous) )
+        same = torch.ones( rows, dtype = torch.bool )
+        for field in INT_FIELDS:
+            same &= getattr( self, field ).data[ :rows ] == getattr( previous, field ).data[ :rows ]
+        for field in ( 'ip', 'hotkey', 'coldkey' ):
+            same &= ( getattr( self, field ).data[ :rows ] == getattr( previous, field ).data[ :rows ] ).all( dim = 1 )
+        for index in torch.nonzero( same ).flatten().tolist():
+            self._objects[ index ] = previous._objects[ index ]
+        return self
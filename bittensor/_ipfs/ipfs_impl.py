@@ -1,4 +1,7 @@
 
+import json
+import os
+
 from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.util.retry import Retry
 import requests
@@ -6,12 +9,25 @@ import requests
 class Ipfs():
     """ Implementation for the dataset class, which handles dataloading from ipfs
     """
-    def __init__(self):
-        
+    def __init__(self, api: str = None, cache_dir: str = None):
+        r""" Initializes the ipfs api endpoints.
+            Args:
+                api (:type:`str`, `optional`):
+                    ipfs http api root, defaults to $BT_IPFS_API or the opentensor node.
+                cache_dir (:type:`str`, `optional`):
+                    directory of the local content addressed cache, defaults to $BT_IPFS_CACHE_DIR or ~/.bittensor/ipfs.
+        """
+        if api == None:
+            api = os.getenv('BT_IPFS_API') if os.getenv('BT_IPFS_API') != None else 'http://ipfs.opentensor.ai/api/v0'
+        if cache_dir == None:
+            cache_dir = os.getenv('BT_IPFS_CACHE_DIR') if os.getenv('BT_IPFS_CACHE_DIR') != None else '~/.bittensor/ipfs'
+        self.api = api.rstrip('/')
+        self.cache_dir = os.path.expanduser( cache_dir )
+
         # Used to retrieve directory contentx
-        self.cat = 'http://ipfs.opentensor.ai/api/v0/cat' 
-        self.node_get = 'http://ipfs.opentensor.ai/api/v0/object/get'
-        self.ipns_resolve = 'http://ipfs.opentensor.ai/api/v0/name/resolve'
+        self.cat = self.api + '/cat' 
+        self.node_get = self.api + '/object/get'
+        self.ipns_resolve = self.api + '/name/resolve'
 
         self.mountain_hash = 'QmSdDg6V9dgpdAFtActs75Qfc36qJtm9y8a7yrQ1rHm7ZX'
         self.latest_neurons_ipns = "k51qzi5uqu5di1eoe0o91g32tbfsgikva6mvz0jw0414zhxzhiakana67shoh7"
@@ -65,4 +81,10 @@ class Ipfs():
             response = Ipfs.requests_retry_session(session=session).get(address)
         elif action == 'post':
             response = Ipfs.requests_retry_session(session=session).post(address)
-        return response
\ No newline at end of file
+        return response
+
+    def resolve(self, ipns_hash: str) -> str:
+        r""" Resolves an ipns name to the ipfs hash it currently points to.
+        """
+        response = self.retrieve_directory(self.ipns_resolve, (('arg', ipns_hash),))
+        return json.loads(response.text)['Path'].split('ipfs/')[1]
@@ -22,6 +22,7 @@ import argparse
 import copy
 
 import bittensor
+from . import archive_impl
 from . import metagraph_impl
 
 class metagraph:
@@ -34,6 +35,10 @@ class metagraph:
             subtensor: 'bittensor.Subtensor' = None,
             network: str = None,
             chain_endpoint: str = None,
+            sparse: bool = False,
+            archive: str = None,
+            share: str = None,
+            attach: str = None,
         ) -> 'bittensor.Metagraph':
         r""" Creates a new bittensor.Metagraph object from passed arguments.
             Args:
@@ -50,13 +55,30 @@ class metagraph:
                     an entry point node from that network.
                 chain_endpoint (default=None, type=str)
                     The subtensor endpoint flag. If set, overrides the network argument.
+                sparse (default=False, type=bool)
+                    If True, weights and bonds are held as sparse coo tensors.
+                archive (default=None, type=str)
+                    Directory of a local archive of synced blocks, syncs to archived blocks are served from it.
+                share (default=None, type=str)
+                    If set, the metagraph is published in shared memory under this name after each sync,
+                    for the other neurons on the host to attach to.
+                attach (default=None, type=str)
+                    If set, returns a read-only metagraph attached to the shared memory metagraph of this name,
+                    which follows the publishing process instead of querying the chain.
         """      
+        if attach != None:
+            return metagraph_impl.Metagraph.attach( attach, sparse = sparse )
         if config == None: 
             config = metagraph.config()
         config = copy.deepcopy(config)
         if subtensor == None:
             subtensor = bittensor.subtensor( network = network, chain_endpoint = chain_endpoint )
-        return metagraph_impl.Metagraph( subtensor = subtensor )
+        if archive != None:
+            archive = archive_impl.MetagraphArchive( archive )
+        graph = metagraph_impl.Metagraph( subtensor = subtensor, sparse = sparse, archive = archive )
+        if share != None:
+            graph.share( share )
+        return graph
 
     @classmethod   
     def config(cls) -> 'bittensor.Config':
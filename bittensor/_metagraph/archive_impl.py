@@ -0,0 +1,202 @@
+""" Local archive of historical metagraph neurons, stored as base snapshots plus per block deltas.
+"""
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import bisect
+import os
+import re
+import threading
+from typing import Dict, Iterator, List, Tuple
+
+import numpy
+
+from bittensor._subtensor.neuron_impl import NeuronBatch
+
+BASE_FILE = re.compile( r'^base-(\d+)\.npz$' )
+DELTA_FILE = re.compile( r'^delta-(\d+)-(\d+)\.npz$' )
+
+def _rows_equal( counts_a: numpy.ndarray, pairs_a: numpy.ndarray, rows_a: numpy.ndarray, counts_b: numpy.ndarray, pairs_b: numpy.ndarray, rows_b: numpy.ndarray ) -> numpy.ndarray:
+    r""" Returns for each (rows_a[i], rows_b[i]) whether the stacked (uid, value) pairs of the two rows are equal.
+    """
+    lengths_a = counts_a[ rows_a ]
+    equal = lengths_a == counts_b[ rows_b ]
+    check = equal & ( lengths_a > 0 )
+    lengths = lengths_a[ check ]
+    total = int( lengths.sum() )
+    if total == 0:
+        return equal
+    starts = numpy.cumsum( lengths ) - lengths
+    offsets = numpy.arange( total ) - numpy.repeat( starts, lengths )
+    index_a = numpy.repeat( ( numpy.cumsum( counts_a ) - counts_a )[ rows_a[ check ] ], lengths ) + offsets
+    index_b = numpy.repeat( ( numpy.cumsum( counts_b ) - counts_b )[ rows_b[ check ] ], lengths ) + offsets
+    same = ( pairs_a[ index_a ] == pairs_b[ index_b ] ).all( axis = 1 )
+    equal[ check ] = numpy.logical_and.reduceat( same, starts )
+    return equal
+
+def changed_neurons( base: Dict[ str, numpy.ndarray ], columns: Dict[ str, numpy.ndarray ] ) -> numpy.ndarray:
+    r""" Returns a mask over the neurons of columns which are new or differ in any field from the neuron with the same uid in base.
+        Args:
+            base (:obj:`Dict[str, numpy.ndarray]`, `required`):
+                NeuronBatch.to_columns of the reference neurons.
+            columns (:obj:`Dict[str, numpy.ndarray]`, `required`):
+                NeuronBatch.to_columns of the compared neurons.
+        Returns:
+            changed (:obj:`numpy.ndarray` of shape :obj:`(len(columns['uid']))`):
+                True for neurons which must be stored in a delta.
+    """
+    uids = columns['uid']
+    position = numpy.full( max( int( base['uid'].max( initial = -1 ) ), int( uids.max( initial = -1 ) ) ) + 1, -1, dtype = numpy.int64 )
+    position[ base['uid'] ] = numpy.arange( len( base['uid'] ) )
+    rows_base = position[ uids ]
+    changed = rows_base == -1
+    rows = numpy.flatnonzero( ~changed )
+    rows_base = rows_base[ rows ]
+    equal = numpy.ones( len(rows), dtype = bool )
+    for field in NeuronBatch.int_fields + NeuronBatch.float_fields + ( 'is_null', 'ip', 'hotkey', 'coldkey' ):
+        equal &= columns[field][ rows ] == base[field][ rows_base ]
+    for field in ( 'weights', 'bonds' ):
+        equal &= _rows_equal( columns[ field + '_counts' ], columns[ field + '_pairs' ], rows, base[ field + '_counts' ], base[ field + '_pairs' ], rows_base )
+    changed[ rows ] = ~equal
+    return changed
+
+def _concat( batches: List[NeuronBatch] ) -> NeuronBatch:
+    return NeuronBatch( **{ field: numpy.concatenate( [ getattr( batch, field ) for batch in batches ] ) for field in NeuronBatch.__slots__ } )
+
+class MetagraphArchive():
+    r""" Stores the neurons of synced blocks in a directory. A block is stored either as a base holding every neuron,
+        or as a delta holding the neurons which differ from the nearest earlier base, so any archived block is
+        rebuilt from one base and one delta. A new base is written once the base is base_interval blocks old, or
+        when more than max_delta_fraction of the neurons changed. Blocks can be recorded in any order.
+        Files hold fixed dtype arrays only and are read without unpickling. An archive may be shared between
+        threads, for instance by a metagraph and the copy synced in the background.
+    """
+    def __init__( self, path: str, base_interval: int = 100, max_delta_fraction: float = 0.5 ):
+        r""" Opens or creates an archive.
+            Args:
+                path (:type:`str`, `required`):
+                    archive directory.
+                base_interval (:type:`int`, `optional`):
+                    maximum number of blocks between a delta and its base.
+                max_delta_fraction (:type:`float`, `optional`):
+                    fraction of changed neurons above which a block is stored as a base.
+        """
+        self.path = os.path.expanduser( path )
+        self.base_interval = base_interval
+        self.max_delta_fraction = max_delta_fraction
+        os.makedirs( self.path, exist_ok = True )
+        self.bases = []
+        self.deltas = {}
+        for filename in os.listdir( self.path ):
+            match = BASE_FILE.match( filename )
+            if match:
+                self.bases.append( int( match.group(1) ) )
+            match = DELTA_FILE.match( filename )
+            if match:
+                self.deltas[ int( match.group(1) ) ] = int( match.group(2) )
+        self.bases.sort()
+        # The last read base, a range scan reuses it for each of its deltas.
+        self._base = ( None, None, None )
+        self._lock = threading.RLock()
+
+    def __contains__( self, block: int ) -> bool:
+        with self._lock:
+            return block in self.deltas or self._is_base( block )
+
+    def __len__( self ) -> int:
+        with self._lock:
+            return len( self.bases ) + len( self.deltas )
+
+    def _is_base( self, block: int ) -> bool:
+        index = bisect.bisect_left( self.bases, block )
+        return index < len( self.bases ) and self.bases[ index ] == block
+
+    def blocks( self, start_block: int = None, end_block: int = None ) -> List[int]:
+        r""" Returns the archived blocks in [start_block, end_block], in order.
+        """
+        with self._lock:
+            blocks = sorted( self.bases + list( self.deltas.keys() ) )
+        return [ block for block in blocks if ( start_block == None or block >= start_block ) and ( end_block == None or block <= end_block ) ]
+
+    def _write( self, filename: str, columns: Dict[ str, numpy.ndarray ] ):
+        staging = os.path.join( self.path, '.' + filename )
+        with open( staging, 'wb' ) as f:
+            numpy.savez( f, **columns )
+        os.replace( staging, os.path.join( self.path, filename ) )
+
+    def _read( self, filename: str ) -> Dict[ str, numpy.ndarray ]:
+        with numpy.load( os.path.join( self.path, filename ), allow_pickle = False ) as npz:
+            return dict( npz )
+
+    def _read_base( self, block: int ) -> Tuple[ Dict[ str, numpy.ndarray ], NeuronBatch ]:
+        if self._base[0] != block:
+            columns = self._read( 'base-{}.npz'.format( block ) )
+            self._base = ( block, columns, NeuronBatch.from_columns( columns ) )
+        return self._base[1], self._base[2]
+
+    def record( self, block: int, neurons: NeuronBatch ):
+        r""" Archives the neurons of a block, blocks already in the archive are left as they are.
+            Args:
+                block (:type:`int`, `required`):
+                    block the neurons were pulled at.
+                neurons (:obj:`NeuronBatch`, `required`):
+                    the neurons at block.
+        """
+        with self._lock:
+            if block in self:
+                return
+            columns = neurons.to_columns()
+            index = bisect.bisect_right( self.bases, block ) - 1
+            base_block = self.bases[ index ] if index >= 0 else None
+            if base_block != None and block - base_block < self.base_interval:
+                base_columns, _ = self._read_base( base_block )
+                changed = changed_neurons( base_columns, columns )
+                if changed.sum() <= self.max_delta_fraction * len( neurons ):
+                    delta = neurons[ changed ].to_columns()
+                    delta['removed'] = numpy.setdiff1d( base_columns['uid'], columns['uid'] )
+                    self._write( 'delta-{}-{}.npz'.format( block, base_block ), delta )
+                    self.deltas[ block ] = base_block
+                    return
+            self._write( 'base-{}.npz'.format( block ), columns )
+            bisect.insort( self.bases, block )
+
+    def get( self, block: int ) -> NeuronBatch:
+        r""" Rebuilds the neurons of an archived block.
+            Args:
+                block (:type:`int`, `required`):
+                    archived block.
+            Returns:
+                neurons (:obj:`NeuronBatch`):
+                    the neurons at block ordered by uid.
+        """
+        with self._lock:
+            if self._is_base( block ):
+                return self._read_base( block )[1]
+            if block not in self.deltas:
+                raise KeyError('Block {} is not in the metagraph archive'.format( block ))
+            _, base = self._read_base( self.deltas[ block ] )
+            columns = self._read( 'delta-{}-{}.npz'.format( block, self.deltas[ block ] ) )
+            delta = NeuronBatch.from_columns( columns )
+        kept = base[ ~numpy.isin( base.uid, numpy.concatenate( [ delta.uid, columns['removed'] ] ) ) ]
+        neurons = _concat( [ kept, delta ] )
+        return neurons[ numpy.argsort( neurons.uid, kind = 'stable' ) ]
+
+    def iterate( self, start_block: int = None, end_block: int = None ) -> Iterator[ Tuple[ int, NeuronBatch ] ]:
+        r""" Yields ( block, neurons ) for each archived block in [start_block, end_block], in order.
+        """
+        for block in self.blocks( start_block, end_block ):
+            yield block, self.get( block )
@@ -0,0 +1,109 @@
+""" Metagraph syncs run on a background thread and swapped in between training steps.
+"""
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import threading
+from typing import Optional
+
+from loguru import logger
+
+class BackgroundSync():
+    r""" Double buffered metagraph sync. start() syncs a copy of the current metagraph on a background thread,
+        while the training loop and axon callbacks keep reading the current one. swap() hands over the synced copy
+        once it is complete, so callers swap at a safe point, e.g. between steps, and never see a partially updated
+        state. Subscribers and shared memory publishing move to the synced copy, and subscribers are notified from
+        swap(), on the caller's thread.
+    """
+    def __init__( self, metagraph: 'bittensor.Metagraph', subtensor: 'bittensor.Subtensor' = None, save: bool = False ):
+        r""" Initializes the background sync.
+            Args:
+                metagraph (:obj:`bittensor.Metagraph`, `required`):
+                    the current metagraph.
+                subtensor (:obj:`bittensor.Subtensor`, `optional`):
+                    chain connection used by the background syncs, defaults to the metagraph subtensor.
+                    Pass a separate connection if the caller queries the chain while a sync runs.
+                save (:type:`bool`, `optional`):
+                    If True, synced copies are saved on the background thread as well.
+        """
+        self.metagraph = metagraph
+        self.subtensor = subtensor
+        self.save = save
+        self._thread = None
+        self._synced = None
+        self._error = None
+
+    def running( self ) -> bool:
+        r""" Returns True while a sync runs.
+        """
+        return self._thread != None and self._thread.is_alive()
+
+    def ready( self ) -> bool:
+        r""" Returns True once a started sync finished and can be swapped in.
+        """
+        return self._thread != None and not self._thread.is_alive()
+
+    def start( self, **sync_kwargs ) -> bool:
+        r""" Starts syncing a copy of the current metagraph.
+            Args:
+                sync_kwargs:
+                    arguments passed to Metagraph.sync.
+            Returns:
+                started (:type:`bool`):
+                    False if a sync is still running or waits to be swapped in.
+        """
+        if self._thread != None:
+            return False
+        synced = self.metagraph.copy()
+        if self.subtensor != None:
+            synced.subtensor = self.subtensor
+        self._synced = None
+        self._error = None
+        self._thread = threading.Thread( target = self._run, args = ( synced, sync_kwargs ), daemon = True )
+        self._thread.start()
+        return True
+
+    def _run( self, synced: 'bittensor.Metagraph', sync_kwargs: dict ):
+        try:
+            synced.sync( **sync_kwargs )
+            if self.save:
+                synced.save()
+            self._synced = synced
+        except Exception as e:
+            self._error = e
+
+    def swap( self, wait: bool = False ) -> Optional['bittensor.Metagraph']:
+        r""" Returns the synced metagraph if a sync finished, which becomes the current metagraph, else None.
+            Args:
+                wait (:type:`bool`, `optional`):
+                    If True, blocks until a running sync finishes.
+            Returns:
+                metagraph (:obj:`bittensor.Metagraph`):
+                    the synced metagraph, None if no sync finished or it failed.
+        """
+        if self._thread == None or ( self._thread.is_alive() and not wait ):
+            return None
+        self._thread.join()
+        self._thread = None
+        if self._error != None:
+            logger.error('Background metagraph sync failed: {}', self._error)
+            return None
+        synced = self._synced
+        synced.subtensor = self.metagraph.subtensor
+        self.metagraph.hand_over( synced )
+        self.metagraph = synced
+        return synced
@@ -0,0 +1,140 @@
+""" Structured differences between consecutive metagraph states.
+"""
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+from types import SimpleNamespace
+
+import torch
+
+from bittensor._endpoint.endpoint_columns_impl import EndpointColumns
+
+# Endpoint columns which move a neuron to a new address, without a new hotkey.
+ADDRESS_FIELDS = ( 'version', 'ip', 'ip_type', 'port', 'modality' )
+
+def _uids( mask: torch.BoolTensor ) -> torch.LongTensor:
+    return torch.nonzero( mask ).flatten()
+
+def _rows_differ( new: torch.Tensor, old: torch.Tensor ) -> torch.BoolTensor:
+    differ = new != old
+    return differ.any( dim = 1 ) if differ.dim() > 1 else differ
+
+def snapshot( metagraph ) -> SimpleNamespace:
+    r""" Returns references to the metagraph state a diff is computed against. Syncs replace these tensors
+        rather than writing into them, so no copy is needed.
+    """
+    return SimpleNamespace(
+        n = metagraph.n.item(),
+        block = metagraph.block.item(),
+        stake = metagraph.stake.data,
+        active = metagraph.active.data,
+        endpoints = metagraph.endpoints,
+    )
+
+class MetagraphChanges():
+    r""" Differences between two metagraph states, as uid tensors, so consumers can update in O(changes).
+        Uids which exist in both states are compared, uids past the previous n are reported as new only.
+
+        Attributes:
+            block (:type:`int`):
+                block of the new state.
+            previous_block (:type:`int`):
+                block of the previous state.
+            n (:type:`int`):
+                number of uids in the new state.
+            previous_n (:type:`int`):
+                number of uids in the previous state.
+            new_uids (:obj:`torch.LongTensor`):
+                uids which did not exist in the previous state.
+            removed_uids (:obj:`torch.LongTensor`):
+                uids which no longer exist.
+            hotkey_changed (:obj:`torch.LongTensor`):
+                uids registered to a new hotkey.
+            endpoint_changed (:obj:`torch.LongTensor`):
+                uids with the same hotkey serving at a new ip, port, ip type, modality or version.
+            stake_changed (:obj:`torch.LongTensor`):
+                uids whose stake changed.
+            stake_delta (:obj:`torch.FloatTensor`):
+                stake change of each of stake_changed.
+            activated (:obj:`torch.LongTensor`):
+                uids which became active.
+            deactivated (:obj:`torch.LongTensor`):
+                uids which became inactive.
+            previous_endpoints (:obj:`bittensor.EndpointColumns`):
+                endpoints of the previous state, e.g. the old hotkeys of hotkey_changed.
+    """
+    def __init__( self, previous: SimpleNamespace, metagraph ):
+        r""" Compares the current state of metagraph with a snapshot of its previous state.
+        """
+        self.block = metagraph.block.item()
+        self.previous_block = previous.block
+        self.n = metagraph.n.item()
+        self.previous_n = previous.n
+        self.previous_endpoints = previous.endpoints
+        common = min( self.n, self.previous_n )
+
+        self.new_uids = torch.arange( common, self.n, dtype = torch.int64 )
+        self.removed_uids = torch.arange( common, self.previous_n, dtype = torch.int64 )
+
+        endpoints = metagraph.endpoints
+        if common > 0 and isinstance( endpoints, EndpointColumns ) and isinstance( previous.endpoints, EndpointColumns ):
+            hotkey_changed = _rows_differ( endpoints.hotkey.data[ :common ], previous.endpoints.hotkey.data[ :common ] )
+            address_changed = torch.zeros( common, dtype = torch.bool )
+            for field in ADDRESS_FIELDS:
+                address_changed |= _rows_differ( getattr( endpoints, field ).data[ :common ], getattr( previous.endpoints, field ).data[ :common ] )
+            self.hotkey_changed = _uids( hotkey_changed )
+            self.endpoint_changed = _uids( address_changed & ~hotkey_changed )
+        else:
+            self.hotkey_changed = torch.tensor( [], dtype = torch.int64 )
+            self.endpoint_changed = torch.tensor( [], dtype = torch.int64 )
+
+        stake = metagraph.stake.data
+        if common > 0 and len( stake ) >= common and len( previous.stake ) >= common:
+            delta = stake[ :common ] - previous.stake[ :common ]
+            self.stake_changed = _uids( delta != 0 )
+            self.stake_delta = delta[ self.stake_changed ]
+        else:
+            self.stake_changed = torch.tensor( [], dtype = torch.int64 )
+            self.stake_delta = torch.tensor( [], dtype = torch.float32 )
+
+        active = metagraph.active.data
+        if common > 0 and len( active ) >= common and len( previous.active ) >= common:
+            now_active = active[ :common ] > 0
+            was_active = previous.active[ :common ] > 0
+            self.activated = _uids( now_active & ~was_active )
+            self.deactivated = _uids( was_active & ~now_active )
+        else:
+            self.activated = torch.tensor( [], dtype = torch.int64 )
+            self.deactivated = torch.tensor( [], dtype = torch.int64 )
+
+    def stake_changed_above( self, threshold: float ) -> torch.LongTensor:
+        r""" Returns the uids whose stake changed by more than threshold tao.
+        """
+        return self.stake_changed[ self.stake_delta.abs() > threshold ]
+
+    def is_empty( self ) -> bool:
+        r""" Returns True if nothing changed.
+        """
+        return all( len( uids ) == 0 for uids in [ self.new_uids, self.removed_uids, self.hotkey_changed, self.endpoint_changed, self.stake_changed, self.activated, self.deactivated ] )
+
+    def __str__( self ):
+        return "MetagraphChanges(block: {} -> {}, n: {} -> {}, new: {}, removed: {}, hotkey: {}, endpoint: {}, stake: {}, activated: {}, deactivated: {})".format(
+            self.previous_block, self.block, self.previous_n, self.n, len( self.new_uids ), len( self.removed_uids ), len( self.hotkey_changed ),
+            len( self.endpoint_changed ), len( self.stake_changed ), len( self.activated ), len( self.deactivated ) )
+
+    def __repr__( self ):
+        return self.__str__()
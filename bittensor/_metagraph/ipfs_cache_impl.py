@@ -0,0 +1,133 @@
+""" Safe decoding and content addressed local caching of the neurons published to IPFS.
+"""
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import io
+import json
+import os
+import pickle
+import re
+from typing import Dict, Optional
+
+import numpy
+
+from bittensor._subtensor.neuron_impl import NeuronBatch
+
+# Content hashes are used as file names, anything else is not cached.
+CONTENT_HASH = re.compile( r'^[A-Za-z0-9]+$' )
+NPZ_MAGIC = b'PK'
+
+class NeuronUnpickler( pickle.Unpickler ):
+    r""" Unpickler which only constructs the types a published neuron list is made of,
+        any other global in the payload raises an UnpicklingError instead of being imported.
+        NeuronBatch payloads are read from pickle protocol 3 and above, which create the batch without
+        a copyreg reconstructor, protocol 5 stores its arrays as buffers.
+    """
+    allowed = {
+        ( 'types', 'SimpleNamespace' ),
+        ( 'bittensor._subtensor.neuron_impl', 'Neuron' ),
+        ( 'bittensor._subtensor.neuron_impl', 'NeuronBatch' ),
+        ( 'numpy', 'ndarray' ),
+        ( 'numpy', 'dtype' ),
+        ( 'numpy.core.multiarray', '_reconstruct' ),
+        ( 'numpy._core.multiarray', '_reconstruct' ),
+        ( 'numpy.core.numeric', '_frombuffer' ),
+        ( 'numpy._core.numeric', '_frombuffer' ),
+    }
+
+    def find_class( self, module: str, name: str ):
+        if ( module, name ) not in NeuronUnpickler.allowed:
+            raise pickle.UnpicklingError( 'Global {}.{} is not allowed in a neuron payload'.format( module, name ) )
+        return super().find_class( module, name )
+
+def decode_neurons( payload: bytes ) -> NeuronBatch:
+    r""" Decodes a published neuron payload, either an npz of NeuronBatch.to_columns arrays or a pickled list of neurons.
+        Args:
+            payload (:type:`bytes`, `required`):
+                the ipfs content.
+        Returns:
+            neurons (:obj:`NeuronBatch`):
+                the decoded neurons.
+    """
+    if payload[ :len(NPZ_MAGIC) ] == NPZ_MAGIC:
+        with numpy.load( io.BytesIO( payload ), allow_pickle = False ) as npz:
+            return NeuronBatch.from_columns( dict( npz ) )
+    neurons = NeuronUnpickler( io.BytesIO( payload ) ).load()
+    return neurons if isinstance( neurons, NeuronBatch ) else NeuronBatch.from_neurons( neurons )
+
+class NeuronCache():
+    r""" Local cache of decoded neuron payloads keyed by their ipfs content hash. Content under a hash never changes,
+        so a hit needs no download and entries are only dropped, least recently used first, past max_entries.
+        Entries are stored as npz columns and read without unpickling.
+    """
+    def __init__( self, cache_dir: str, max_entries: int = 16 ):
+        self.cache_dir = os.path.expanduser( cache_dir )
+        self.max_entries = max_entries
+        os.makedirs( self.cache_dir, exist_ok = True )
+
+    def _path( self, content_hash: str, suffix: str ) -> Optional[str]:
+        if not CONTENT_HASH.match( content_hash ):
+            return None
+        return os.path.join( self.cache_dir, content_hash + suffix )
+
+    def _write( self, path: str, write ):
+        staging = path + '.tmp-{}'.format( os.getpid() )
+        with open( staging, 'wb' ) as f:
+            write( f )
+        os.replace( staging, path )
+        self._prune()
+
+    def _prune( self ):
+        entries = [ os.path.join( self.cache_dir, filename ) for filename in os.listdir( self.cache_dir ) if '.tmp-' not in filename ]
+        entries.sort( key = os.path.getmtime )
+        for path in entries[ :max( len(entries) - self.max_entries, 0 ) ]:
+            os.remove( path )
+
+    def get( self, content_hash: str ) -> Optional[NeuronBatch]:
+        r""" Returns the cached neurons of a content hash, or None.
+        """
+        path = self._path( content_hash, '.npz' )
+        if path == None or not os.path.isfile( path ):
+            return None
+        os.utime( path )
+        with numpy.load( path, allow_pickle = False ) as npz:
+            return NeuronBatch.from_columns( dict( npz ) )
+
+    def put( self, content_hash: str, neurons: NeuronBatch ):
+        r""" Caches the neurons of a content hash.
+        """
+        path = self._path( content_hash, '.npz' )
+        if path != None:
+            self._write( path, lambda f: numpy.savez( f, **neurons.to_columns() ) )
+
+    def get_links( self, content_hash: str ) -> Optional[ Dict[ str, str ] ]:
+        r""" Returns the cached name to hash links of an ipfs directory, or None.
+        """
+        path = self._path( content_hash, '.links.json' )
+        if path == None or not os.path.isfile( path ):
+            return None
+        os.utime( path )
+        with open( path ) as f:
+            return json.load( f )
+
+    def put_links( self, content_hash: str, links: Dict[ str, str ] ):
+        r""" Caches the name to hash links of an ipfs directory.
+        """
+        path = self._path( content_hash, '.links.json' )
+        if path != None:
+            self._write( path, lambda f: f.write( json.dumps( links ).encode() ) )
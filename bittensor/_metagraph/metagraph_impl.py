@@ -19,19 +19,26 @@
 
 import os
 
-from typing import List
+from types import SimpleNamespace
+from typing import Callable, Iterator, List, Dict
 from loguru import logger
 
-import ast
+import numpy
 import pandas
 import torch.nn.functional as f
 import torch
-import pickle
 import json
 
 import bittensor
 import bittensor.utils.networking as net
 import bittensor.utils.weight_utils as weight_utils
+from bittensor._endpoint.endpoint_columns_impl import EndpointColumns
+from bittensor._subtensor.neuron_impl import NeuronBatch
+from . import archive_impl
+from . import changes_impl
+from . import ipfs_cache_impl
+from . import shared_impl
+from . import snapshot_impl
 
 RAOPERTAO = 1000000000
 U64MAX = 18446744073709551615
@@ -56,17 +63,34 @@ class Metagraph( torch.nn.Module ):
                 Last emission call for each neuron ordered by uid.
 
             weights (:obj:`torch.FloatTensor` of shape :obj:`(metagraph.n, metagraph.n)`):
-                Full weight matrix on chain ordered by uid.
+                Full weight matrix on chain ordered by uid, a sparse coo tensor if the metagraph is sparse.
 
-            neurons (:obj:`torch.LongTensor` of shape :obj:`(metagraph.n, -1)`) 
-                Tokenized endpoint information.
+            bonds (:obj:`torch.FloatTensor` of shape :obj:`(metagraph.n, metagraph.n)`):
+                Normalized bond matrix ordered by uid, a sparse coo tensor if the metagraph is sparse.
+
+            endpoints (:obj:`bittensor.EndpointColumns` of length :obj:`(metagraph.n)`)
+                Endpoint information held as typed columns, indexing a uid returns its bittensor.Endpoint.
 
     """
-    def __init__( self, subtensor ):
+    def __init__( self, subtensor, sparse: bool = False, archive: 'archive_impl.MetagraphArchive' = None ):
         r""" Initializes a new Metagraph torch chain interface object.
+            Args:
+                subtensor (:obj:`bittensor.Subtensor`, `required`):
+                    bittensor subtensor chain connection.
+                sparse (:type:`bool`, `optional`):
+                    If True, weights and bonds are held as sparse coo tensors, scaling with their non-zeros rather than n^2.
+                archive (:obj:`MetagraphArchive`, `optional`):
+                    If set, synced blocks are recorded in the archive and syncs to archived blocks are served from it.
         """
         super(Metagraph, self).__init__()
         self.subtensor = subtensor
+        self.sparse = sparse
+        self.archive = archive
+        # Shared memory writer when this metagraph is shared, reader when it is attached to a shared metagraph.
+        self._shared = None
+        # Callbacks passed the MetagraphChanges of each new state.
+        self._subscribers = []
+        self.last_changes = None
         self.clear()
 
     def clear( self ) -> 'Metagraph':
@@ -87,9 +111,9 @@ class Metagraph( torch.nn.Module ):
         self.last_update = torch.nn.Parameter(  torch.tensor( [], dtype=torch.int64), requires_grad=False )
         self.weights = torch.nn.Parameter(  torch.tensor( [], dtype=torch.float32), requires_grad=False )
         self.bonds = torch.nn.Parameter(  torch.tensor( [], dtype=torch.int64), requires_grad=False )
-        self.endpoints = torch.nn.Parameter( torch.tensor( [], dtype=torch.int64), requires_grad=False )
+        self.endpoints = EndpointColumns.empty( 0 )
         self.uids = torch.nn.Parameter( torch.tensor([], dtype = torch.int64),requires_grad=False )
-        self._endpoint_objs = None
+        self._views = None
         return self
 
     def forward (
@@ -128,7 +152,7 @@ class Metagraph( torch.nn.Module ):
         if uid >= self.n.item():
             raise ValueError('Passed uid does not exist in the graph. Got {} > {}', uid, self.n.item())
 
-        weight = self.W.detach().clone()
+        weight = self.W.detach().to_dense() if self.W.is_sparse else self.W.detach().clone()
         weight[uid,:] = row_weight
         
         # Compute ranks.
@@ -160,7 +184,7 @@ class Metagraph( torch.nn.Module ):
         print (Inflation)
 
         # Compute bonds.
-        B = self.B.detach().clone().float()
+        B = self.B.detach().to_dense().float() if self.B.is_sparse else self.B.detach().clone().float()
         B_norm = f.normalize(B, p=1, dim=1)
         print (B_norm)
 
@@ -215,16 +239,67 @@ class Metagraph( torch.nn.Module ):
 
     @property
     def B(self) -> torch.FloatTensor:
-        """ Bonds
+        """ Bonds, sparse coo if the metagraph is sparse.
         """
         return self.bonds
     
     @property
     def W(self) -> torch.FloatTensor:
-        """ Weights
+        """ Weights, sparse coo if the metagraph is sparse.
         """
         return self.weights
 
+    def _to_layout( self, tensor: torch.Tensor ) -> torch.Tensor:
+        r""" Converts a loaded weight or bond matrix to the sparse or dense layout of this metagraph.
+        """
+        if self.sparse and not tensor.is_sparse:
+            return tensor.to_sparse().coalesce()
+        if not self.sparse and tensor.is_sparse:
+            return tensor.to_dense()
+        return tensor
+
+    @property
+    def views( self ) -> SimpleNamespace:
+        r""" Returns the views derived from the metagraph state, built once per sync or load.
+            The views are replaced as a whole, so a reference taken by the caller stays consistent.
+            Returns:
+                views (:obj:`SimpleNamespace`):
+                    hotkeys, coldkeys, hotkey_index, coldkey_index, active_uids, serving_mask and stake_order.
+        """
+        views = self._views
+        if views == None:
+            views = self._build_views()
+            self._views = views
+        return views
+
+    def _build_views( self ) -> SimpleNamespace:
+        r""" Builds the derived views of the current metagraph state.
+        """
+        hotkeys = []
+        coldkeys = []
+        hotkey_index = {}
+        coldkey_index = {}
+        serving = []
+        if self.n.item() > 0:
+            # Keys are decoded straight from the columns, no endpoint objects are built.
+            serving = self.endpoints.serving_mask().tolist()
+            for uid, ( is_serving, hotkey, coldkey ) in enumerate( zip( serving, self.endpoints.hotkeys(), self.endpoints.coldkeys() ) ):
+                hotkeys.append( hotkey if is_serving else '' )
+                coldkeys.append( coldkey if is_serving else '' )
+                if is_serving:
+                    # First uid wins, matching hotkeys.index.
+                    hotkey_index.setdefault( hotkey, uid )
+                    coldkey_index.setdefault( coldkey, [] ).append( uid )
+        return SimpleNamespace(
+            hotkeys = hotkeys,
+            coldkeys = coldkeys,
+            hotkey_index = hotkey_index,
+            coldkey_index = coldkey_index,
+            active_uids = torch.nonzero( self.active.data > 0 ).flatten() if self.active.numel() > 0 else torch.tensor( [], dtype = torch.int64 ),
+            serving_mask = torch.tensor( serving, dtype = torch.bool ),
+            stake_order = torch.argsort( self.stake.data, descending = True ),
+        )
+
     @property
     def hotkeys( self ) -> List[str]:
         r""" Returns hotkeys for each neuron.
@@ -232,9 +307,7 @@ class Metagraph( torch.nn.Module ):
                 hotkeys (:obj:`List[str] of shape :obj:`(metagraph.n)`):
                     Neuron hotkeys.
         """
-        if self.n.item() == 0:
-            return []
-        return [ neuron.hotkey if neuron != bittensor.endpoint.dummy() else '' for neuron in self.endpoint_objs ]
+        return self.views.hotkeys
 
     @property
     def coldkeys( self ) -> List[str]:
@@ -243,9 +316,52 @@ class Metagraph( torch.nn.Module ):
                 coldkeys (:obj:`List[str] of shape :obj:`(metagraph.n)`):
                     Neuron coldkeys.
         """
-        if self.n.item() == 0:
-            return []
-        return [ neuron.coldkey if neuron != bittensor.endpoint.dummy() else '' for neuron in self.endpoint_objs ]
+        return self.views.coldkeys
+
+    @property
+    def hotkey_index( self ) -> Dict[str, int]:
+        r""" Returns a map from each serving hotkey to its uid.
+            Returns:
+                hotkey_index (:obj:`Dict[str, int]`):
+                    uid of each hotkey.
+        """
+        return self.views.hotkey_index
+
+    @property
+    def coldkey_index( self ) -> Dict[str, List[int]]:
+        r""" Returns a map from each coldkey to the uids of its hotkeys.
+            Returns:
+                coldkey_index (:obj:`Dict[str, List[int]]`):
+                    uids of each coldkey.
+        """
+        return self.views.coldkey_index
+
+    @property
+    def active_uids( self ) -> torch.LongTensor:
+        r""" Returns the uids of the active neurons.
+            Returns:
+                active_uids (:obj:`torch.LongTensor`):
+                    Active neuron uids.
+        """
+        return self.views.active_uids
+
+    @property
+    def serving_mask( self ) -> torch.BoolTensor:
+        r""" Returns a mask of the neurons which have an endpoint.
+            Returns:
+                serving_mask (:obj:`torch.BoolTensor` of shape :obj:`(metagraph.n)`):
+                    True for neurons with an endpoint.
+        """
+        return self.views.serving_mask
+
+    @property
+    def stake_order( self ) -> torch.LongTensor:
+        r""" Returns the uids ordered by decreasing stake.
+            Returns:
+                stake_order (:obj:`torch.LongTensor` of shape :obj:`(metagraph.n)`):
+                    Uids sorted by stake.
+        """
+        return self.views.stake_order
 
     @property
     def modalities( self ) -> List[str]:
@@ -271,21 +387,14 @@ class Metagraph( torch.nn.Module ):
 
     @property
     def endpoint_objs( self ) -> List['bittensor.Endpoint']:
-        r""" Returns endpoints as objects.
+        r""" Returns endpoints as objects, built from the endpoint columns on first access.
             Returns:
                 endpoint_obj (:obj:`List[bittensor.Endpoint] of shape :obj:`(metagraph.n)`):
                     Endpoints as objects.
         """
         if self.n.item() == 0:
             return []
-        elif self._endpoint_objs != None:
-            return self._endpoint_objs
-        else:
-            self._endpoint_objs = []
-            for tensor in self.endpoints:
-                obj = bittensor.endpoint.from_tensor( tensor )
-                self._endpoint_objs.append( obj )
-            return self._endpoint_objs
+        return self.endpoints.objects()
 
     def hotkey_to_uid( self, hotkey:str ) -> int:
         r""" Fetch uid according to hotkey. 
@@ -297,13 +406,23 @@ class Metagraph( torch.nn.Module ):
                 uid: (`int`):
                     The uid for specified hotkey, -1 if hotkey does not exist.
         """ 
-        if hotkey in self.hotkeys:
-            return self.hotkeys.index(hotkey) 
-        else:
-            return -1
+        return self.hotkey_index.get( hotkey, -1 )
+
+    def coldkey_to_uids( self, coldkey:str ) -> List[int]:
+        r""" Fetch the uids of the hotkeys owned by a coldkey.
+            Args: 
+                coldkey: (`str`, required):
+                    Coldkey to fetch the uids for.
+            
+            Return:
+                uids: (`List[int]`):
+                    The uids of the coldkey, empty if it has none.
+        """ 
+        return list( self.coldkey_index.get( coldkey, [] ) )
 
     def load( self, network:str = None  ) -> 'Metagraph':
-        r""" Loads this metagraph object's state_dict from bittensor root dir.
+        r""" Loads this metagraph object's state from bittensor root dir, 
+            preferring the columnar snapshot over the state_dict file.
             Args: 
                 network: (:obj:`str`, required):
                     Name of state_dict to load, defaults to kusanagi
@@ -311,33 +430,59 @@ class Metagraph( torch.nn.Module ):
         try:
             if network == None:
                 network = self.subtensor.network
+            snapshot_path = os.path.expanduser( '~/.bittensor/' + str(network) + snapshot_impl.SNAPSHOT_SUFFIX )
             metagraph_path = '~/.bittensor/' + str(network) + '.pt'
             metagraph_path = os.path.expanduser(metagraph_path)
-            if os.path.isfile(metagraph_path):
+            if snapshot_impl.is_snapshot( snapshot_path ):
+                self.load_snapshot( path = snapshot_path )
+            elif os.path.isfile(metagraph_path):
                 self.load_from_path( path = metagraph_path )
             else:
-                logger.warning('Did not load metagraph from path: {}, file does not exist. Run metagraph.save() first.', metagraph_path)
+                logger.warning('Did not load metagraph from path: {}, file does not exist. Run metagraph.save() first.', snapshot_path)
         except Exception as e:
             logger.exception(e)
         return self
 
     def save( self, network:str = None ) -> 'Metagraph':
-        r""" Saves this metagraph object's state_dict under bittensor root dir.
+        r""" Saves this metagraph object's state as a columnar snapshot under bittensor root dir.
             Args: 
                 network: (:obj:`str`, required):
                     Name of state_dict, defaults to kusanagi
         """
         if network == None:
             network = self.subtensor.network
-        return self.save_to_path( path = '~/.bittensor/', filename = str(network) + '.pt')
+        return self.save_snapshot( path = '~/.bittensor/' + str(network) + snapshot_impl.SNAPSHOT_SUFFIX )
+
+    def load_snapshot( self, path:str, mmap:bool = True ) -> 'Metagraph':
+        r""" Loads this metagraph object from a columnar snapshot directory.
+            Args: 
+                path: (:obj:`str`, required):
+                    Snapshot directory.
+                mmap: (:obj:`bool`, optional):
+                    If True, the dense columns are memory mapped, so only touched columns are read and 
+                    processes on the same host share their pages.
+        """
+        return self.load_from_state_dict( snapshot_impl.load_snapshot( path, mmap = mmap ) )
+
+    def save_snapshot( self, path:str ) -> 'Metagraph':
+        r""" Saves this metagraph object as a columnar snapshot directory, one .npy file per field and a json header.
+            Args: 
+                path: (:obj:`str`, required):
+                    Snapshot directory.
+        """
+        os.makedirs( os.path.dirname( os.path.expanduser(path).rstrip('/') ), exist_ok=True )
+        snapshot_impl.save_snapshot( self.state_dict(), path )
+        return self
 
     def load_from_path(self, path:str ) -> 'Metagraph':
         r""" Loads this metagraph object with state_dict under the specified path.
             Args: 
                 path: (:obj:`str`, required):
-                    Path to load state_dict.
+                    Path to load state_dict, or a snapshot directory.
         """
         full_path = os.path.expanduser(path)
+        if snapshot_impl.is_snapshot( full_path ):
+            return self.load_snapshot( full_path )
         metastate = torch.load( full_path )
         return self.load_from_state_dict( metastate )
 
@@ -359,6 +504,7 @@ class Metagraph( torch.nn.Module ):
                 state_dict: (:obj:`dict`, required):
                     Metagraph state_dict. Must be same as that created by save_to_path.
         """
+        previous = changes_impl.snapshot( self )
         self.version = torch.nn.Parameter( state_dict['version'], requires_grad=False )
         self.n = torch.nn.Parameter( state_dict['n'], requires_grad=False )
         self.tau = torch.nn.Parameter( state_dict['tau'], requires_grad=False )
@@ -373,59 +519,199 @@ class Metagraph( torch.nn.Module ):
         self.dividends = torch.nn.Parameter( state_dict['dividends'], requires_grad=False )
         self.active = torch.nn.Parameter( state_dict['active'], requires_grad=False )
         self.last_update = torch.nn.Parameter( state_dict['last_update'], requires_grad=False )
-        self.weights = torch.nn.Parameter( state_dict['weights'], requires_grad=False )
-        self.bonds = torch.nn.Parameter( state_dict['bonds'], requires_grad=False )
-        self.endpoints = torch.nn.Parameter( state_dict['endpoints'], requires_grad=False )
-        self._endpoint_objs = None
+        self.weights = torch.nn.Parameter( self._to_layout( state_dict['weights'] ), requires_grad=False )
+        self.bonds = torch.nn.Parameter( self._to_layout( state_dict['bonds'] ), requires_grad=False )
+        if 'endpoints' in state_dict:
+            # Saved before endpoints were stored as columns, as a [n, 250] tensor of Endpoint.to_tensor rows.
+            self.endpoints = EndpointColumns.from_tensor( state_dict['endpoints'] )
+        else:
+            self.endpoints = EndpointColumns.from_state_dict( state_dict, 'endpoints.' )
+        self._views = None
+        self._publish()
+        self._notify( previous )
         return self
 
-    def retrieve_cached_neurons( self, block: int = None ):
-        """
-            Retrieves cached metagraph syncs from IPFS. 
+    def share( self, name: str ) -> 'Metagraph':
+        r""" Publishes this metagraph in named shared memory, the state is republished after each sync or load.
+            Processes on the same host attach with bittensor.Metagraph.attach( name ) instead of syncing themselves.
+            Args: 
+                name: (:obj:`str`, required):
+                    Shared memory name.
         """
-        ipfs = bittensor.Ipfs()
-        ipns_hash = ipfs.latest_neurons_ipns
-        ipfs_hash = ipfs.cat
-        
-        if block != None:
-            ipns_hash = ipfs.historical_neurons_ipns
-            ipfs_hash = ipfs.node_get
-        
-        try:
-            # Ping IPNS for latest IPFS hash
-            ipns_resolve =  ipfs.retrieve_directory(ipfs.ipns_resolve, (('arg', ipns_hash),))
-
-            # Extract IPFS hash from IPNS response
-            ipfs_path = ast.literal_eval(ipns_resolve.text)
-        except Exception as e:
-            logger.error("Error detected in metagraph sync: {} with sample text {}".format(e,ipns_resolve.text))
-
-            # Try Again
-            # Ping IPNS for latest IPFS hash
-            ipns_resolve =  ipfs.retrieve_directory(ipfs.ipns_resolve, (('arg', ipns_hash),))
-
-            # Extract IPFS hash from IPNS response
-            ipfs_path = ast.literal_eval(ipns_resolve.text)
+        if self._shared != None:
+            raise ValueError('Metagraph is already shared or attached under {}'.format( self._shared.name ))
+        self._shared = shared_impl.SharedMetagraphWriter( name )
+        self._publish()
+        return self
 
-        ipfs_resolved_hash = ipfs_path['Path'].split("ipfs/")[1]
-        ipfs_response = ipfs.retrieve_directory(ipfs_hash, (('arg', ipfs_resolved_hash),))
+    def unshare( self ) -> 'Metagraph':
+        r""" Stops publishing this metagraph and removes it from shared memory, attached metagraphs keep their last state.
+        """
+        if isinstance( self._shared, shared_impl.SharedMetagraphWriter ):
+            self._shared.close()
+            self._shared = None
+        return self
 
-        # Extract all neuron sync hashes
-        if block != None:
-            historical_neurons = json.loads(ipfs_response.content)['Links']
-            # Find the one that corresponds to our block
-            sync_data = next(item for item in historical_neurons if item["Name"] == "nakamoto-{}.pkl".format(block))
-            # Retrieve Neuron contents
-            ipfs_response = ipfs.retrieve_directory(ipfs.cat, (('arg', sync_data['Hash']),))
+    @staticmethod
+    def attach( name: str, sparse: bool = False ) -> 'Metagraph':
+        r""" Attaches read-only to a metagraph shared by another process on this host. The tensors view the
+            shared memory without copying them, and sync() moves to the latest published state without querying the chain.
+            Args: 
+                name: (:obj:`str`, required):
+                    Shared memory name passed to share.
+                sparse (:type:`bool`, `optional`):
+                    If True, weights and bonds are held as sparse coo tensors.
+            Returns:
+                metagraph (:obj:`Metagraph`):
+                    The attached metagraph, holding the current published state.
+        """
+        metagraph = Metagraph( subtensor = None, sparse = sparse )
+        metagraph._shared = shared_impl.SharedMetagraphReader( name )
+        return metagraph.sync()
 
-        # Unpickle the response
-        neurons = pickle.loads(ipfs_response.content)
+    def subscribe( self, callback: Callable[ ['changes_impl.MetagraphChanges'], None ] ) -> Callable:
+        r""" Registers a callback which is passed the MetagraphChanges of each sync or load, so consumers
+            can update their per uid state for the changed uids only.
+            Args: 
+                callback: (:obj:`Callable[ [MetagraphChanges], None ]`, required):
+                    Called after the metagraph state is replaced. Exceptions are logged and do not stop the sync.
+            Returns:
+                callback (:obj:`Callable`):
+                    The passed callback, for unsubscribe.
+        """
+        self._subscribers.append( callback )
+        return callback
 
+    def unsubscribe( self, callback: Callable ):
+        r""" Removes a callback registered with subscribe.
+        """
+        self._subscribers.remove( callback )
+
+    def _notify( self, previous: SimpleNamespace ):
+        self.last_changes = changes_impl.MetagraphChanges( previous, self )
+        self._dispatch( self.last_changes )
+
+    def _dispatch( self, changes: 'changes_impl.MetagraphChanges' ):
+        for callback in list( self._subscribers ):
+            try:
+                callback( changes )
+            except Exception as e:
+                logger.exception('Metagraph subscriber {} failed: {}', callback, e)
+
+    def copy( self ) -> 'Metagraph':
+        r""" Returns a metagraph holding this state, sharing its tensors and endpoint objects rather than copying them,
+            to be synced separately. Syncs replace the tensors instead of writing into them, so neither copy sees
+            the other sync. Subscribers and shared memory publishing are not carried over.
+        """
+        metagraph = Metagraph( subtensor = self.subtensor, sparse = self.sparse, archive = self.archive )
+        metagraph.load_from_state_dict( self.state_dict() )
+        metagraph.endpoints.reuse( self.endpoints )
+        return metagraph
+
+    def hand_over( self, metagraph: 'Metagraph' ):
+        r""" Moves the subscribers and shared memory publishing of this metagraph to metagraph, a synced copy which
+            replaces it, and passes the subscribers the changes of that sync.
+            Args: 
+                metagraph: (:obj:`Metagraph`, required):
+                    The replacing metagraph, synced from a copy of this one.
+        """
+        metagraph._subscribers = self._subscribers
+        self._subscribers = []
+        if isinstance( self._shared, shared_impl.SharedMetagraphWriter ):
+            metagraph._shared = self._shared
+            self._shared = None
+            metagraph._publish()
+        if metagraph.last_changes != None:
+            metagraph._dispatch( metagraph.last_changes )
+
+    def _publish( self ):
+        if isinstance( self._shared, shared_impl.SharedMetagraphWriter ):
+            self._shared.publish( self.state_dict() )
+
+    def retrieve_cached_neurons( self, block: int = None ) -> NeuronBatch:
+        r""" Retrieves cached metagraph syncs from IPFS. 
+            Payloads are cached locally by their content hash, so while the published hash is unchanged
+            a sync only costs the ipns resolve.
+            Args:
+                block (:type:`int`, `optional`):
+                    block of the historical sync to retrieve, defaults to the latest sync.
+            Returns:
+                neurons (:obj:`NeuronBatch`):
+                    the cached neurons.
+        """
+        ipfs = bittensor.Ipfs()
+        cache = ipfs_cache_impl.NeuronCache( ipfs.cache_dir )
+        if block == None:
+            content_hash = ipfs.resolve( ipfs.latest_neurons_ipns )
+        else:
+            # The historical syncs are the links of a directory, each named by its block.
+            directory_hash = ipfs.resolve( ipfs.historical_neurons_ipns )
+            links = cache.get_links( directory_hash )
+            if links == None:
+                ipfs_response = ipfs.retrieve_directory( ipfs.node_get, (('arg', directory_hash),) )
+                links = { item['Name']: item['Hash'] for item in json.loads( ipfs_response.content )['Links'] }
+                cache.put_links( directory_hash, links )
+            content_hash = links[ "nakamoto-{}.pkl".format(block) ]
+
+        neurons = cache.get( content_hash )
+        if neurons == None:
+            ipfs_response = ipfs.retrieve_directory( ipfs.cat, (('arg', content_hash),) )
+            neurons = ipfs_cache_impl.decode_neurons( ipfs_response.content )
+            cache.put( content_hash, neurons )
         return neurons
 
-    def sync ( self, block: int = None, cached: bool = True ) -> 'Metagraph':
+    def _can_patch( self, batch: NeuronBatch ) -> bool:
+        r""" Returns True if the held state can be patched to the pulled neurons: the metagraph holds a state,
+            the network did not shrink and the neurons cover each uid exactly once.
+        """
+        n_old = self.n.item()
+        if n_old == 0 or len(batch) < n_old or self.weights.dim() != 2 or self.weights.shape[0] != n_old or len(self.endpoints) != n_old:
+            return False
+        return numpy.array_equal( numpy.sort( batch.uid ), numpy.arange( len(batch) ) )
+
+    def _patch_weights( self, n_total: int, changed: numpy.ndarray, w_rows, w_cols, w_vals ) -> torch.FloatTensor:
+        r""" Returns the held weights grown to n_total, with the rows of changed uids replaced by the passed values.
+        """
+        n_old = self.n.item()
+        if self.weights.is_sparse:
+            weights = self.weights.data.coalesce()
+            indices = weights.indices()
+            keep = ~torch.from_numpy( changed )[ indices[0] ]
+            patch = weight_utils.convert_coo_to_sparse( n_total, w_rows, w_cols, w_vals, dtype=torch.float32 )
+            return torch.sparse_coo_tensor(
+                torch.cat( [ indices[:, keep], patch.indices() ], dim = 1 ),
+                torch.cat( [ weights.values()[ keep ], patch.values() ] ),
+                ( n_total, n_total )
+            ).coalesce()
+        weights = torch.zeros( [ n_total, n_total ], dtype=torch.float32 )
+        weights[ :n_old, :n_old ] = self.weights.data
+        weights[ torch.from_numpy( changed ) ] = 0
+        if len( w_rows ) > 0:
+            weights[ torch.from_numpy( w_rows ), torch.from_numpy( w_cols ) ] = torch.from_numpy( w_vals ).float()
+        return weights
+
+    def sync ( self, block: int = None, cached: bool = True, incremental: bool = False ) -> 'Metagraph':
         r""" Synchronizes this metagraph with the chain state.
+            Args:
+                block (:type:`int`, `optional`):
+                    block to sync at, defaults to the current block.
+                cached (:type:`bool`, `optional`):
+                    If True, pulls the neurons from the IPFS cache on networks which have one.
+                incremental (:type:`bool`, `optional`):
+                    If True, patches the held state: only neurons whose last_update or endpoint changed,
+                    or which are newly registered, have their weight rows and endpoints rebuilt. Falls back
+                    to a full sync if the held state is inconsistent with the chain.
+            Metagraphs attached to shared memory ignore the arguments and load the latest published state.
         """
+        if isinstance( self._shared, shared_impl.SharedMetagraphReader ):
+            # Attached metagraphs follow the publishing process.
+            state_dict = self._shared.read()
+            if state_dict != None:
+                self.load_from_state_dict( state_dict )
+            return self
+
+        # Only neurons pulled at block are archived under it, the latest IPFS sync may be older.
+        record = True
         if block == None:
             block = self.subtensor.get_current_block()
             if cached and self.subtensor.network in ("nakamoto", "local"):
@@ -433,6 +719,7 @@ class Metagraph( torch.nn.Module ):
                     with bittensor.__console__.status("Synchronizing Metagraph...", spinner="earth"):
                         try:
                             neurons = self.retrieve_cached_neurons( )
+                            record = False
                         except:
                             # For some reason IPFS cache is down, fallback on regular sync
                             logger.warning("IPFS cache may be down, falling back to regular sync")
@@ -441,6 +728,7 @@ class Metagraph( torch.nn.Module ):
                 else:
                     try:
                         neurons = self.retrieve_cached_neurons( )
+                        record = False
                     except:
                         # For some reason IPFS cache is down, fallback on regular sync
                         logger.warning("IPFS cache may be down, falling back to regular sync")
@@ -449,6 +737,10 @@ class Metagraph( torch.nn.Module ):
             else:
                 neurons = self.subtensor.neurons( block = block )
                 n_total = len(neurons)
+        elif self.archive != None and block in self.archive:
+            neurons = self.archive.get( block )
+            n_total = len(neurons)
+            record = False
         else:
             if cached and self.subtensor.network in ("nakamoto", "local"):
                 if bittensor.__use_console__:
@@ -472,74 +764,103 @@ class Metagraph( torch.nn.Module ):
                 neurons = self.subtensor.neurons( block = block )
                 n_total = len(neurons)
 
+        # Neurons are consumed as columns, cached syncs hold lists of neuron objects.
+        batch = neurons if isinstance( neurons, NeuronBatch ) else NeuronBatch.from_neurons( neurons )
+        if self.archive != None and record:
+            self.archive.record( block, batch )
+        return self._apply_neurons( batch, block, incremental = incremental )
+
+    def history( self, start_block: int = None, end_block: int = None ) -> Iterator['Metagraph']:
+        r""" Steps this metagraph through the archived blocks in [start_block, end_block], without querying the chain.
+            Consecutive blocks are applied incrementally.
+            Args:
+                start_block (:type:`int`, `optional`):
+                    first block, defaults to the first archived block.
+                end_block (:type:`int`, `optional`):
+                    last block, defaults to the last archived block.
+            Returns:
+                metagraphs (:obj:`Iterator[Metagraph]`):
+                    this metagraph, synced to each archived block in order.
+        """
+        if self.archive == None:
+            raise ValueError('Metagraph history requires an archive, pass archive to the metagraph')
+        for block, neurons in self.archive.iterate( start_block, end_block ):
+            yield self._apply_neurons( neurons, block, incremental = self.n.item() > 0 )
+
+    def _apply_neurons( self, batch: NeuronBatch, block: int, incremental: bool = False ) -> 'Metagraph':
+        r""" Sets the metagraph state to the neurons pulled at block.
+        """
+        previous = changes_impl.snapshot( self )
+        n_total = len(batch)
+
+        # Patch the held state if it is consistent with the pulled neurons.
+        n_old = self.n.item()
+        patch = incremental and self._can_patch( batch )
+        if incremental and not patch:
+            logger.info('Metagraph state can not be patched, falling back to a full sync')
+
         # Fill arrays.
-        uids = [ i for i in range(n_total) ]
-        active = [ 0 for _ in range(n_total) ]
-        stake = [ 0 for _ in range(n_total) ]
-        ranks = [ 0 for _ in range(n_total) ]
-        trust = [ 0 for _ in range(n_total) ]
-        consensus = [ 0 for _ in range(n_total) ]
-        incentive = [ 0 for _ in range(n_total) ]
-        emission = [ 0 for _ in range(n_total) ]
-        dividends = [ 0 for _ in range(n_total) ]
-        last_updates = [ -1 for _ in range(n_total) ]
-        endpoints = [ [-1 for _ in range(250) ]  for _ in range(n_total) ]
-        weights = [ [ 0 for _ in range(n_total) ] for _ in range(n_total) ]
-        bonds = [ [0 for _ in range(n_total) ] for _ in range(n_total) ]
-        self._endpoint_objs = [ bittensor.endpoint.dummy() for _ in range(n_total) ]
-        for n in neurons:
-            uids[n.uid] = n.uid 
-            active[n.uid] = n.active
-            stake[n.uid] = n.stake 
-            ranks[n.uid] = n.rank
-            trust[n.uid] = n.trust
-            consensus[n.uid] = n.consensus
-            incentive[n.uid] = n.incentive
-            dividends[n.uid] = n.dividends
-            emission[n.uid] = n.emission
-            last_updates[n.uid] = n.last_update
-            endpoint =  bittensor.endpoint(
-                version = int(n.version),
-                uid = int(n.uid), 
-                hotkey = str(n.hotkey), 
-                ip_type = int(n.ip_type), 
-                ip = str(n.ip), 
-                port = int(n.port), 
-                modality = int(n.modality), 
-                coldkey = str(n.coldkey) 
-            )
-            self._endpoint_objs[n.uid] = endpoint 
-            endpoints[n.uid] = endpoint.to_tensor().tolist()
-            if len(n.weights) > 0:
-                w_uids, w_weights = zip(*n.weights)
-                weights[n.uid] = weight_utils.convert_weight_uids_and_vals_to_tensor( n_total, w_uids, w_weights ).tolist()
-            else:
-                weights[n.uid] = [0] * n_total
-            if len(n.bonds) > 0:
-                b_uids, b_bonds = zip(*n.bonds)
-                bonds[n.uid] = weight_utils.convert_bond_uids_and_vals_to_tensor( n_total, b_uids, b_bonds ).tolist()
-            else:
-                bonds[n.uid] = [0] * n_total
+        def column( values: numpy.ndarray, fill: float, dtype: numpy.dtype ) -> numpy.ndarray:
+            filled = numpy.full( n_total, fill, dtype = dtype )
+            filled[ batch.uid ] = values
+            return filled
+        active = column( batch.active, 0, numpy.int64 )
+        stake = column( batch.stake, 0, numpy.float32 )
+        ranks = column( batch.rank, 0, numpy.float32 )
+        trust = column( batch.trust, 0, numpy.float32 )
+        consensus = column( batch.consensus, 0, numpy.float32 )
+        incentive = column( batch.incentive, 0, numpy.float32 )
+        emission = column( batch.emission, 0, numpy.float32 )
+        dividends = column( batch.dividends, 0, numpy.float32 )
+        last_updates = column( batch.last_update, -1, numpy.int64 )
+
+        # Endpoints are written straight into their columns, endpoint objects of unchanged rows are kept.
+        endpoints = EndpointColumns.from_arrays(
+            n_total,
+            batch.uid,
+            version = batch.version,
+            uid = batch.uid,
+            ip = batch.ip,
+            ip_type = batch.ip_type,
+            port = batch.port,
+            modality = batch.modality,
+            hotkey = batch.hotkey,
+            coldkey = batch.coldkey,
+        ).reuse( self.endpoints )
+
+        # Weights and bonds are built from (row, col, val) index arrays, without a dense python stage.
+        # Bonds accrue every block so they are always rebuilt, weight rows only change with last_update.
+        if patch:
+            changed = numpy.ones( n_total, dtype = bool )
+            changed[ :n_old ] = last_updates[ :n_old ] != self.last_update.numpy()
+            weight_batch = batch[ changed[ batch.uid ] ]
+        else:
+            weight_batch = batch
+        w_rows, w_cols, w_vals = weight_utils.convert_uids_and_vals_to_coo( weight_batch.uid, weight_batch.weights )
+        b_rows, b_cols, b_vals = weight_utils.convert_uids_and_vals_to_coo( batch.uid, batch.bonds )
 
         # Set tensors.
         tn = torch.tensor( n_total, dtype=torch.int64 )
         tblock = torch.tensor( block, dtype=torch.int64 )
-        tuids = torch.tensor( uids, dtype=torch.int64 )
-        tactive = torch.tensor( active, dtype=torch.int64 )
-        tstake = torch.tensor( stake, dtype=torch.float32 )
-        tranks = torch.tensor( ranks, dtype=torch.float32 )
-        ttrust = torch.tensor( trust, dtype=torch.float32 )
-        tconsensus = torch.tensor( consensus, dtype=torch.float32 )
-        tincentive = torch.tensor( incentive, dtype=torch.float32 )
-        temission = torch.tensor( emission, dtype=torch.float32 )
-        tdividends = torch.tensor( dividends, dtype=torch.float32 )
-        tlast_update = torch.tensor( last_updates, dtype=torch.int64 )
-        tbonds = torch.tensor( bonds, dtype=torch.int64 )
-        tweights = torch.tensor( weights, dtype=torch.float32 )
-        tendpoints = torch.tensor( endpoints, dtype=torch.int64 )
+        tuids = torch.arange( n_total, dtype=torch.int64 )
+        tactive = torch.from_numpy( active )
+        tstake = torch.from_numpy( stake )
+        tranks = torch.from_numpy( ranks )
+        ttrust = torch.from_numpy( trust )
+        tconsensus = torch.from_numpy( consensus )
+        tincentive = torch.from_numpy( incentive )
+        temission = torch.from_numpy( emission )
+        tdividends = torch.from_numpy( dividends )
+        tlast_update = torch.from_numpy( last_updates )
+        to_tensor = weight_utils.convert_coo_to_sparse if self.sparse else weight_utils.convert_coo_to_dense
+        tbonds = to_tensor( n_total, b_rows, b_cols, b_vals, dtype=torch.int64 )
+        if patch:
+            tweights = self._patch_weights( n_total, changed, w_rows, w_cols, w_vals / float(weight_utils.U32_MAX) )
+        else:
+            tweights = to_tensor( n_total, w_rows, w_cols, w_vals / float(weight_utils.U32_MAX), dtype=torch.float32 )
 
         # Normalize bond ownership.
-        tbonds = torch.nn.functional.normalize( tbonds.float(), p=1, dim=0, eps=1e-12 ) * 0.5 + torch.eye( tn ) * 0.5
+        tbonds = weight_utils.normalize_bonds( tbonds )
 
         # Set params.
         self.n = torch.nn.Parameter( tn, requires_grad=False )
@@ -556,7 +877,12 @@ class Metagraph( torch.nn.Module ):
         self.last_update = torch.nn.Parameter( tlast_update, requires_grad=False )
         self.weights = torch.nn.Parameter( tweights, requires_grad=False )
         self.bonds = torch.nn.Parameter( tbonds, requires_grad=False )
-        self.endpoints = torch.nn.Parameter( tendpoints, requires_grad=False )
+        self.endpoints = endpoints
+
+        # Rebuild the derived views for the new state.
+        self._views = self._build_views()
+        self._publish()
+        self._notify( previous )
             
         # For contructor.
         return self
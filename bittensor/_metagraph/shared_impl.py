@@ -0,0 +1,236 @@
+""" Metagraph state published in named shared memory, for processes on the same host.
+"""
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import json
+import mmap
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy
+import torch
+
+try:
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:
+    # Python < 3.8.
+    shared_memory = None
+
+SHARED_FORMAT = 1
+# The control segment holds the sequence counter, the header length and the json header.
+CONTROL_SIZE = 1 << 16
+HEADER_OFFSET = 16
+ALIGNMENT = 64
+READ_RETRIES = 1000
+# Segments created by this process, which its resource tracker already holds.
+_created = set()
+
+def _open( name: str, create: bool = False, size: int = 0 ) -> 'shared_memory.SharedMemory':
+    if shared_memory == None:
+        raise RuntimeError('Shared memory metagraphs require python 3.8 or later')
+    if create:
+        segment = shared_memory.SharedMemory( name = name, create = True, size = size )
+        _created.add( name )
+        return segment
+    try:
+        return shared_memory.SharedMemory( name = name, track = False )
+    except TypeError:
+        # Before python 3.13 attaching registers the segment with the resource tracker,
+        # which would unlink it when this process exits.
+        segment = shared_memory.SharedMemory( name = name )
+        if name not in _created:
+            resource_tracker.unregister( segment._name, 'shared_memory' )
+        return segment
+
+def _unlink( segment: 'shared_memory.SharedMemory' ):
+    segment.close()
+    segment.unlink()
+    _created.discard( segment.name )
+
+def _map( name: str ) -> mmap.mmap:
+    r""" Attaches a segment and returns its mapping, which stays mapped for as long as arrays view it.
+        The SharedMemory handle is closed right away: closing it while tensors still view its buffer fails.
+    """
+    segment = _open( name )
+    mapping = segment._mmap
+    segment._buf.release()
+    segment._buf = None
+    segment._mmap = None
+    segment.close()
+    return mapping
+
+def _close( segment: 'shared_memory.SharedMemory' ) -> bool:
+    r""" Closes a segment, returns False while tensors still view it.
+    """
+    try:
+        segment.close()
+        return True
+    except BufferError:
+        return False
+
+def _arrays( state_dict: Dict[ str, torch.Tensor ] ) -> Tuple[ Dict[ str, numpy.ndarray ], Dict[ str, dict ] ]:
+    r""" Flattens a state dict to named arrays, sparse tensors become their coo indices and values.
+    """
+    arrays = {}
+    fields = {}
+    for name, tensor in state_dict.items():
+        tensor = tensor.detach().cpu()
+        if tensor.is_sparse:
+            tensor = tensor.coalesce()
+            arrays[ name + '.indices' ] = tensor.indices().numpy()
+            arrays[ name + '.values' ] = tensor.values().numpy()
+            fields[name] = { 'layout': 'coo', 'shape': list( tensor.shape ) }
+        else:
+            arrays[name] = tensor.numpy()
+            fields[name] = { 'layout': 'dense', 'shape': list( tensor.shape ) }
+    return arrays, fields
+
+class SharedMetagraphWriter():
+    r""" Publishes metagraph states under a shared memory name. Each state is written to a new data segment which is
+        never modified afterwards, and the control segment is switched to it under a seqlock: the counter is odd while
+        the header is written. Readers map the data segment without copying, so a host holds one copy of the state
+        however many processes attach. The previous data segment is unlinked once the next one is published,
+        readers which still map it keep their pages until they move on.
+    """
+    def __init__( self, name: str ):
+        r""" Creates the control segment.
+            Args:
+                name (:type:`str`, `required`):
+                    shared memory name, readers attach with the same name.
+        """
+        self.name = name
+        self.generation = 0
+        self.control = _open( name, create = True, size = CONTROL_SIZE )
+        self.control.buf[ :HEADER_OFFSET ] = bytes( HEADER_OFFSET )
+        self.segment = None
+
+    def publish( self, state_dict: Dict[ str, torch.Tensor ] ):
+        r""" Publishes a metagraph state dict.
+        """
+        arrays, fields = _arrays( state_dict )
+        offsets = {}
+        size = 0
+        for key, array in arrays.items():
+            offsets[key] = size
+            size += -( -array.nbytes // ALIGNMENT ) * ALIGNMENT
+        self.generation += 1
+        segment_name = '{}-{}'.format( self.name, self.generation )
+        segment = _open( segment_name, create = True, size = max( size, 1 ) )
+        for key, array in arrays.items():
+            if array.nbytes > 0:
+                segment.buf[ offsets[key]: offsets[key] + array.nbytes ] = numpy.ascontiguousarray( array ).tobytes()
+        header = json.dumps( {
+            'format': SHARED_FORMAT,
+            'generation': self.generation,
+            'segment': segment_name,
+            'fields': fields,
+            'arrays': { key: [ offsets[key], array.dtype.str, list( array.shape ) ] for key, array in arrays.items() },
+        } ).encode()
+        if HEADER_OFFSET + len(header) > CONTROL_SIZE:
+            raise ValueError('Metagraph header of {} bytes does not fit the control segment'.format( len(header) ))
+
+        # Seqlock write: odd while the header changes.
+        sequence = numpy.frombuffer( self.control.buf, dtype = numpy.int64, count = 2 )
+        sequence[0] += 1
+        sequence[1] = len(header)
+        self.control.buf[ HEADER_OFFSET: HEADER_OFFSET + len(header) ] = header
+        sequence[0] += 1
+        del sequence
+
+        if self.segment != None:
+            _unlink( self.segment )
+        self.segment = segment
+
+    def close( self ):
+        r""" Unlinks the control and data segments, attached readers keep their current state.
+        """
+        for segment in [ self.segment, self.control ]:
+            if segment != None:
+                _unlink( segment )
+        self.segment = None
+        self.control = None
+
+class SharedMetagraphReader():
+    r""" Attaches read-only to a metagraph published by a SharedMetagraphWriter.
+    """
+    def __init__( self, name: str ):
+        r""" Attaches to the control segment.
+            Args:
+                name (:type:`str`, `required`):
+                    shared memory name passed to the writer.
+            Raises:
+                FileNotFoundError: if no metagraph is published under name.
+        """
+        self.name = name
+        self.control = _open( name )
+        self.generation = 0
+
+    def _read_header( self ) -> Optional[dict]:
+        sequence = numpy.frombuffer( self.control.buf, dtype = numpy.int64, count = 2 )
+        try:
+            for _ in range( READ_RETRIES ):
+                before = int( sequence[0] )
+                if before % 2 == 1:
+                    time.sleep( 0 )
+                    continue
+                length = int( sequence[1] )
+                header = bytes( self.control.buf[ HEADER_OFFSET: HEADER_OFFSET + length ] )
+                if int( sequence[0] ) == before:
+                    return json.loads( header ) if before > 0 else None
+            raise TimeoutError('Shared metagraph {} is being written continuously'.format( self.name ))
+        finally:
+            del sequence
+
+    def read( self ) -> Optional[ Dict[ str, torch.Tensor ] ]:
+        r""" Returns the published state dict, or None if it is unchanged since the last read or nothing was published yet.
+            The returned tensors view shared memory and must not be modified, the segment is unmapped once they are released.
+        """
+        for _ in range( READ_RETRIES ):
+            header = self._read_header()
+            if header == None or header['generation'] == self.generation:
+                return None
+            if header['format'] != SHARED_FORMAT:
+                raise ValueError('Unsupported shared metagraph format: {}'.format( header['format'] ))
+            try:
+                mapping = _map( header['segment'] )
+            except FileNotFoundError:
+                # Replaced between reading the header and attaching.
+                continue
+            break
+        else:
+            raise TimeoutError('Shared metagraph {} changes faster than it can be attached'.format( self.name ))
+
+        arrays = {}
+        for key, ( offset, dtype, shape ) in header['arrays'].items():
+            dtype = numpy.dtype( dtype )
+            count = int( numpy.prod( shape ) )
+            arrays[key] = torch.from_numpy( numpy.frombuffer( mapping, dtype = dtype, count = count, offset = offset ).reshape( shape ) )
+        state_dict = {}
+        for name, field in header['fields'].items():
+            if field['layout'] == 'coo':
+                state_dict[name] = torch.sparse_coo_tensor( arrays[ name + '.indices' ], arrays[ name + '.values' ], field['shape'] ).coalesce()
+            else:
+                state_dict[name] = arrays[name]
+
+        self.generation = header['generation']
+        return state_dict
+
+    def close( self ):
+        r""" Detaches the control segment, tensors already read stay valid.
+        """
+        _close( self.control )
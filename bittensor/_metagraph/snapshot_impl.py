@@ -0,0 +1,108 @@
+""" Columnar on disk metagraph snapshots, loaded through memory maps.
+"""
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import json
+import os
+import shutil
+from typing import Dict
+
+import numpy
+import torch
+
+SNAPSHOT_FORMAT = 1
+HEADER = 'header.json'
+SNAPSHOT_SUFFIX = '.snapshot'
+
+def is_snapshot( path: str ) -> bool:
+    r""" Returns True if path is a snapshot directory.
+    """
+    return os.path.isfile( os.path.join( os.path.expanduser( path ), HEADER ) )
+
+def save_snapshot( state_dict: Dict[ str, torch.Tensor ], path: str ):
+    r""" Writes a state dict as a snapshot directory holding one .npy file per field and a json header.
+        Sparse tensors are written as their coo indices and values. The snapshot is written next to path
+        and renamed into place, processes which mapped the previous snapshot keep reading its pages.
+        Args:
+            state_dict (:obj:`Dict[str, torch.Tensor]`, `required`):
+                metagraph state dict.
+            path (:type:`str`, `required`):
+                snapshot directory.
+    """
+    path = os.path.expanduser( path ).rstrip('/')
+    staging = '{}.tmp-{}'.format( path, os.getpid() )
+    shutil.rmtree( staging, ignore_errors = True )
+    os.makedirs( staging )
+    header = { 'format': SNAPSHOT_FORMAT, 'fields': {} }
+    for name, tensor in state_dict.items():
+        tensor = tensor.detach().cpu()
+        if tensor.is_sparse:
+            tensor = tensor.coalesce()
+            numpy.save( os.path.join( staging, name + '.indices.npy' ), tensor.indices().numpy() )
+            numpy.save( os.path.join( staging, name + '.values.npy' ), tensor.values().numpy() )
+            header['fields'][name] = { 'layout': 'coo', 'shape': list( tensor.shape ) }
+        else:
+            numpy.save( os.path.join( staging, name + '.npy' ), tensor.numpy() )
+            header['fields'][name] = { 'layout': 'dense', 'shape': list( tensor.shape ) }
+        if name in ( 'version', 'n', 'block' ):
+            header[name] = tensor.item()
+    with open( os.path.join( staging, HEADER ), 'w' ) as f:
+        json.dump( header, f )
+
+    previous = '{}.old-{}'.format( path, os.getpid() )
+    if os.path.isdir( path ):
+        os.rename( path, previous )
+    os.rename( staging, path )
+    shutil.rmtree( previous, ignore_errors = True )
+
+def _load_array( path: str, mmap: bool ) -> numpy.ndarray:
+    r""" Loads an .npy file, mapped copy on write so the clean pages are shared between processes.
+    """
+    if not mmap:
+        return numpy.load( path )
+    try:
+        return numpy.load( path, mmap_mode = 'c' )
+    except ValueError:
+        # Empty arrays can not be mapped.
+        return numpy.load( path )
+
+def load_snapshot( path: str, mmap: bool = True ) -> Dict[ str, torch.Tensor ]:
+    r""" Reads a snapshot directory written by save_snapshot.
+        Args:
+            path (:type:`str`, `required`):
+                snapshot directory.
+            mmap (:type:`bool`, `optional`):
+                If True, dense fields are memory mapped and only paged in when touched.
+        Returns:
+            state_dict (:obj:`Dict[str, torch.Tensor]`):
+                metagraph state dict.
+    """
+    path = os.path.expanduser( path ).rstrip('/')
+    with open( os.path.join( path, HEADER ) ) as f:
+        header = json.load( f )
+    if header.get('format') != SNAPSHOT_FORMAT:
+        raise ValueError('Unsupported metagraph snapshot format: {}'.format( header.get('format') ))
+    state_dict = {}
+    for name, field in header['fields'].items():
+        if field['layout'] == 'coo':
+            indices = numpy.load( os.path.join( path, name + '.indices.npy' ) )
+            values = numpy.load( os.path.join( path, name + '.values.npy' ) )
+            state_dict[name] = torch.sparse_coo_tensor( torch.from_numpy( indices ), torch.from_numpy( values ), field['shape'] ).coalesce()
+        else:
+            state_dict[name] = torch.from_numpy( _load_array( os.path.join( path, name + '.npy' ), mmap ) )
+    return state_dict
@@ -1,5 +1,6 @@
 import argparse
 import bittensor
+import os
 import torch
 import torch.nn.functional as F
 
@@ -218,9 +219,10 @@ class server(torch.nn.Module):
         parser.add_argument('--neuron.blacklist.stake.forward', type=float, help='Amount of stake (tao) in order not to get blacklisted for forward requests', default=10)
         parser.add_argument('--neuron.blacklist.stake.backward', type=float, help='Amount of stake (tao) in order not to get blacklisted for backward requests', default=100)
         parser.add_argument('--neuron.metagraph_sync', type=float, help='how often to sync the metagraph', default=100000)
+        parser.add_argument('--neuron.model_workers', type=int, help='If greater than 0, the model is served from this many worker processes instead of the axon threads', default=0)
+        parser.add_argument('--neuron.model_worker_threads', type=int, help='torch.set_num_threads budget of each model worker process', default=1)
         parser.add_argument('--neuron.blocks_per_set_weights', type=float, help='how often to sync set weights', default=100)
         parser.add_argument('--neuron.blocks_per_epoch', type=int, help='Blocks per epoch', default=2)
-        parser.add_argument('--neuron.blacklist.time', type=int, help='how often a peer can query you (seconds) ', default=2)
 
         bittensor.wallet.add_args( parser )
         bittensor.axon.add_args( parser )
@@ -229,5 +231,9 @@ class server(torch.nn.Module):
         bittensor.wandb.add_args(parser)
         bittensor.prioritythreadpool.add_args( parser )
         bittensor.dataset.add_args( parser )
+        # Callers are throttled by stake tier unless BT_AXON_RATE_LIMIT_ENABLED or the config file turns it off,
+        # the lowest tier allows one forward request every two seconds.
+        if os.getenv('BT_AXON_RATE_LIMIT_ENABLED') == None:
+            parser.set_defaults( **{ 'axon.rate_limit.enabled': True } )
         return bittensor.config( parser )
     
@@ -32,8 +32,8 @@ import os
 
 from loguru import logger; logger = logger.opt(colors=True)
 from torch.nn.utils import clip_grad_norm_
-from datetime import datetime,timedelta
 from threading import Lock
+from bittensor.utils.model_worker_pool import ModelWorkerPool
 os.environ['TOKENIZERS_PARALLELISM'] = 'false'
 
 def serve( config, gp_server):
@@ -62,7 +62,16 @@ def serve( config, gp_server):
         momentum = config.neuron.momentum,
     )
     
-    timecheck = {}
+    # Optionally move the model compute out of the axon process.
+    model_workers = None
+    if config.neuron.model_workers > 0:
+        model_workers = ModelWorkerPool(
+            gp_server,
+            workers = config.neuron.model_workers,
+            threads = config.neuron.model_worker_threads,
+            timeout = config.axon.forward_timeout,
+        ).start()
+
     # Define our forward function.
     def forward_text ( inputs_x ):
         r""" Forward function that is called when the axon recieves a forward request from other peers
@@ -74,6 +83,8 @@ def serve( config, gp_server):
                 outputs (:obj:`torch.FloatTensor`):
                     The nucleus's outputs as a torch tensor of shape [batch_size, sequence_len, __network_dim__]
         """ 
+        if model_workers != None:
+            return model_workers.forward( inputs_x )
         return gp_server.encode_forward( inputs_x.to(gp_server.device) )
 
     # Define our backward function.
@@ -91,6 +102,12 @@ def serve( config, gp_server):
         # -- normalized grads -- 
         grads_dy = grads_dy/(grads_dy.sum() + 0.00001)
         
+        if model_workers != None:
+            with mutex:
+                model_workers.backward( inputs_x, grads_dy )
+            gp_server.backward_gradients += inputs_x.size(0)
+            return
+
         with mutex:
             outputs_y = gp_server.encode_forward( inputs_x.to(gp_server.device) )
             with torch.autograd.set_detect_anomaly(True):
@@ -114,7 +131,7 @@ def serve( config, gp_server):
                 request_type ( bittensor.proto.RequestType, `required`):
                     the request type ('FORWARD' or 'BACKWARD').
         """        
-        uid = metagraph.hotkeys.index(pubkey)
+        uid = metagraph.hotkey_index[pubkey]
         priority = metagraph.S[uid].item()/ sys.getsizeof(inputs_x)
 
         return priority
@@ -130,7 +147,7 @@ def serve( config, gp_server):
 
         # Check for stake
         def stake_check():
-            uid =metagraph.hotkeys.index(pubkey)
+            uid = metagraph.hotkey_index[pubkey]
             if request_type == bittensor.proto.RequestType.FORWARD:
                 if metagraph.S[uid].item() < config.neuron.blacklist.stake.forward:
                     return True
@@ -143,35 +160,31 @@ def serve( config, gp_server):
                 else:
                     return False
 
-        # Check for time
-        def time_check():
-            current_time = datetime.now()
-            if pubkey in timecheck.keys():
-                prev_time = timecheck[pubkey]
-                if current_time - prev_time >= timedelta(seconds=config.neuron.blacklist.time):
-                    timecheck[pubkey] = current_time
-                    return False
-                else:
-                    timecheck[pubkey] = current_time
-                    return True
-            else:
-                timecheck[pubkey] = current_time
-                return False
-
         # Black list or not
-        if stake_check() or time_check():
+        if stake_check():
             return True
         else: 
             return False
+
+    def stake(pubkey:str) -> float:
+        r"""Returns the stake of the caller, used to set its rate limit tier.
+            Args:
+                pubkey ( str, `required`):
+                    The public key of the caller.
+        """
+        uid = metagraph.hotkey_to_uid( pubkey )
+        return metagraph.S[uid].item() if uid != -1 else 0
             
 
     # Create our axon server
     axon = bittensor.axon (
+        config = config,
         wallet = wallet,
         forward_text = forward_text,
         backward_text = backward_text,
         blacklist = blacklist,
-        priority = priority
+        priority = priority,
+        stake = stake,
     ) 
 
     # Training Data
@@ -242,7 +255,8 @@ def serve( config, gp_server):
                     clip_grad_norm_(gp_server.parameters(), 1.0)
                     
                     optimizer.step()
-                    optimizer.zero_grad()
+                    # Keep the gradient tensors, the model workers accumulate into them.
+                    optimizer.zero_grad( set_to_none = False )
                     logger.info('Backpropagation Successful: Model updated')
 
             nn = subtensor.neuron_for_pubkey(wallet.hotkey.ss58_address)
@@ -307,13 +321,15 @@ def serve( config, gp_server):
 
 
             if current_block - last_sync_block > config.neuron.metagraph_sync:
-                metagraph.sync()
+                metagraph.sync( incremental = True )
                 last_sync_block = current_block
 
 
     except KeyboardInterrupt:
         # --- User ended session ----
         axon.stop()
+        if model_workers != None:
+            model_workers.stop()
     except Exception as e:
         # --- Unknown error ----
         logger.exception('Unknown exception: {} with traceback {}', e, traceback.format_exc())
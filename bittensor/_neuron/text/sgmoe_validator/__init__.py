@@ -49,13 +49,13 @@ class neuron:
         # Load/Create our bittensor wallet.
         self.wallet = bittensor.wallet ( config = config ).create().register()
 
-        # Connect to the chain.
+        # Connect to the chain, --subtensor.subscribe_blocks serves the training loop's block reads locally.
         self.subtensor = bittensor.subtensor ( config = config )
     
         # Load/Sync/Save our metagraph.
         self.metagraph = bittensor.metagraph ( subtensor = self.subtensor ).load().sync().save()
         
-        self.uid = self.metagraph.hotkeys.index ( self.wallet.hotkey.ss58_address )
+        self.uid = self.metagraph.hotkey_index[ self.wallet.hotkey.ss58_address ]
 
         # Create Dendrite.
         self.dendrite = bittensor.dendrite ( config = config )
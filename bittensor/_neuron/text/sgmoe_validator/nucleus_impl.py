@@ -92,6 +92,15 @@ class Validator( torch.nn.Module ):
                 else:
                     self.gates[uid] = torch.nn.Linear( bittensor.__network_dim__, 1, bias=True).to(self.device)
 
+        def on_metagraph_changes( self, changes: 'bittensor.MetagraphChanges' ):
+            r""" Creates gates for new uids and fresh gates for re-registered uids.
+                Args:
+                    changes (:obj: `bittensor.MetagraphChanges'`, `required`):
+                        changes of the last metagraph sync.
+            """
+            for uid in torch.cat( [ changes.new_uids, changes.hotkey_changed ] ).tolist():
+                self.gates[uid] = torch.nn.Linear( bittensor.__network_dim__, 1, bias=True).to(self.device)
+
 
         def route(
             self, 
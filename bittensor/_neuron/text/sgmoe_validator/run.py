@@ -28,6 +28,7 @@ import wandb
 import pandas
 from termcolor import colored
 from functools import partial
+from bittensor._metagraph.background_impl import BackgroundSync
 
 from torch.nn.utils import clip_grad_norm_
 import torch.nn.functional as F
@@ -69,8 +70,28 @@ def run( config , validator, subtensor, wallet, metagraph, dataset, device, uid,
     ema_score_decay = 0.995
     ema_scores = torch.nn.Parameter(torch.zeros_like(validator.peer_weights, device = device) * (1 / metagraph.n.item()), requires_grad = False)
 
+    # --- Per uid state follows the metagraph changes.
+    def on_metagraph_changes( changes ):
+        nonlocal ema_scores
+        chain_growth = max(0, changes.n - torch.numel( ema_scores ))
+        if chain_growth > 0:
+            ema_scores = torch.nn.Parameter(torch.cat([ema_scores, torch.zeros([chain_growth], dtype=torch.float32, requires_grad=False, device = device)]), requires_grad = False)
+        ema_scores.data[ changes.hotkey_changed.to( device ) ] = 0
+    metagraph.subscribe( on_metagraph_changes )
+    metagraph.subscribe( validator.on_metagraph_changes )
+    metagraph.subscribe( dendrite.receptor_pool.on_metagraph_changes )
+
+    # --- Metagraph syncs run in the background on their own chain connection and are swapped in between epochs.
+    background_sync = BackgroundSync( metagraph, subtensor = bittensor.subtensor( config = config, subscribe_blocks = False ) )
+    validator.metagraph = lambda: background_sync.metagraph
+
     while True:
 
+        # --- Swap in a metagraph synced in the background.
+        synced = background_sync.swap()
+        if synced != None:
+            metagraph = synced
+
         # --- Run epoch.
         start_block = subtensor.get_current_block() + 1
         end_block = start_block + config.neuron.blocks_per_epoch
@@ -165,11 +186,8 @@ def run( config , validator, subtensor, wallet, metagraph, dataset, device, uid,
             torch.save( { 'validator': validator.state_dict() }, "{}/validator.torch".format( config.neuron.full_path ))
 
         if current_block - last_sync_block > config.neuron.metagraph_sync:
-            metagraph.sync()
+            background_sync.start( incremental = True )
             last_sync_block = current_block
-            validator.sync_with_chain_state()
-            chain_growth = max(0, metagraph.n.item() - torch.numel( ema_scores ))
-            ema_scores = torch.nn.Parameter(torch.cat([ema_scores, torch.zeros([chain_growth], dtype=torch.float32, requires_grad=False, device = device)]))
 
         epoch += 1
 
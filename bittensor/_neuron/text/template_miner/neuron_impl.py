@@ -36,6 +36,7 @@ from qqdm import qqdm, format_str
 from loguru import logger
 
 from bittensor._metagraph import metagraph
+from bittensor._metagraph.background_impl import BackgroundSync
 logger = logger.opt(colors=True)
 
 from types import SimpleNamespace
@@ -52,6 +53,7 @@ class Neuron:
         """
         self.config = config
         self.wallet = bittensor.wallet ( config = self.config )
+        # The training loop reads the current block after every batch, --subtensor.subscribe_blocks serves it locally.
         self.subtensor = bittensor.subtensor ( config = self.config )
         self.metagraph = bittensor.metagraph ( config = self.config, subtensor = self.subtensor )
         self.dendrite = bittensor.dendrite ( config = self.config, wallet = self.wallet )
@@ -92,6 +94,13 @@ class Neuron:
         # ---- Decay factor for fisher ema score 
         self.fisher_ema_decay = 0.995
 
+        # ---- Per uid state follows the metagraph changes.
+        self.metagraph.subscribe( self.on_metagraph_changes )
+        self.metagraph.subscribe( self.dendrite.receptor_pool.on_metagraph_changes )
+
+        # ---- Metagraph syncs run on their own chain connection, off the training loop.
+        self.background_sync = BackgroundSync( self.metagraph, subtensor = bittensor.subtensor ( config = self.config, subscribe_blocks = False ), save = True )
+
     def __enter__(self):
         self.wallet.create()
         self.subtensor.register( self.wallet )
@@ -194,6 +203,9 @@ class Neuron:
                             self.stats.scores = scores
 
 
+                        # ---- Swap in a metagraph synced in the background, between batches.
+                        self.swap_metagraph()
+
                         # ---- Sync with metagraph if the current block >= last synced block + sync block time 
                         current_block = self.subtensor.get_current_block()
                         block_diff = current_block - self.stats.last_sync_block
@@ -288,8 +300,9 @@ class Neuron:
                 request_type ( bittensor.proto.RequestType, `required`):
                     the request type ('FORWARD' or 'BACKWARD').
         """        
-        # Priority = stake / request_size 
-        priority = self.metagraph.S[ self.metagraph.hotkeys.index(pubkey) ] / sys.getsizeof(inputs_x)
+        # Priority = stake / request_size, read from one metagraph in case it is swapped meanwhile.
+        metagraph = self.metagraph
+        priority = metagraph.S[ metagraph.hotkey_index[pubkey] ] / sys.getsizeof(inputs_x)
         return priority
 
     def blacklist(self, pubkey:str, request_type:bittensor.proto.RequestType) -> bool:
@@ -302,7 +315,9 @@ class Neuron:
                     the request type ('FORWARD' or 'BACKWARD').
         """
         # Blacklist requests from peers who are not subscribed or have stake less that black_list
-        is_registered = pubkey in self.metagraph.hotkeys
+        metagraph = self.metagraph
+        uid = metagraph.hotkey_to_uid( pubkey )
+        is_registered = uid != -1
 
         # If we allow non-registered requests return False = not blacklisted.
         if not is_registered:
@@ -312,8 +327,7 @@ class Neuron:
                 return True
         else:
             # Else, get stake and check is above blacklist stake min.
-            uid = self.metagraph.hotkeys.index( pubkey )
-            if self.metagraph.S[uid].item() >= self.config.neuron.blacklist:
+            if metagraph.S[uid].item() >= self.config.neuron.blacklist:
                 return False
             else:
                 return True
@@ -347,7 +361,8 @@ class Neuron:
         # --- Load prev state.
         state_dict = self.get_saved_state()
         
-        # --- Loads and syncs metagraph.
+        # --- Loads and syncs metagraph, after a running background sync is swapped in.
+        self.swap_metagraph( wait = True )
         try:
             self.metagraph.sync().save()
             self.stats.last_sync_block= self.subtensor.get_current_block()
@@ -395,13 +410,33 @@ class Neuron:
         # ---- Set weights on chain ----
         self.set_peer_weights()
 
-        # ---- Sync with metagraph ----
-        self.metagraph.sync().save()
-        chain_growth = max(self.metagraph.n.item()- self.nucleus.peer_weights.shape[0], 0)
-        self.nucleus.peer_weights = nn.Parameter(torch.cat([self.nucleus.peer_weights, torch.ones([chain_growth],dtype=torch.float32,requires_grad=True).to(self.device)]))
-        self.stats.scores = torch.nn.Parameter(torch.cat( [self.stats.scores, torch.zeros([chain_growth], dtype=torch.float32, requires_grad=False).to(self.device)]))
-        self.stats.ema_scores = torch.nn.Parameter(torch.cat( [self.stats.ema_scores, torch.zeros([chain_growth], dtype=torch.float32, requires_grad=False).to(self.device)]))
-        bittensor.logging.success( 'Synced metagraph:', 'Block: {}'.format(current_block))
+        # ---- Sync with metagraph in the background, swapped in by swap_metagraph ----
+        self.background_sync.start( incremental = True )
+
+    def swap_metagraph( self, wait: bool = False ):
+        """ Replaces the metagraph with the one synced in the background, once that sync finished.
+        """
+        metagraph = self.background_sync.swap( wait = wait )
+        if metagraph != None:
+            self.metagraph = metagraph
+            bittensor.logging.success( 'Synced metagraph:', 'Block: {}'.format(metagraph.block.item()))
+
+    def on_metagraph_changes( self, changes: 'bittensor.MetagraphChanges' ):
+        r""" Grows the peer weights and scores for new uids and resets them for re-registered uids.
+        """
+        chain_growth = max(changes.n - self.nucleus.peer_weights.shape[0], 0)
+        if chain_growth > 0:
+            self.nucleus.peer_weights = nn.Parameter(torch.cat([self.nucleus.peer_weights, torch.ones([chain_growth],dtype=torch.float32,requires_grad=True).to(self.device)]))
+        for name in [ 'scores', 'ema_scores' ]:
+            growth = max(changes.n - getattr(self.stats, name).shape[0], 0)
+            if growth > 0:
+                setattr(self.stats, name, torch.nn.Parameter(torch.cat( [getattr(self.stats, name), torch.zeros([growth], dtype=torch.float32, requires_grad=False).to(self.device)]), requires_grad=False))
+        reregistered = changes.hotkey_changed.to(self.device)
+        if len(reregistered) > 0:
+            with torch.no_grad():
+                self.nucleus.peer_weights[ reregistered ] = 1
+                self.stats.scores[ reregistered ] = 0
+                self.stats.ema_scores[ reregistered ] = 0
 
     def save( self ):
         r""" Saves the training state to disk.
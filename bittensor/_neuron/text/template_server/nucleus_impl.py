@@ -232,11 +232,12 @@ class server(torch.nn.Module):
         parser.add_argument('--neuron.no_restart', action='store_true', help='if the model should restart', default=False)
         parser.add_argument('--neuron.blacklist.stake', type=float, help='Amount of stake (tao) in order not to get blacklisted', default=0)
         parser.add_argument('--neuron.blocks_per_epoch', type=int, help='Blocks per epoch', default=10)
-        parser.add_argument('--neuron.blacklist.time', type=int, help='how often a peer can query you (seconds) ', default=1)
         parser.add_argument('--neuron.training',  action='store_true', help='if the model should be training (increases memory load)', default=False)
         parser.add_argument('--neuron.autocast',  action='store_true', help='(experimental) autocasts the model to float16. Must require cuda', default=False)
         parser.add_argument('--neuron.blocks_per_set_weights', type=float, help='how often to set weights', default=100)
         parser.add_argument('--neuron.metagraph_sync', type=float, help='how often to sync the metagraph', default=100000)
+        parser.add_argument('--neuron.model_workers', type=int, help='If greater than 0, the model is served from this many worker processes instead of the axon threads', default=0)
+        parser.add_argument('--neuron.model_worker_threads', type=int, help='torch.set_num_threads budget of each model worker process', default=1)
 
 
         bittensor.wallet.add_args( parser )
@@ -30,6 +30,7 @@ import pandas
 import datetime
 from threading import Lock
 from loguru import logger; logger = logger.opt(colors=True)
+from bittensor.utils.model_worker_pool import ModelWorkerPool
 
 def serve( config, model ):
     config.to_defaults()
@@ -53,9 +54,21 @@ def serve( config, model ):
     )
     mutex = Lock()
 
+    # Optionally move the model compute out of the axon process.
+    model_workers = None
+    if config.neuron.model_workers > 0:
+        model_workers = ModelWorkerPool(
+            model,
+            workers = config.neuron.model_workers,
+            threads = config.neuron.model_worker_threads,
+            timeout = config.axon.forward_timeout,
+        ).start()
+
     def forward_text ( inputs_x ):
         r""" Single threaded version of the Forward function that is called when the axon recieves a forward request from other peers
         """ 
+        if model_workers != None:
+            return model_workers.forward( inputs_x )
         return model.encode_forward( inputs_x )
 
 
@@ -63,7 +76,13 @@ def serve( config, model ):
         r"""Single threaded backwards function that is called when the axon recieves a backwards request from other peers.
             Updates the server parameters with gradients through the chain.             
         """
-        if config.neuron.training:
+        if config.neuron.training and model_workers != None:
+            # The workers accumulate into the shared gradients, which must not be reset to None.
+            with mutex:
+                model_workers.backward( inputs_x, grads_dy )
+                optimizer.step()
+                optimizer.zero_grad( set_to_none = False )
+        elif config.neuron.training:
             with mutex:
                 with torch.enable_grad():
                     with torch.autograd.set_detect_anomaly(True):
@@ -104,7 +123,7 @@ def serve( config, model ):
             current_block = subtensor.get_current_block()
 
         nn = subtensor.neuron_for_pubkey(wallet.hotkey.ss58_address)
-        uid = metagraph.hotkeys.index( wallet.hotkey.ss58_address )
+        uid = metagraph.hotkey_index[ wallet.hotkey.ss58_address ]
         wandb_data = {
             'stake': nn.stake,
             'rank': nn.rank,
@@ -55,7 +55,7 @@ class neuron:
         # Load/Sync/Save our metagraph.
         self.metagraph = bittensor.metagraph ( subtensor = self.subtensor ).load().sync().save()
         
-        self.uid = self.metagraph.hotkeys.index ( self.wallet.hotkey.ss58_address )
+        self.uid = self.metagraph.hotkey_index[ self.wallet.hotkey.ss58_address ]
 
         # Create Dendrite.
         self.dendrite = bittensor.dendrite ( config = config )
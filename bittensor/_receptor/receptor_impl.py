@@ -707,6 +707,12 @@ class Receptor(nn.Module):
             request.message = 'grpc.StatusCode.UNAUTHENTICATED'+': '+ rpc_error_call.details()
             self.request_log(request = request, is_response = True, inputs = list(request.inputs.shape))
             return request.code, request.message
+
+        elif grpc_code == grpc.StatusCode.RESOURCE_EXHAUSTED:
+            request.code = bittensor.proto.ReturnCode.Backoff
+            request.message = 'grpc.StatusCode.RESOURCE_EXHAUSTED'+': '+ rpc_error_call.details()
+            self.request_log(request = request, is_response = True, inputs = list(request.inputs.shape))
+            return request.code, request.message
         else:
             request.code = bittensor.proto.ReturnCode.UnknownException
             request.message = 'GRPC error code: {}, details: {}'.format( grpc_code, str(rpc_error_call.details()) )
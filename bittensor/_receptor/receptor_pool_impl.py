@@ -210,6 +210,21 @@ class ReceptorPool ( torch.nn.Module ):
         
         return backward_outputs, backward_codes, backward_times
 
+    def on_metagraph_changes( self, changes: 'bittensor.MetagraphChanges' ):
+        r""" Destroys the receptors of uids which were re-registered, moved to a new address or removed,
+            so the next query connects to the current endpoint. Register with metagraph.subscribe( receptor_pool.on_metagraph_changes ).
+            Args:
+                changes (:obj:`bittensor.MetagraphChanges`, `required`):
+                    changes of the last metagraph sync.
+        """
+        uids = torch.cat( [ changes.hotkey_changed, changes.endpoint_changed, changes.removed_uids ] )
+        if len( uids ) == 0:
+            return
+        for hotkey in changes.previous_endpoints[ uids ].hotkeys():
+            receptor = self.receptors.pop( hotkey, None )
+            if receptor != None:
+                bittensor.logging.destroy_receptor_log( receptor.endpoint )
+
     def _destroy_receptors_over_max_allowed( self ):
         r""" Destroys receptors based on QPS until there are no more than max_active_receptors.
         """
@@ -22,6 +22,8 @@ import copy
 from substrateinterface import SubstrateInterface
 
 from . import subtensor_impl
+from . import connection_pool_impl
+from . import subtensor_mock_impl
 
 __type_registery__ = {
     "runtime_id": 2,
@@ -65,6 +67,9 @@ class subtensor:
             config: 'bittensor.config' = None,
             network: str = None,
             chain_endpoint: str = None,
+            query_cache: bool = None,
+            subscribe_blocks: bool = None,
+            pool_size: int = None,
         ) -> 'bittensor.Subtensor':
         r""" Initializes a subtensor chain interface.
             Args:
@@ -75,12 +80,19 @@ class subtensor:
                             -- nakamoto (main network)
                             -- akatsuki (testing network)
                             -- nobunaga (staging network)
+                            -- mock (in-process chain, configured by subtensor.mock)
                     If this option is set it overloads subtensor.chain_endpoint with 
                     an entry point node from that network.
                 chain_endpoint (default=None, type=str)
                     The subtensor endpoint flag. If set, overrides the network argument.
-                _mock (bool):
-                    returned object is mocks the underlying chain connection.
+                    Several comma separated endpoints are balanced by the connection pool.
+                query_cache (default=False, type=bool)
+                    If True, storage reads are cached per block, see Subtensor.enable_query_cache.
+                subscribe_blocks (default=False, type=bool)
+                    If True, the chain head is followed by a block subscription, see Subtensor.subscribe_blocks.
+                pool_size (default=0, type=int)
+                    If above 0, queries run on a pool of up to pool_size persistent connections across the endpoints
+                    of the network, the fastest healthy endpoint is preferred and failed endpoints are skipped.
         """
         if config == None: config = subtensor.config()
         config = copy.deepcopy( config )
@@ -113,21 +125,49 @@ class subtensor:
         else:
             config.subtensor.chain_endpoint = subtensor.determine_chain_endpoint( bittensor.defaults.subtensor.network )
             config.subtensor.network = bittensor.defaults.subtensor.network
+
+        if config.subtensor.network == 'mock':
+            return subtensor_mock_impl.MockSubtensor.from_config( config )
            
-        substrate = SubstrateInterface(
-            address_type = 42,
-            type_registry_preset='substrate-node-template',
-            type_registry = __type_registery__,
-            url = "ws://{}".format(config.subtensor.chain_endpoint),
-            use_remote_preset=True
-        )
+        config.subtensor.pool_size = pool_size if pool_size != None else config.subtensor.pool_size
+        if config.subtensor.network == 'endpoint':
+            endpoints = config.subtensor.chain_endpoint.split(',')
+        else:
+            endpoints = subtensor.determine_chain_endpoints( config.subtensor.network )
+        if config.subtensor.pool_size > 0:
+            substrate = connection_pool_impl.SubstratePool(
+                urls = [ "ws://{}".format( endpoint ) for endpoint in endpoints ],
+                substrate_kwargs = dict(
+                    ss58_format = 42,
+                    type_registry_preset='substrate-node-template',
+                    type_registry = __type_registery__,
+                    use_remote_preset=True
+                ),
+                size = config.subtensor.pool_size,
+                health_interval = config.subtensor.pool_health_interval,
+            )
+        else:
+            substrate = SubstrateInterface(
+                address_type = 42,
+                type_registry_preset='substrate-node-template',
+                type_registry = __type_registery__,
+                url = "ws://{}".format( endpoints[0] ),
+                use_remote_preset=True
+            )
 
+        config.subtensor.query_cache = query_cache if query_cache != None else config.subtensor.query_cache
+        config.subtensor.subscribe_blocks = subscribe_blocks if subscribe_blocks != None else config.subtensor.subscribe_blocks
         subtensor.check_config( config )
-        return subtensor_impl.Subtensor( 
+        subtensor_obj = subtensor_impl.Subtensor( 
             substrate = substrate,
             network = config.subtensor.network,
             chain_endpoint = config.subtensor.chain_endpoint
         )
+        if config.subtensor.query_cache:
+            subtensor_obj.enable_query_cache( head_ttl = config.subtensor.query_cache_ttl )
+        if config.subtensor.subscribe_blocks:
+            subtensor_obj.subscribe_blocks()
+        return subtensor_obj
 
     @staticmethod   
     def config() -> 'bittensor.Config':
@@ -144,12 +184,25 @@ class subtensor:
                                         -- akatsuki (testing network)
                                         -- nakamoto (master network)
                                         -- local (local running network)
+                                        -- mock (in-process chain, configured by the --subtensor.mock flags)
                                     If this option is set it overloads subtensor.chain_endpoint with 
                                     an entry point node from that network.
                                     ''')
             parser.add_argument('--subtensor.chain_endpoint', default = bittensor.defaults.subtensor.chain_endpoint, type=str, 
                                 help='''The subtensor endpoint flag. If set, overrides the --network flag.
                                     ''')       
+            parser.add_argument('--subtensor.pool_size', type=int, help='''If above 0, queries run on a pool of up to this many persistent connections, balanced across the network endpoints.''', default = bittensor.defaults.subtensor.pool_size)
+            parser.add_argument('--subtensor.pool_health_interval', type=float, help='''Seconds between health checks of the connection pool endpoints, 0 disables them.''', default = bittensor.defaults.subtensor.pool_health_interval)
+            parser.add_argument('--subtensor.query_cache', action='store_true', help='''If set, storage reads are cached per block, repeated reads within a block cost no RPC.''', default = bittensor.defaults.subtensor.query_cache)
+            parser.add_argument('--subtensor.subscribe_blocks', action='store_true', help='''If set, the chain head is followed by a block subscription, current block reads cost no RPC.''', default = bittensor.defaults.subtensor.subscribe_blocks)
+            parser.add_argument('--subtensor.query_cache_ttl', type=float, help='''Seconds the chain head is reused by the query cache before it is queried again.''', default = bittensor.defaults.subtensor.query_cache_ttl)
+            parser.add_argument('--subtensor.mock.n', type=int, help='''Number of neurons registered on the mock network.''', default = bittensor.defaults.subtensor.mock.n)
+            parser.add_argument('--subtensor.mock.seed', type=int, help='''Seed of the mock network state, equal seeds give equal networks.''', default = bittensor.defaults.subtensor.mock.seed)
+            parser.add_argument('--subtensor.mock.block_time', type=float, help='''Seconds between mock network blocks, 0 only advances blocks when they are waited for.''', default = bittensor.defaults.subtensor.mock.block_time)
+            parser.add_argument('--subtensor.mock.weights_per_uid', type=int, help='''Number of weights each mock network neuron sets.''', default = bittensor.defaults.subtensor.mock.weights_per_uid)
+            parser.add_argument('--subtensor.mock.weight_distribution', type=str, choices=['uniform', 'zipf'], help='''Distribution the mock network weight destinations are drawn from.''', default = bittensor.defaults.subtensor.mock.weight_distribution)
+            parser.add_argument('--subtensor.mock.serving_fraction', type=float, help='''Fraction of the mock network neurons serving an endpoint.''', default = bittensor.defaults.subtensor.mock.serving_fraction)
+            parser.add_argument('--subtensor.mock.difficulty', type=int, help='''Registration difficulty reported by the mock network.''', default = bittensor.defaults.subtensor.mock.difficulty)
         except argparse.ArgumentError:
             # re-parsing arguments.
             pass
@@ -161,26 +214,50 @@ class subtensor:
         defaults.subtensor = bittensor.Config()
         defaults.subtensor.network = os.getenv('BT_SUBTENSOR_NETWORK') if os.getenv('BT_SUBTENSOR_NETWORK') != None else 'nakamoto'
         defaults.subtensor.chain_endpoint = os.getenv('BT_SUBTENSOR_CHAIN_ENDPOINT') if os.getenv('BT_SUBTENSOR_CHAIN_ENDPOINT') != None else None
+        defaults.subtensor.pool_size = os.getenv('BT_SUBTENSOR_POOL_SIZE') if os.getenv('BT_SUBTENSOR_POOL_SIZE') != None else 0
+        defaults.subtensor.pool_health_interval = os.getenv('BT_SUBTENSOR_POOL_HEALTH_INTERVAL') if os.getenv('BT_SUBTENSOR_POOL_HEALTH_INTERVAL') != None else 30.0
+        defaults.subtensor.query_cache = os.getenv('BT_SUBTENSOR_QUERY_CACHE') == 'True' if os.getenv('BT_SUBTENSOR_QUERY_CACHE') != None else False
+        defaults.subtensor.subscribe_blocks = os.getenv('BT_SUBTENSOR_SUBSCRIBE_BLOCKS') == 'True' if os.getenv('BT_SUBTENSOR_SUBSCRIBE_BLOCKS') != None else False
+        defaults.subtensor.query_cache_ttl = os.getenv('BT_SUBTENSOR_QUERY_CACHE_TTL') if os.getenv('BT_SUBTENSOR_QUERY_CACHE_TTL') != None else 3.0
+
+        defaults.subtensor.mock = bittensor.Config()
+        defaults.subtensor.mock.n = os.getenv('BT_SUBTENSOR_MOCK_N') if os.getenv('BT_SUBTENSOR_MOCK_N') != None else 100
+        defaults.subtensor.mock.seed = os.getenv('BT_SUBTENSOR_MOCK_SEED') if os.getenv('BT_SUBTENSOR_MOCK_SEED') != None else 0
+        defaults.subtensor.mock.block_time = os.getenv('BT_SUBTENSOR_MOCK_BLOCK_TIME') if os.getenv('BT_SUBTENSOR_MOCK_BLOCK_TIME') != None else 0
+        defaults.subtensor.mock.weights_per_uid = os.getenv('BT_SUBTENSOR_MOCK_WEIGHTS_PER_UID') if os.getenv('BT_SUBTENSOR_MOCK_WEIGHTS_PER_UID') != None else 32
+        defaults.subtensor.mock.weight_distribution = os.getenv('BT_SUBTENSOR_MOCK_WEIGHT_DISTRIBUTION') if os.getenv('BT_SUBTENSOR_MOCK_WEIGHT_DISTRIBUTION') != None else 'zipf'
+        defaults.subtensor.mock.serving_fraction = os.getenv('BT_SUBTENSOR_MOCK_SERVING_FRACTION') if os.getenv('BT_SUBTENSOR_MOCK_SERVING_FRACTION') != None else 0.8
+        defaults.subtensor.mock.difficulty = os.getenv('BT_SUBTENSOR_MOCK_DIFFICULTY') if os.getenv('BT_SUBTENSOR_MOCK_DIFFICULTY') != None else 1
 
     @staticmethod   
     def check_config( config: 'bittensor.Config' ):
         assert config.subtensor
         assert config.subtensor.network != None
+        assert config.subtensor.pool_size >= 0, 'subtensor.pool_size must be non-negative'
+        assert config.subtensor.query_cache_ttl >= 0, 'subtensor.query_cache_ttl must be non-negative'
+        if config.subtensor.network == 'mock':
+            assert config.subtensor.mock.n >= 0, 'subtensor.mock.n must be non-negative'
+            assert config.subtensor.mock.block_time >= 0, 'subtensor.mock.block_time must be non-negative'
+            assert config.subtensor.mock.weight_distribution in subtensor_mock_impl.WEIGHT_DISTRIBUTIONS, 'subtensor.mock.weight_distribution must be uniform or zipf'
 
     @staticmethod
     def determine_chain_endpoint(network: str):
+        return subtensor.determine_chain_endpoints( network )[0]
+
+    @staticmethod
+    def determine_chain_endpoints(network: str):
         if network == "nakamoto":
             # Main network.
-            return bittensor.__nakamoto_entrypoints__[0]
+            return bittensor.__nakamoto_entrypoints__
         elif network == "akatsuki":
             # Testing network.
-            return bittensor.__akatsuki_entrypoints__[0]
+            return bittensor.__akatsuki_entrypoints__
         elif network == "nobunaga": 
             # Staging network.
-            return bittensor.__nobunaga_entrypoints__[0]
+            return bittensor.__nobunaga_entrypoints__
         elif network == "local":
             # Local chain.
-            return bittensor.__local_entrypoints__[0]
+            return bittensor.__local_entrypoints__
         else:
-            return bittensor.__local_entrypoints__[0]
+            return bittensor.__local_entrypoints__
         
@@ -0,0 +1,177 @@
+""" Local chain clock kept by a new heads subscription.
+"""
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import hashlib
+import threading
+import time
+from typing import Callable, Optional
+
+from loguru import logger
+
+RECONNECT_DELAY = 2
+# Block times after the last head past which the clock stops extrapolating.
+MAX_EXTRAPOLATED_BLOCKS = 3
+
+def _compact( value: int ) -> bytes:
+    r""" SCALE compact encoding of an unsigned int.
+    """
+    if value < 1 << 6:
+        return bytes( [ value << 2 ] )
+    if value < 1 << 14:
+        return ( ( value << 2 ) | 1 ).to_bytes( 2, 'little' )
+    if value < 1 << 30:
+        return ( ( value << 2 ) | 2 ).to_bytes( 4, 'little' )
+    data = value.to_bytes( ( value.bit_length() + 7 ) // 8, 'little' )
+    return bytes( [ ( ( len(data) - 4 ) << 2 ) | 3 ] ) + data
+
+def header_hash( header: dict ) -> str:
+    r""" Returns the block hash of a header as sent by chain_subscribeNewHeads, the blake2 256 hash of its SCALE encoding.
+    """
+    logs = header['digest']['logs']
+    number = header['number']
+    encoded = b''.join( [
+        bytes.fromhex( header['parentHash'][2:] ),
+        _compact( int( number, 16 ) if isinstance( number, str ) else int( number ) ),
+        bytes.fromhex( header['stateRoot'][2:] ),
+        bytes.fromhex( header['extrinsicsRoot'][2:] ),
+        _compact( len(logs) ),
+    ] + [ bytes.fromhex( log[2:] ) for log in logs ] )
+    return '0x' + hashlib.blake2b( encoded, digest_size = 32 ).hexdigest()
+
+class ChainClock():
+    r""" Follows the chain head on a background thread subscribed to new heads, so the current block is read locally
+        instead of with an RPC. The subscription holds its websocket, so the clock runs on its own connection and
+        reconnects if it drops. Between heads the block number is extrapolated by the block time, for at most
+        max_extrapolated_blocks blocks: past that the subscription is presumed stalled and the block is unknown.
+    """
+    def __init__( self, connect: Callable[ [], 'SubstrateInterface' ], block_time: float, on_head: Callable[ [ int, str ], None ] = None, max_extrapolated_blocks: int = MAX_EXTRAPOLATED_BLOCKS ):
+        r""" Initializes the clock.
+            Args:
+                connect (:type:`Callable`, `required`):
+                    returns a new substrate connection for the subscription.
+                block_time (:type:`float`, `required`):
+                    seconds between blocks.
+                on_head (:type:`Callable`, `optional`):
+                    called with the block number and hash of each new head, on the subscription thread.
+                max_extrapolated_blocks (:type:`int`, `optional`):
+                    block times after the last head for which the block is extrapolated.
+        """
+        self.connect = connect
+        self.block_time = block_time
+        self.on_head = on_head
+        self.max_extrapolated_blocks = max_extrapolated_blocks
+        self.head_number = None
+        self.head_hash = None
+        self._head_time = None
+        self._head = threading.Condition()
+        self._stop = threading.Event()
+        self._substrate = None
+        self._thread = None
+
+    def start( self ):
+        r""" Starts the subscription thread.
+        """
+        if self.running():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread( target = self._run, daemon = True )
+        self._thread.start()
+
+    def stop( self ):
+        r""" Stops the subscription thread.
+        """
+        self._stop.set()
+        substrate = self._substrate
+        if substrate != None:
+            # Unblocks the subscription waiting on the socket, it may resubscribe once and end on the next head.
+            substrate.close()
+        if self._thread != None:
+            self._thread.join( timeout = self.block_time )
+        self._thread = None
+
+    def running( self ) -> bool:
+        return self._thread != None and self._thread.is_alive()
+
+    def _run( self ):
+        while not self._stop.is_set():
+            try:
+                self._substrate = self.connect()
+                self._substrate.rpc_request( 'chain_subscribeNewHeads', [], result_handler = self._on_message )
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                logger.warning('Block subscription dropped, reconnecting: {}', e)
+                self._stop.wait( RECONNECT_DELAY )
+            finally:
+                if self._substrate != None:
+                    self._substrate.close()
+                self._substrate = None
+
+    def _on_message( self, message: dict, update_nr: int, subscription_id: str ):
+        # Returning a value ends the subscription.
+        if self._stop.is_set():
+            return True
+        header = message['params']['result']
+        self.set_head( int( header['number'], 16 ), header_hash( header ) )
+        return None
+
+    def set_head( self, number: int, block_hash: str ):
+        r""" Records a new head and wakes the waiting callers.
+        """
+        with self._head:
+            if self.head_number != None and number < self.head_number:
+                # A late or reorganized header, the clock does not move back.
+                return
+            self.head_number = number
+            self.head_hash = block_hash
+            self._head_time = time.monotonic()
+            self._head.notify_all()
+        if self.on_head != None:
+            self.on_head( number, block_hash )
+
+    @property
+    def block( self ) -> Optional[int]:
+        r""" Returns the current block, the last head plus the number of block times since it was received,
+            or None before the first head and once the last head is more than max_extrapolated_blocks block times old.
+        """
+        with self._head:
+            if self.head_number == None:
+                return None
+            elapsed = int( ( time.monotonic() - self._head_time ) // self.block_time )
+            if elapsed > self.max_extrapolated_blocks:
+                return None
+            return self.head_number + elapsed
+
+    def wait_for_block( self, block: int = None, timeout: float = None ) -> Optional[int]:
+        r""" Waits until a head at or past block is received.
+            Args:
+                block (:type:`int`, `optional`):
+                    block to wait for, the block after the last head if None.
+                timeout (:type:`float`, `optional`):
+                    seconds to wait, forever if None.
+            Returns:
+                block (:type:`int`):
+                    the last head number, None if the timeout expired first.
+        """
+        with self._head:
+            if block == None:
+                block = 0 if self.head_number == None else self.head_number + 1
+            if self._head.wait_for( lambda: self.head_number != None and self.head_number >= block, timeout = timeout ):
+                return self.head_number
+            return None
@@ -0,0 +1,354 @@
+""" Pool of persistent substrate websocket connections across the chain endpoints of a network.
+"""
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional, Tuple
+
+from loguru import logger
+from substrateinterface import SubstrateInterface
+from websocket import WebSocketException
+
+# Errors after which a connection is dropped, any other error leaves it in the pool.
+CONNECTION_ERRORS = ( ConnectionError, OSError, TimeoutError, WebSocketException )
+
+class EndpointHealth():
+    r""" Health and latency of one chain endpoint.
+    """
+    def __init__( self, url: str ):
+        self.url = url
+        self.latency = None
+        self.failures = 0
+        self.retry_at = 0.0
+        self.active = 0
+        self.connections = 0
+
+    def healthy( self, now: float ) -> bool:
+        return self.retry_at <= now
+
+    def score( self ) -> float:
+        r""" Lower is preferred, latency weighted by the connections in use. Unmeasured endpoints come first.
+        """
+        return ( self.latency or 0.0 ) * ( 1 + self.active )
+
+    def as_dict( self ) -> dict:
+        return {
+            'url': self.url,
+            'latency': self.latency,
+            'failures': self.failures,
+            'healthy': self.healthy( time.monotonic() ),
+            'active': self.active,
+            'connections': self.connections,
+        }
+
+class SubstratePool():
+    r""" Keeps up to size persistent substrate connections across the endpoints of a network. Used as the substrate of a
+        Subtensor: `with pool as substrate` checks out a connection of the fastest healthy endpoint, weighted by the
+        connections it already serves, and returns it to the pool afterwards instead of closing it. Nested checkouts on
+        a thread share one connection. A connection which fails is dropped and its endpoint backs off exponentially, so
+        the retries of the caller move to another endpoint. Reconnects are limited to max_reconnects per reconnect_window
+        seconds. A health thread pings the idle connections every health_interval seconds to track latency, and probes
+        endpoints whose back off expired.
+    """
+    def __init__(
+            self,
+            urls: List[str],
+            substrate_kwargs: dict = None,
+            size: int = 4,
+            health_interval: float = 30.0,
+            max_reconnects: int = 10,
+            reconnect_window: float = 60.0,
+            backoff: float = 2.0,
+            max_backoff: float = 60.0,
+            latency_decay: float = 0.8,
+            connect: Callable[ [str], 'SubstrateInterface' ] = None,
+        ):
+        r""" Initializes the pool, connections are opened on demand.
+            Args:
+                urls (:obj:`List[str]`, `required`):
+                    websocket urls of the chain endpoints.
+                substrate_kwargs (:obj:`dict`, `optional`):
+                    arguments of each SubstrateInterface besides the url.
+                size (:type:`int`, `optional`):
+                    maximum number of open connections.
+                health_interval (:type:`float`, `optional`):
+                    seconds between health checks, 0 disables the health thread.
+                max_reconnects (:type:`int`, `optional`):
+                    maximum number of connection attempts per reconnect_window.
+                reconnect_window (:type:`float`, `optional`):
+                    seconds over which reconnects are counted.
+                backoff (:type:`float`, `optional`):
+                    seconds a failed endpoint is skipped, doubled on each consecutive failure.
+                max_backoff (:type:`float`, `optional`):
+                    maximum seconds a failed endpoint is skipped.
+                latency_decay (:type:`float`, `optional`):
+                    weight of the previous latency in the moving average.
+                connect (:type:`Callable`, `optional`):
+                    opens a connection to a url, defaults to a SubstrateInterface with substrate_kwargs.
+        """
+        if len( urls ) == 0:
+            raise ValueError('A substrate pool needs at least one endpoint')
+        self.endpoints = [ EndpointHealth( url ) for url in urls ]
+        self.substrate_kwargs = substrate_kwargs if substrate_kwargs != None else {}
+        self.size = size
+        self.health_interval = health_interval
+        self.max_reconnects = max_reconnects
+        self.reconnect_window = reconnect_window
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.latency_decay = latency_decay
+        self.connect = connect if connect != None else lambda url: SubstrateInterface( url = url, **self.substrate_kwargs )
+        self._idle = []
+        self._open = 0
+        self._reconnects = deque()
+        self._condition = threading.Condition()
+        self._local = threading.local()
+        self._closed = threading.Event()
+        self._health_thread = None
+        if health_interval > 0:
+            self._health_thread = threading.Thread( target = self._health_loop, daemon = True )
+            self._health_thread.start()
+
+    def __str__( self ):
+        return "SubstratePool({})".format( ', '.join( [ endpoint.url for endpoint in self.endpoints ] ) )
+
+    def __repr__( self ):
+        return self.__str__()
+
+    @property
+    def url( self ) -> str:
+        r""" Url of the preferred endpoint.
+        """
+        with self._condition:
+            return self._best().url
+
+    @property
+    def ss58_format( self ) -> int:
+        return self.substrate_kwargs.get( 'ss58_format' )
+
+    @property
+    def type_registry_preset( self ) -> str:
+        return self.substrate_kwargs.get( 'type_registry_preset' )
+
+    @property
+    def type_registry( self ) -> dict:
+        return self.substrate_kwargs.get( 'type_registry' )
+
+    def __getattr__( self, name: str ):
+        # Substrate methods called on the pool run on a checked out connection.
+        if name.startswith( '_' ):
+            raise AttributeError( name )
+        def call( *args, **kwargs ):
+            with self as substrate:
+                return getattr( substrate, name )( *args, **kwargs )
+        return call
+
+    def stats( self ) -> List[dict]:
+        r""" Returns the url, latency, failures, health and connections of each endpoint.
+        """
+        with self._condition:
+            return [ endpoint.as_dict() for endpoint in self.endpoints ]
+
+    def _best( self, exclude: List[EndpointHealth] = [] ) -> Optional[EndpointHealth]:
+        r""" Returns the preferred healthy endpoint, or the one which recovers first if none is healthy.
+        """
+        now = time.monotonic()
+        candidates = [ endpoint for endpoint in self.endpoints if endpoint not in exclude ]
+        if len( candidates ) == 0:
+            return None
+        healthy = [ endpoint for endpoint in candidates if endpoint.healthy( now ) ]
+        if len( healthy ) == 0:
+            return min( candidates, key = lambda endpoint: endpoint.retry_at )
+        return min( healthy, key = lambda endpoint: endpoint.score() )
+
+    def _record_latency( self, endpoint: EndpointHealth, latency: float ):
+        endpoint.latency = latency if endpoint.latency == None else self.latency_decay * endpoint.latency + ( 1 - self.latency_decay ) * latency
+
+    def _record_failure( self, endpoint: EndpointHealth, error: Exception ):
+        endpoint.failures += 1
+        endpoint.retry_at = time.monotonic() + min( self.backoff * 2 ** ( endpoint.failures - 1 ), self.max_backoff )
+        logger.warning('Chain endpoint {} failed ({} in a row): {}', endpoint.url, endpoint.failures, error)
+
+    def _take_reconnect( self ):
+        now = time.monotonic()
+        while len( self._reconnects ) > 0 and self._reconnects[0] < now - self.reconnect_window:
+            self._reconnects.popleft()
+        if len( self._reconnects ) >= self.max_reconnects:
+            raise ConnectionError('Reconnect budget of {} per {}s exhausted'.format( self.max_reconnects, self.reconnect_window ))
+        self._reconnects.append( now )
+
+    def _connect( self, endpoint: EndpointHealth ) -> SubstrateInterface:
+        r""" Opens a connection outside the lock, its slot is already counted in self._open.
+        """
+        start = time.monotonic()
+        try:
+            substrate = self.connect( endpoint.url )
+        except Exception as e:
+            with self._condition:
+                self._open -= 1
+                self._record_failure( endpoint, e )
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._record_latency( endpoint, time.monotonic() - start )
+            endpoint.failures = 0
+            endpoint.connections += 1
+        return substrate
+
+    def _acquire( self ) -> Tuple[ EndpointHealth, SubstrateInterface ]:
+        tried = []
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed.is_set():
+                        raise ConnectionError('The substrate pool is closed')
+                    best = self._best( exclude = tried )
+                    if best == None:
+                        raise ConnectionError('No chain endpoint of {} could be connected'.format( self ))
+                    idle = [ index for index, ( endpoint, _ ) in enumerate( self._idle ) if endpoint is best ]
+                    if len( idle ) > 0:
+                        endpoint, substrate = self._idle.pop( idle[-1] )
+                        endpoint.active += 1
+                        return endpoint, substrate
+                    if self._open < self.size:
+                        self._take_reconnect()
+                        self._open += 1
+                        best.active += 1
+                        break
+                    now = time.monotonic()
+                    idle = [ index for index, ( endpoint, _ ) in enumerate( self._idle ) if endpoint.healthy( now ) ]
+                    if len( idle ) > 0:
+                        endpoint, substrate = self._idle.pop( idle[-1] )
+                        endpoint.active += 1
+                        return endpoint, substrate
+                    if len( self._idle ) > 0:
+                        # Only connections of failing endpoints are idle, make room for a new one.
+                        endpoint, substrate = self._idle.pop( 0 )
+                        self._discard( endpoint, substrate )
+                        continue
+                    self._condition.wait()
+            try:
+                return best, self._connect( best )
+            except Exception:
+                with self._condition:
+                    best.active -= 1
+                tried.append( best )
+
+    def _discard( self, endpoint: EndpointHealth, substrate: SubstrateInterface ):
+        r""" Drops a connection, under the lock.
+        """
+        self._open -= 1
+        endpoint.connections -= 1
+        try:
+            substrate.close()
+        except Exception:
+            pass
+        self._condition.notify()
+
+    def _release( self, endpoint: EndpointHealth, substrate: SubstrateInterface, error: Exception = None ):
+        with self._condition:
+            endpoint.active -= 1
+            if isinstance( error, CONNECTION_ERRORS ):
+                self._record_failure( endpoint, error )
+                self._discard( endpoint, substrate )
+            elif self._closed.is_set() or ( error != None and not isinstance( error, Exception ) ):
+                # Interrupted mid request, the connection may hold a partial response.
+                self._discard( endpoint, substrate )
+            else:
+                self._idle.append( ( endpoint, substrate ) )
+                self._condition.notify()
+
+    def __enter__( self ) -> SubstrateInterface:
+        held = getattr( self._local, 'held', None )
+        if held == None:
+            endpoint, substrate = self._acquire()
+            held = self._local.held = [ endpoint, substrate, 0 ]
+        held[2] += 1
+        return held[1]
+
+    def __exit__( self, exc_type, exc_value, traceback ):
+        held = self._local.held
+        held[2] -= 1
+        if held[2] == 0:
+            self._local.held = None
+            self._release( held[0], held[1], exc_value )
+
+    def _ping( self, endpoint: EndpointHealth, substrate: SubstrateInterface ) -> bool:
+        start = time.monotonic()
+        try:
+            substrate.rpc_request( 'system_health', [] )
+        except Exception as e:
+            self._release( endpoint, substrate, e if isinstance( e, CONNECTION_ERRORS ) else ConnectionError( str( e ) ) )
+            return False
+        with self._condition:
+            self._record_latency( endpoint, time.monotonic() - start )
+            endpoint.failures = 0
+        self._release( endpoint, substrate )
+        return True
+
+    def check( self ) -> int:
+        r""" Pings each idle connection and probes the endpoints without connections whose back off expired.
+            Returns:
+                healthy (:type:`int`):
+                    number of endpoints which answered.
+        """
+        with self._condition:
+            idle, self._idle = self._idle, []
+            for endpoint, _ in idle:
+                endpoint.active += 1
+            now = time.monotonic()
+            connected = set( [ endpoint for endpoint, _ in idle ] )
+            probes = [ endpoint for endpoint in self.endpoints if endpoint not in connected and endpoint.connections == 0 and endpoint.healthy( now ) and self._open < self.size ]
+        answered = set()
+        for endpoint, substrate in idle:
+            if self._ping( endpoint, substrate ):
+                answered.add( endpoint )
+        for endpoint in probes:
+            with self._condition:
+                if self._open >= self.size:
+                    break
+                self._open += 1
+                endpoint.active += 1
+            try:
+                substrate = self._connect( endpoint )
+            except Exception:
+                with self._condition:
+                    endpoint.active -= 1
+                continue
+            if self._ping( endpoint, substrate ):
+                answered.add( endpoint )
+        return len( answered )
+
+    def _health_loop( self ):
+        while not self._closed.wait( self.health_interval ):
+            try:
+                self.check()
+            except Exception as e:
+                logger.warning('Substrate pool health check failed: {}', e)
+
+    def close( self ):
+        r""" Closes the idle connections, connections in use are closed when released.
+        """
+        self._closed.set()
+        with self._condition:
+            for endpoint, substrate in self._idle:
+                self._discard( endpoint, substrate )
+            self._idle = []
+            self._condition.notify_all()
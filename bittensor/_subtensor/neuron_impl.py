@@ -0,0 +1,178 @@
+""" Compact neuron records returned by the subtensor.
+"""
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import itertools
+from typing import Dict, Iterator, List, NamedTuple, Sequence, Tuple, Union
+
+import numpy
+
+RAOPERTAO = 1000000000
+U64MAX = 18446744073709551615
+NULL_HOTKEY = '5C4hrfjw9DjXZTzV3MwzrrAr9P1MJhSrvWGWqi1eSuyUpnhM'
+
+class Neuron( NamedTuple ):
+    r""" Immutable neuron record, with stake and emission in tao and the scores normalized to [0, 1].
+    """
+    version: int = 0
+    uid: int = 0
+    active: int = 0
+    stake: float = 0
+    rank: float = 0
+    trust: float = 0
+    consensus: float = 0
+    incentive: float = 0
+    dividends: float = 0
+    emission: float = 0
+    last_update: int = 0
+    priority: int = 0
+    ip: int = 0
+    ip_type: int = 0
+    port: int = 0
+    modality: int = 0
+    hotkey: str = "000000000000000000000000000000000000000000000000"
+    coldkey: str = "000000000000000000000000000000000000000000000000"
+    # Empty tuples, a list default would be one list shared by every record.
+    weights: Sequence[Tuple[int, int]] = ()
+    bonds: Sequence[Tuple[int, int]] = ()
+    is_null: bool = False
+
+    @staticmethod
+    def from_dict( neuron_dict: dict ) -> 'Neuron':
+        r""" Decodes a chain neuron dict, the null neuron is returned for unregistered uids.
+        """
+        if neuron_dict['hotkey'] == NULL_HOTKEY:
+            return NULL_NEURON
+        return Neuron(
+            version = neuron_dict['version'],
+            uid = neuron_dict['uid'],
+            active = neuron_dict['active'],
+            stake = neuron_dict['stake'] / RAOPERTAO,
+            rank = neuron_dict['rank'] / U64MAX,
+            trust = neuron_dict['trust'] / U64MAX,
+            consensus = neuron_dict['consensus'] / U64MAX,
+            incentive = neuron_dict['incentive'] / U64MAX,
+            dividends = neuron_dict['dividends'] / U64MAX,
+            emission = neuron_dict['emission'] / RAOPERTAO,
+            last_update = neuron_dict['last_update'],
+            priority = neuron_dict['priority'],
+            ip = neuron_dict['ip'],
+            ip_type = neuron_dict['ip_type'],
+            port = neuron_dict['port'],
+            modality = neuron_dict['modality'],
+            hotkey = neuron_dict['hotkey'],
+            coldkey = neuron_dict['coldkey'],
+            weights = neuron_dict['weights'],
+            bonds = neuron_dict['bonds'],
+            is_null = False,
+        )
+
+# Records are immutable so a single null neuron is shared.
+NULL_NEURON = Neuron( is_null = True )
+
+def _object_column( values: List ) -> numpy.ndarray:
+    r""" Returns a 1-d object array, numpy.array would stack lists of equal length into a matrix.
+    """
+    column = numpy.empty( len(values), dtype = object )
+    column[:] = values
+    return column
+
+class NeuronBatch():
+    r""" Columnar batch of neurons with one array per Neuron field, numeric fields are fixed dtype numpy arrays
+        and the ip, keys, weights and bonds are object arrays. Indexing with an int returns a Neuron record,
+        so the batch can be used as a list of neurons.
+    """
+    __slots__ = Neuron._fields
+    int_fields = ( 'version', 'uid', 'active', 'last_update', 'priority', 'ip_type', 'port', 'modality' )
+    float_fields = ( 'stake', 'rank', 'trust', 'consensus', 'incentive', 'dividends', 'emission' )
+    object_fields = ( 'ip', 'hotkey', 'coldkey', 'weights', 'bonds' )
+
+    def __init__( self, **columns ):
+        for field in Neuron._fields:
+            setattr( self, field, columns[field] )
+
+    @staticmethod
+    def from_neurons( neurons: List[ Union[ Neuron, object ] ] ) -> 'NeuronBatch':
+        r""" Stacks neurons, or any objects with the Neuron fields as attributes, into a batch.
+            Missing attributes take the Neuron defaults.
+        """
+        defaults = Neuron._field_defaults
+        columns = {}
+        for field in NeuronBatch.int_fields:
+            columns[field] = numpy.fromiter( ( getattr( n, field, defaults[field] ) for n in neurons ), dtype = numpy.int64, count = len(neurons) )
+        for field in NeuronBatch.float_fields:
+            columns[field] = numpy.fromiter( ( getattr( n, field, defaults[field] ) for n in neurons ), dtype = numpy.float64, count = len(neurons) )
+        for field in NeuronBatch.object_fields:
+            columns[field] = _object_column( [ getattr( n, field, defaults[field] ) for n in neurons ] )
+        columns['is_null'] = numpy.fromiter( ( getattr( n, 'is_null', False ) for n in neurons ), dtype = bool, count = len(neurons) )
+        return NeuronBatch( **columns )
+
+    def to_columns( self ) -> Dict[ str, numpy.ndarray ]:
+        r""" Encodes the batch as fixed dtype arrays only, so it can be stored without pickling.
+            Keys and ips are unicode arrays, weights and bonds are stored as a count per neuron
+            and their stacked (uid, value) pairs.
+        """
+        columns = { field: getattr( self, field ) for field in NeuronBatch.int_fields + NeuronBatch.float_fields + ( 'is_null', ) }
+        columns['ip'] = numpy.array( [ str(ip) for ip in self.ip ], dtype = numpy.str_ )
+        columns['hotkey'] = numpy.array( list( self.hotkey ), dtype = numpy.str_ )
+        columns['coldkey'] = numpy.array( list( self.coldkey ), dtype = numpy.str_ )
+        for field in ( 'weights', 'bonds' ):
+            counts = numpy.fromiter( ( len( pairs ) for pairs in getattr( self, field ) ), dtype = numpy.int64, count = len(self) )
+            total = int( counts.sum() )
+            pairs = numpy.fromiter( itertools.chain.from_iterable( itertools.chain.from_iterable( getattr( self, field ) ) ), dtype = numpy.int64, count = 2 * total )
+            columns[ field + '_counts' ] = counts
+            columns[ field + '_pairs' ] = pairs.reshape( total, 2 )
+        return columns
+
+    @staticmethod
+    def from_columns( columns: Dict[ str, numpy.ndarray ] ) -> 'NeuronBatch':
+        r""" Decodes a batch encoded by to_columns.
+        """
+        batch = { field: numpy.asarray( columns[field], dtype = numpy.int64 ) for field in NeuronBatch.int_fields }
+        batch.update( { field: numpy.asarray( columns[field], dtype = numpy.float64 ) for field in NeuronBatch.float_fields } )
+        batch['is_null'] = numpy.asarray( columns['is_null'], dtype = bool )
+        # Chain ips are integers, ips given as strings are kept as strings.
+        batch['ip'] = _object_column( [ int(ip) if ip.isdigit() else ip for ip in columns['ip'].tolist() ] )
+        batch['hotkey'] = _object_column( columns['hotkey'].tolist() )
+        batch['coldkey'] = _object_column( columns['coldkey'].tolist() )
+        for field in ( 'weights', 'bonds' ):
+            pairs = columns[ field + '_pairs' ].tolist()
+            ends = numpy.cumsum( columns[ field + '_counts' ] ).tolist()
+            batch[field] = _object_column( [ pairs[ start:end ] for start, end in zip( [0] + ends[:-1], ends ) ] )
+        return NeuronBatch( **batch )
+
+    def __len__( self ) -> int:
+        return len( self.uid )
+
+    def __getitem__( self, index: Union[ int, numpy.ndarray, slice ] ) -> Union[ Neuron, 'NeuronBatch' ]:
+        r""" Returns the Neuron at an int index, or the batch of the neurons selected by a slice, mask or index array.
+        """
+        if isinstance( index, ( int, numpy.integer ) ):
+            return Neuron( *[ getattr( self, field )[ index ].item() if field not in NeuronBatch.object_fields else getattr( self, field )[ index ] for field in Neuron._fields ] )
+        return NeuronBatch( **{ field: getattr( self, field )[ index ] for field in Neuron._fields } )
+
+    def __iter__( self ) -> Iterator[ Neuron ]:
+        for index in range( len(self) ):
+            yield self[ index ]
+
+    def __getstate__( self ):
+        return { field: getattr( self, field ) for field in Neuron._fields }
+
+    def __setstate__( self, state: dict ):
+        for field in Neuron._fields:
+            setattr( self, field, state[field] )
@@ -0,0 +1,136 @@
+""" Block scoped cache of subtensor storage queries.
+"""
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+class QueryCache():
+    r""" Caches storage query results keyed by ( module, storage function, params ) and the hash of the block they were read at.
+        Reads at the chain head are kept until the head moves to a new block, the head hash itself is trusted for head_ttl
+        seconds, or until set_head() is called by a block subscription. Storage at a past block never changes, so reads at
+        an explicit block are kept until evicted, least recently used first, past max_entries.
+    """
+    def __init__( self, head_ttl: float = 3.0, max_entries: int = 65536 ):
+        r""" Initializes the cache.
+            Args:
+                head_ttl (:type:`float`, `optional`):
+                    seconds the chain head hash is reused before it is queried again.
+                max_entries (:type:`int`, `optional`):
+                    maximum number of historical entries and block hashes kept.
+        """
+        self.head_ttl = head_ttl
+        self.max_entries = max_entries
+        self.head_hash = None
+        self._head_time = 0.0
+        self._current = {}
+        self._historical = OrderedDict()
+        self._block_hashes = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.head_queries = 0
+
+    def set_head( self, block_hash: str ):
+        r""" Sets the chain head hash, entries read at a previous head are dropped.
+        """
+        with self._lock:
+            if block_hash != self.head_hash:
+                self._current = {}
+                self.head_hash = block_hash
+            self._head_time = time.monotonic()
+
+    def head( self, substrate: 'SubstrateInterface' ) -> str:
+        r""" Returns the chain head hash, queried at most once per head_ttl seconds.
+        """
+        with self._lock:
+            if self.head_hash == None or time.monotonic() - self._head_time > self.head_ttl:
+                self.head_queries += 1
+                self.set_head( substrate.get_chain_head() )
+            return self.head_hash
+
+    def block_hash( self, substrate: 'SubstrateInterface', block: int ) -> str:
+        r""" Returns the hash of a block number.
+        """
+        with self._lock:
+            if block in self._block_hashes:
+                self._block_hashes.move_to_end( block )
+                return self._block_hashes[block]
+            block_hash = substrate.get_block_hash( block )
+            self._block_hashes[block] = block_hash
+            if len( self._block_hashes ) > self.max_entries:
+                self._block_hashes.popitem( last = False )
+            return block_hash
+
+    def get( self, key: Hashable, block_hash: str, historical: bool, query: Callable[ [], Any ] ) -> Any:
+        r""" Returns the cached result of key at block_hash, or calls query and caches its result.
+            Args:
+                key (:type:`Hashable`, `required`):
+                    the module, storage function and params of the query.
+                block_hash (:type:`str`, `required`):
+                    hash of the block read at.
+                historical (:type:`bool`, `required`):
+                    True if the block was requested explicitly, False if it is the chain head.
+                query (:type:`Callable`, `required`):
+                    issues the query on a miss.
+        """
+        with self._lock:
+            entries = self._historical if historical else self._current
+            if block_hash != None and ( key, block_hash ) in entries:
+                self.hits += 1
+                if historical:
+                    entries.move_to_end( ( key, block_hash ) )
+                return entries[ ( key, block_hash ) ]
+            self.misses += 1
+        result = query()
+        with self._lock:
+            if block_hash != None and ( historical or block_hash == self.head_hash ):
+                ( self._historical if historical else self._current )[ ( key, block_hash ) ] = result
+                if historical and len( self._historical ) > self.max_entries:
+                    self._historical.popitem( last = False )
+        return result
+
+    def clear( self ):
+        r""" Drops all entries and the chain head, stats are kept.
+        """
+        with self._lock:
+            self._current = {}
+            self._historical.clear()
+            self._block_hashes.clear()
+            self.head_hash = None
+
+    def stats( self ) -> dict:
+        r""" Returns the hits, misses, hit rate, head queries and number of entries.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups > 0 else 0.0,
+                'head_queries': self.head_queries,
+                'entries': len( self._current ) + len( self._historical ),
+            }
+
+    def __str__( self ):
+        return "QueryCache({})".format( self.stats() )
+
+    def __repr__( self ):
+        return self.__str__()
@@ -14,6 +14,7 @@
 # THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION 
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
 # DEALINGS IN THE SOFTWARE.
+import time
 import torch
 from rich.prompt import Confirm
 from typing import List, Dict, Union
@@ -26,7 +27,10 @@ import bittensor.utils.weight_utils as weight_utils
 from retry import retry
 from substrateinterface import SubstrateInterface
 from bittensor.utils.balance import Balance
-from types import SimpleNamespace
+from .neuron_impl import Neuron, NeuronBatch, NULL_NEURON
+from .query_cache_impl import QueryCache
+from .chain_clock_impl import ChainClock
+from .connection_pool_impl import SubstratePool
 
 from loguru import logger
 logger = logger.opt(colors=True)
@@ -39,7 +43,8 @@ class Subtensor:
         self, 
         substrate: 'SubstrateInterface',
         network: str,
-        chain_endpoint: str
+        chain_endpoint: str,
+        query_cache: 'QueryCache' = None
     ):
         r""" Initializes a subtensor chain interface.
             Args:
@@ -54,10 +59,14 @@ class Subtensor:
                     an entry point node from that network.
                 chain_endpoint (default=None, type=str)
                     The subtensor endpoint flag. If set, overrides the network argument.
+                query_cache (:obj:`QueryCache`, `optional`):
+                    If set, storage reads are cached per block, see enable_query_cache.
         """
         self.network = network
         self.chain_endpoint = chain_endpoint
         self.substrate = substrate
+        self.query_cache = query_cache
+        self.chain_clock = None
 
     def __str__(self) -> str:
         if self.network == self.chain_endpoint:
@@ -68,6 +77,117 @@ class Subtensor:
     def __repr__(self) -> str:
         return self.__str__()
   
+    def enable_query_cache( self, head_ttl: float = 3.0, max_entries: int = 65536 ) -> 'QueryCache':
+        r""" Caches storage reads keyed by storage function, params and block hash. Repeated reads at the chain head
+            cost no RPC until the head moves, reads at an explicit block are kept until evicted.
+            Args:
+                head_ttl (:type:`float`, `optional`):
+                    seconds the chain head hash is reused before it is queried again, reads at the head may lag
+                    a new block by up to head_ttl.
+                max_entries (:type:`int`, `optional`):
+                    maximum number of cached reads at explicit blocks.
+            Returns:
+                query_cache (:obj:`QueryCache`):
+                    the cache, query_cache.stats() returns its hits and misses.
+        """
+        self.query_cache = QueryCache( head_ttl = head_ttl, max_entries = max_entries )
+        return self.query_cache
+
+    def disable_query_cache( self ):
+        r""" Drops the query cache, reads query the chain again.
+        """
+        self.query_cache = None
+
+    def subscribe_blocks( self, block_time: float = None, timeout: float = 10 ) -> 'ChainClock':
+        r""" Follows the chain head on a background thread subscribed to new heads, over a separate connection.
+            get_current_block() and block are then read locally, and the query cache takes the head from the subscription.
+            Args:
+                block_time (:type:`float`, `optional`):
+                    seconds between blocks, used to extrapolate between heads, defaults to bittensor.__blocktime__.
+                timeout (:type:`float`, `optional`):
+                    seconds to wait for the first head.
+            Returns:
+                chain_clock (:obj:`ChainClock`):
+                    the clock, chain_clock.wait_for_block() waits for the next head.
+        """
+        if self.chain_clock != None and self.chain_clock.running():
+            return self.chain_clock
+        self.chain_clock = ChainClock( connect = self._connect, block_time = block_time if block_time != None else bittensor.__blocktime__ )
+        self.chain_clock.start()
+        if self.chain_clock.wait_for_block( 0, timeout = timeout ) == None:
+            logger.warning('No block header received from {} after {}s, block reads query the chain until one arrives', self.chain_endpoint, timeout)
+        return self.chain_clock
+
+    def unsubscribe_blocks( self ):
+        r""" Stops following the chain head, block reads query the chain again.
+        """
+        if self.chain_clock != None:
+            self.chain_clock.stop()
+        self.chain_clock = None
+
+    def _connect( self ) -> 'SubstrateInterface':
+        r""" Returns a new connection to the chain endpoint of self.substrate, the preferred endpoint of a pool.
+        """
+        if isinstance( self.substrate, SubstratePool ):
+            return self.substrate.connect( self.substrate.url )
+        return SubstrateInterface(
+            url = self.substrate.url,
+            ss58_format = self.substrate.ss58_format,
+            type_registry_preset = self.substrate.type_registry_preset,
+            type_registry = self.substrate.type_registry,
+        )
+
+    def _clock_head( self ) -> str:
+        r""" Returns the head hash of the chain clock, None without a clock or if its subscription fell behind.
+        """
+        clock = self.chain_clock
+        if clock == None:
+            return None
+        head_number, head_hash = clock.head_number, clock.head_hash
+        if head_number == None or clock.block != head_number:
+            return None
+        return head_hash
+
+    def _block_hash( self, substrate: 'SubstrateInterface', block: int = None ) -> str:
+        if self.query_cache == None:
+            return None if block == None else substrate.get_block_hash( block )
+        head = self._clock_head() if block == None else None
+        if head != None:
+            self.query_cache.set_head( head )
+            return head
+        return self.query_cache.head( substrate ) if block == None else self.query_cache.block_hash( substrate, block )
+
+    def _query( self, storage_function: str, params: list = None, block: int = None, module: str = 'SubtensorModule', query_map: bool = False, **kwargs ):
+        r""" Reads a storage function at block, or at the chain head if block is None, through the query cache if enabled.
+            Args:
+                storage_function (:type:`str`, `required`):
+                    storage function name.
+                params (:type:`list`, `optional`):
+                    storage keys.
+                block (:type:`int`, `optional`):
+                    block to read at.
+                module (:type:`str`, `optional`):
+                    pallet of the storage function.
+                query_map (:type:`bool`, `optional`):
+                    If True, reads the whole storage map, kwargs are passed to substrate.query_map.
+            Returns:
+                result:
+                    the substrate query result, or a list of key value pairs if query_map is True.
+        """
+        @retry(delay=2, tries=3, backoff=2, max_delay=4)
+        def make_substrate_call_with_retry():
+            with self.substrate as substrate:
+                block_hash = self._block_hash( substrate, block )
+                def query():
+                    if query_map:
+                        return list( substrate.query_map( module = module, storage_function = storage_function, block_hash = block_hash, **kwargs ) )
+                    return substrate.query( module = module, storage_function = storage_function, params = params, block_hash = block_hash )
+                if self.query_cache == None:
+                    return query()
+                key = ( module, storage_function, tuple( params ) if params != None else (), query_map )
+                return self.query_cache.get( key, block_hash, historical = block != None, query = query )
+        return make_substrate_call_with_retry()
+
     def endpoint_for_network( 
             self,
             blacklist: List[str] = [] 
@@ -84,6 +204,8 @@ class Subtensor:
                 return self.chain_endpoint
 
     def connect( self, timeout: int = 10, failure = True ) -> bool:
+        if isinstance( self.substrate, SubstratePool ):
+            return self._connect_pool( failure = failure )
         attempted_endpoints = []
         while True:
             def connection_error_message():
@@ -124,6 +246,21 @@ To run a local node (See: docs/running_a_validator.md) \n
                 else:
                     return False
 
+    def _connect_pool( self, failure = True ) -> bool:
+        r""" Checks every endpoint of the connection pool, succeeds if any of them answers.
+        """
+        healthy = self.substrate.check()
+        for endpoint in self.substrate.stats():
+            logger.info("Endpoint:".ljust(20) + "<blue>{}</blue> latency: {} failures: {}", endpoint['url'], endpoint['latency'], endpoint['failures'])
+        if healthy > 0:
+            logger.success("Network:".ljust(20) + "<blue>{}</blue>", self.network)
+            logger.success("Endpoints:".ljust(20) + "<blue>{}</blue> of <blue>{}</blue> healthy", healthy, len( self.substrate.endpoints ))
+            return True
+        logger.error( "No endpoint of network:<blue>{}</blue> answered: <blue>{}</blue>".format( self.network, self.substrate ))
+        if failure:
+            raise RuntimeError('Unable to connect to network:<blue>{}</blue>.\nMake sure your internet connection is stable and the network is properly set.'.format(self.network))
+        return False
+
     @property
     def difficulty (self) -> int:
         r""" Returns registration difficulty from the chain.
@@ -131,11 +268,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             difficulty (int):
                 Registration difficulty.
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return substrate.query(  module='SubtensorModule', storage_function = 'Difficulty').value
-        return make_substrate_call_with_retry()
+        return self._query( 'Difficulty' ).value
 
     @property
     def total_issuance (self) -> 'bittensor.Balance':
@@ -144,11 +277,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             total_issuance (int):
                 Total issuance as balance.
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return bittensor.Balance.from_rao( substrate.query(  module='SubtensorModule', storage_function = 'TotalIssuance').value )
-        return make_substrate_call_with_retry()
+        return bittensor.Balance.from_rao( self._query( 'TotalIssuance' ).value )
 
     @property
     def total_stake (self) -> 'bittensor.Balance':
@@ -157,11 +286,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             total_stake (bittensor.Balance):
                 Total stake as balance.
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return bittensor.Balance.from_rao( substrate.query(  module='SubtensorModule', storage_function = 'TotalStake').value )
-        return make_substrate_call_with_retry()
+        return bittensor.Balance.from_rao( self._query( 'TotalStake' ).value )
 
     @property
     def n (self) -> int:
@@ -170,11 +295,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             n (int):
                 Total number of neurons on chain.
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return substrate.query(  module='SubtensorModule', storage_function = 'N').value
-        return make_substrate_call_with_retry()
+        return self._query( 'N' ).value
 
     def get_n (self, block: int = None) -> int:
         r""" Returns total number of neurons on the chain.
@@ -182,15 +303,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             n (int):
                 Total number of neurons on chain.
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return substrate.query(  
-                    module='SubtensorModule', 
-                    storage_function = 'N',
-                    block_hash = None if block == None else substrate.get_block_hash( block )
-                ).value
-        return make_substrate_call_with_retry()
+        return self._query( 'N', block = block ).value
 
     @property
     def block (self) -> int:
@@ -829,108 +942,108 @@ To run a local node (See: docs/running_a_validator.md) \n
             balance (bittensor.utils.balance.Balance):
                 account balance
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return substrate.query(
-                    module='System',
-                    storage_function='Account',
-                    params=[address],
-                    block_hash = None if block == None else substrate.get_block_hash( block )
-                )
-        result = make_substrate_call_with_retry()
+        result = self._query( 'Account', params = [address], block = block, module = 'System' )
         return Balance( result.value['data']['free'] )
 
     def get_current_block(self) -> int:
-        r""" Returns the current block number on the chain.
+        r""" Returns the current block number on the chain, read from the chain clock when blocks are subscribed
+        and its last head is recent.
         Returns:
             block_number (int):
                 Current chain blocknumber.
         """        
+        clock = self.chain_clock
+        block = clock.block if clock != None else None
+        if block != None:
+            return block
         @retry(delay=2, tries=3, backoff=2, max_delay=4)
         def make_substrate_call_with_retry():
             with self.substrate as substrate:
                 return substrate.get_block_number(None)
         return make_substrate_call_with_retry()
 
+    def wait_for_block( self, block: int = None, timeout: float = None ) -> int:
+        r""" Waits until the chain reaches block.
+        Args:
+            block (int):
+                block to wait for, the next block if None.
+            timeout (float):
+                seconds to wait, forever if None.
+        Returns:
+            block_number (int):
+                Current chain blocknumber, None if the timeout expired first.
+        """
+        if self.chain_clock != None and self.chain_clock.running():
+            return self.chain_clock.wait_for_block( block, timeout = timeout )
+        start = time.monotonic()
+        current_block = self.get_current_block()
+        block = current_block + 1 if block == None else block
+        while current_block < block:
+            if timeout != None and time.monotonic() - start > timeout:
+                return None
+            time.sleep( 1 )
+            current_block = self.get_current_block()
+        return current_block
+
     def get_balances(self, block: int = None) -> Dict[str, Balance]:
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return substrate.query_map(
-                    module='System',
-                    storage_function='Account',
-                    block_hash = None if block == None else substrate.get_block_hash( block )
-                )
-        result = make_substrate_call_with_retry()
+        result = self._query( 'Account', block = block, module = 'System', query_map = True )
         return_dict = {}
         for r in result:
             bal = bittensor.Balance( int( r[1]['data']['free'].value ) )
             return_dict[r[0].value] = bal
         return return_dict
 
-    def neurons(self, block: int = None ) -> List[SimpleNamespace]: 
+    def neurons(self, block: int = None, page_size: int = 256 ) -> NeuronBatch: 
         r""" Returns a list of neuron from the chain. 
+            The Neurons storage map is pulled in pages of page_size entries, two round trips per page. 
+            Uids missing from the pages, or whose values failed to decode, are then queried one at a time with retries.
         Args:
             block (int):
                 block to sync from.
+            page_size (int):
+                number of neurons pulled per storage map page.
         Returns:
-            neuron (List[SimpleNamespace]):
-                List of neuron objects.
+            neurons (NeuronBatch):
+                Columnar batch of the neurons ordered by uid, indexing it returns Neuron records.
         """
-        neurons = []
-        for id in tqdm(range(self.get_n( block ))): 
+        n = self.get_n( block )
+        try:
+            neurons = self.neurons_map( block = block, page_size = page_size )
+        except Exception as e:
+            logger.error('Exception encountered when pulling the neurons map, falling back to per uid queries: {}'.format(e))
+            neurons = {}
+        missing = [ uid for uid in range( n ) if uid not in neurons ]
+        for uid in tqdm( missing, disable = len(missing) == 0 ): 
             try:
-                neuron = self.neuron_for_uid(id, block)
-                neurons.append( neuron )
+                neurons[uid] = self.neuron_for_uid( uid, block )
             except Exception as e:
-                logger.error('Exception encountered when pulling neuron {}: {}'.format(id, e))
-                break
-        return neurons
+                # A null neuron keeps the uids contiguous, the metagraph indexes its columns by uid.
+                logger.error('Exception encountered when pulling neuron {}, it is left null: {}'.format(uid, e))
+                neurons[uid] = NULL_NEURON
+        # The shared null neuron is placed at the uid it was pulled for.
+        return NeuronBatch.from_neurons( [ neurons[uid]._replace( uid = uid ) if neurons[uid].is_null else neurons[uid] for uid in range( n ) ] )
+
+    def neurons_map( self, block: int = None, page_size: int = 256 ) -> Dict[ int, Neuron ]:
+        r""" Returns the neurons of the Neurons storage map, pulled in pages of keys.
+        Args:
+            block (int):
+                block to sync from.
+            page_size (int):
+                number of neurons pulled per storage map page.
+        Returns:
+            neurons (Dict[int, Neuron]):
+                Neuron objects keyed by uid, entries which failed to decode are left out.
+        """
+        result = self._query( 'Neurons', block = block, query_map = True, page_size = page_size )
+        return { int( key.value ): Neuron.from_dict( dict( value.value ) ) for key, value in result if key != None and value != None }
 
     @staticmethod
-    def _null_neuron() -> SimpleNamespace:
-        neuron = SimpleNamespace()
-        neuron.active = 0   
-        neuron.stake = 0
-        neuron.rank = 0
-        neuron.trust = 0
-        neuron.consensus = 0
-        neuron.incentive = 0
-        neuron.dividends = 0
-        neuron.emission = 0
-        neuron.weights = []
-        neuron.bonds = []
-        neuron.version = 0
-        neuron.modality = 0
-        neuron.uid = 0
-        neuron.port = 0
-        neuron.priority = 0
-        neuron.ip_type = 0
-        neuron.last_update = 0
-        neuron.ip = 0
-        neuron.is_null = True
-        neuron.coldkey = "000000000000000000000000000000000000000000000000"
-        neuron.hotkey = "000000000000000000000000000000000000000000000000"
-        return neuron
+    def _null_neuron() -> Neuron:
+        return NULL_NEURON
 
     @staticmethod
-    def _neuron_dict_to_namespace(neuron_dict) -> SimpleNamespace:
-        if neuron_dict['hotkey'] == '5C4hrfjw9DjXZTzV3MwzrrAr9P1MJhSrvWGWqi1eSuyUpnhM':
-            return Subtensor._null_neuron()
-        else:
-            RAOPERTAO = 1000000000
-            U64MAX = 18446744073709551615
-            neuron = SimpleNamespace( **neuron_dict )
-            neuron.stake = neuron.stake / RAOPERTAO
-            neuron.rank = neuron.rank / U64MAX
-            neuron.trust = neuron.trust / U64MAX
-            neuron.consensus = neuron.consensus / U64MAX
-            neuron.incentive = neuron.incentive / U64MAX
-            neuron.dividends = neuron.dividends / U64MAX
-            neuron.emission = neuron.emission / RAOPERTAO
-            neuron.is_null = False
-            return neuron
+    def _neuron_dict_to_namespace(neuron_dict) -> Neuron:
+        return Neuron.from_dict( neuron_dict )
 
     def neuron_for_uid( self, uid: int, block: int = None ) -> Union[ dict, None ]: 
         r""" Returns a list of neuron from the chain. 
@@ -943,17 +1056,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             neuron (dict(NeuronMetadata)):
                 neuron object associated with uid or None if it does not exist.
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                result = dict( substrate.query( 
-                    module='SubtensorModule',  
-                    storage_function='Neurons', 
-                    params = [ uid ], 
-                    block_hash = None if block == None else substrate.get_block_hash( block )
-                ).value )
-            return result
-        result = make_substrate_call_with_retry()
+        result = dict( self._query( 'Neurons', params = [ uid ], block = block ).value )
         neuron = Subtensor._neuron_dict_to_namespace( result )
         return neuron
 
@@ -966,16 +1069,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             uid ( int ):
                 UID of passed hotkey or -1 if it is non-existent.
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return substrate.query (
-                    module='SubtensorModule',
-                    storage_function='Hotkeys',
-                    params = [ ss58_hotkey ],
-                    block_hash = None if block == None else substrate.get_block_hash( block )
-                )
-        result = make_substrate_call_with_retry()
+        result = self._query( 'Hotkeys', params = [ ss58_hotkey ], block = block )
         # Process the result.
         uid = int(result.value)
         neuron = self.neuron_for_uid( uid, block)
@@ -999,7 +1093,7 @@ To run a local node (See: docs/running_a_validator.md) \n
         else:
             return True
 
-    def neuron_for_pubkey( self, ss58_hotkey: str, block: int = None ) -> SimpleNamespace: 
+    def neuron_for_pubkey( self, ss58_hotkey: str, block: int = None ) -> Neuron: 
         r""" Returns a list of neuron from the chain. 
         Args:
             ss58_hotkey ( str ):
@@ -1009,16 +1103,7 @@ To run a local node (See: docs/running_a_validator.md) \n
             neuron ( dict(NeuronMetadata) ):
                 neuron object associated with uid or None if it does not exist.
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return substrate.query (
-                    module='SubtensorModule',
-                    storage_function='Hotkeys',
-                    params = [ ss58_hotkey ],
-                    block_hash = None if block == None else substrate.get_block_hash( block )
-                )
-        result = make_substrate_call_with_retry()
+        result = self._query( 'Hotkeys', params = [ ss58_hotkey ], block = block )
         # Get response uid. This will be zero if it doesn't exist.
         uid = int(result.value)
         neuron = self.neuron_for_uid( uid, block )
@@ -1037,13 +1122,9 @@ To run a local node (See: docs/running_a_validator.md) \n
             n ( int ):
                 the number of neurons subscribed to the chain.
         """
-        @retry(delay=2, tries=3, backoff=2, max_delay=4)
-        def make_substrate_call_with_retry():
-            with self.substrate as substrate:
-                return int(substrate.query(  module='SubtensorModule', storage_function = 'N', block_hash = None if block == None else substrate.get_block_hash( block ) ).value)
-        return make_substrate_call_with_retry()
+        return int( self._query( 'N', block = block ).value )
 
-    def neuron_for_wallet( self, wallet: 'bittensor.Wallet', block: int = None ) -> SimpleNamespace: 
+    def neuron_for_wallet( self, wallet: 'bittensor.Wallet', block: int = None ) -> Neuron: 
         r""" Returns a list of neuron from the chain. 
         Args:
             wallet ( `bittensor.Wallet` ):
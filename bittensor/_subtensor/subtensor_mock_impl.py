@@ -0,0 +1,336 @@
+""" In-process mock of the subtensor chain, for offline tests and benchmarks.
+"""
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import time
+from typing import Dict, List, Union
+
+import numpy
+import torch
+from substrateinterface.utils.ss58 import ss58_encode
+
+import bittensor
+import bittensor.utils.networking as net
+import bittensor.utils.weight_utils as weight_utils
+from bittensor.utils.balance import Balance
+from .neuron_impl import Neuron, NeuronBatch, NULL_NEURON, RAOPERTAO
+from .subtensor_impl import Subtensor
+
+U32MAX = 4294967295
+WEIGHT_DISTRIBUTIONS = ( 'uniform', 'zipf' )
+
+def _object_column( values: List ) -> numpy.ndarray:
+    column = numpy.empty( len(values), dtype = object )
+    column[:] = values
+    return column
+
+class MockSubtensor( Subtensor ):
+    r""" Subtensor backed by an in-memory chain state instead of a websocket connection. The state is generated from
+        a seed: n registered neurons with lognormal stakes, a fraction of them serving endpoints, and each setting
+        weights_per_uid weights on destinations drawn uniformly or from a zipf popularity. Ranks, trust, incentive
+        and emission follow from the stake weighted weights. Extrinsics apply to the state immediately and return True.
+
+        Blocks advance every block_time seconds, or only through advance() and wait_for_block() if block_time is 0.
+        The state is not versioned, queries at a past block return the current state.
+    """
+    def __init__(
+            self,
+            n: int = 100,
+            seed: int = 0,
+            block_time: float = 0,
+            weights_per_uid: int = 32,
+            weight_distribution: str = 'zipf',
+            serving_fraction: float = 0.8,
+            difficulty: int = 1,
+        ):
+        r""" Generates the chain state.
+            Args:
+                n (:type:`int`, `optional`):
+                    number of registered neurons.
+                seed (:type:`int`, `optional`):
+                    seed of the generated state, equal seeds give equal states.
+                block_time (:type:`float`, `optional`):
+                    seconds between blocks, 0 advances blocks only through advance() and wait_for_block().
+                weights_per_uid (:type:`int`, `optional`):
+                    number of weights each neuron sets, at most n.
+                weight_distribution (:type:`str`, `optional`):
+                    uniform or zipf, how weight destinations are drawn.
+                serving_fraction (:type:`float`, `optional`):
+                    fraction of the neurons serving an endpoint.
+                difficulty (:type:`int`, `optional`):
+                    registration difficulty reported by the chain, registrations do not solve a proof of work.
+        """
+        if weight_distribution not in WEIGHT_DISTRIBUTIONS:
+            raise ValueError('weight_distribution must be one of {}, got {}'.format( WEIGHT_DISTRIBUTIONS, weight_distribution ))
+        super().__init__( substrate = None, network = 'mock', chain_endpoint = 'mock' )
+        self.block_time = block_time
+        self._difficulty = difficulty
+        self._block = 0
+        self._block_start = time.monotonic()
+        self._scores_stale = True
+        self._generate( n, numpy.random.default_rng( seed ), weights_per_uid, weight_distribution, serving_fraction )
+
+    @staticmethod
+    def from_config( config: 'bittensor.Config' ) -> 'MockSubtensor':
+        r""" Creates a mock subtensor from the subtensor.mock config.
+        """
+        return MockSubtensor(
+            n = config.subtensor.mock.n,
+            seed = config.subtensor.mock.seed,
+            block_time = config.subtensor.mock.block_time,
+            weights_per_uid = config.subtensor.mock.weights_per_uid,
+            weight_distribution = config.subtensor.mock.weight_distribution,
+            serving_fraction = config.subtensor.mock.serving_fraction,
+            difficulty = config.subtensor.mock.difficulty,
+        )
+
+    def _generate( self, n: int, rng: numpy.random.Generator, weights_per_uid: int, weight_distribution: str, serving_fraction: float ):
+        keys = rng.integers( 0, 256, size = ( 2 * n, 32 ), dtype = numpy.uint8 )
+        hotkeys = [ ss58_encode( bytes( key ), 42 ) for key in keys[ :n ] ]
+        coldkeys = [ ss58_encode( bytes( key ), 42 ) for key in keys[ n: ] ]
+
+        serving = rng.random( n ) < serving_fraction
+        ips = rng.integers( 1, 1 << 24, size = n ) + ( 10 << 24 )
+        columns = {
+            'version': numpy.where( serving, bittensor.__version_as_int__, 0 ).astype( numpy.int64 ),
+            'uid': numpy.arange( n, dtype = numpy.int64 ),
+            'active': numpy.ones( n, dtype = numpy.int64 ),
+            'last_update': numpy.zeros( n, dtype = numpy.int64 ),
+            'priority': numpy.zeros( n, dtype = numpy.int64 ),
+            'ip_type': numpy.where( serving, 4, 0 ).astype( numpy.int64 ),
+            'port': numpy.where( serving, 8091 + rng.integers( 0, 1000, size = n ), 0 ).astype( numpy.int64 ),
+            'modality': numpy.zeros( n, dtype = numpy.int64 ),
+            'stake': numpy.round( rng.lognormal( mean = 3, sigma = 2, size = n ), 9 ),
+            'ip': _object_column( numpy.where( serving, ips, 0 ).tolist() ),
+            'hotkey': _object_column( hotkeys ),
+            'coldkey': _object_column( coldkeys ),
+            'bonds': _object_column( [ [] for _ in range( n ) ] ),
+            'is_null': numpy.zeros( n, dtype = bool ),
+        }
+        for field in ( 'rank', 'trust', 'consensus', 'incentive', 'dividends', 'emission' ):
+            columns[field] = numpy.zeros( n, dtype = numpy.float64 )
+
+        # Weight destinations, duplicates are merged so rows may hold fewer than weights_per_uid weights.
+        k = min( weights_per_uid, n )
+        if weight_distribution == 'zipf':
+            popularity = 1.0 / numpy.arange( 1, n + 1 )
+            dests = rng.permutation( n )[ rng.choice( n, size = ( n, k ), p = popularity / popularity.sum() ) ] if n > 0 else numpy.zeros( ( 0, k ), dtype = numpy.int64 )
+        else:
+            dests = rng.integers( 0, max( n, 1 ), size = ( n, k ) )
+        values = rng.random( ( n, k ) ) + 1e-3
+        weights = []
+        for row_dests, row_values in zip( dests, values ):
+            row_dests, inverse = numpy.unique( row_dests, return_inverse = True )
+            row_values = numpy.bincount( inverse, weights = row_values )
+            row_values = numpy.floor( row_values / row_values.sum() * U32MAX ).astype( numpy.int64 )
+            weights.append( numpy.stack( [ row_dests, row_values ], axis = 1 ).tolist() )
+        columns['weights'] = _object_column( weights )
+
+        self._columns = columns
+        self._uids = { hotkey: uid for uid, hotkey in enumerate( hotkeys ) }
+        self._balances = dict( zip( coldkeys, ( rng.lognormal( mean = 2, sigma = 1, size = n ) * RAOPERTAO ).astype( numpy.int64 ).tolist() ) )
+
+    def _update_scores( self ):
+        r""" Recomputes the scores from the stake weighted weights: rank and incentive are the stake share each uid
+            receives, trust the stake share which sets it a weight, dividends the stake share and emission the tao per block.
+        """
+        if not self._scores_stale:
+            return
+        columns = self._columns
+        n = len( columns['uid'] )
+        counts = numpy.fromiter( ( len( row ) for row in columns['weights'] ), dtype = numpy.int64, count = n )
+        pairs = numpy.array( [ pair for row in columns['weights'] for pair in row ], dtype = numpy.int64 ).reshape( -1, 2 )
+        sources = numpy.repeat( numpy.arange( n ), counts )
+        stake_share = columns['stake'] / max( columns['stake'].sum(), 1e-9 )
+        ranks = numpy.bincount( pairs[ :, 0 ], weights = stake_share[ sources ] * pairs[ :, 1 ] / U32MAX, minlength = n ) if len( pairs ) > 0 else numpy.zeros( n )
+        trust = numpy.bincount( pairs[ :, 0 ], weights = stake_share[ sources ], minlength = n ) if len( pairs ) > 0 else numpy.zeros( n )
+        incentive = ranks / max( ranks.sum(), 1e-9 )
+        columns['rank'] = ranks
+        columns['trust'] = numpy.minimum( trust, 1.0 )
+        columns['consensus'] = columns['trust'].copy()
+        columns['incentive'] = incentive
+        columns['dividends'] = stake_share
+        columns['emission'] = numpy.round( ( incentive + stake_share ) / 2, 9 )
+        self._scores_stale = False
+
+    def _batch( self ) -> NeuronBatch:
+        self._update_scores()
+        return NeuronBatch( **self._columns )
+
+    def _uid( self, hotkey: str ) -> int:
+        return self._uids.get( hotkey, -1 )
+
+    def connect( self, timeout: int = 10, failure = True ) -> bool:
+        return True
+
+    def subscribe_blocks( self, block_time: float = None, timeout: float = 10 ):
+        r""" The mock chain clock is local, there is nothing to subscribe to.
+        """
+        return None
+
+    def advance( self, blocks: int = 1 ) -> int:
+        r""" Moves the chain forward by blocks, returns the new current block.
+        """
+        self._block += blocks
+        return self.get_current_block()
+
+    def get_current_block( self ) -> int:
+        if self.block_time > 0:
+            return self._block + int( ( time.monotonic() - self._block_start ) // self.block_time )
+        return self._block
+
+    def wait_for_block( self, block: int = None, timeout: float = None ) -> int:
+        current_block = self.get_current_block()
+        block = current_block + 1 if block == None else block
+        if block <= current_block:
+            return current_block
+        if self.block_time == 0:
+            return self.advance( block - current_block )
+        delay = ( block - current_block ) * self.block_time
+        if timeout != None and timeout < delay:
+            time.sleep( timeout )
+            return None
+        time.sleep( delay )
+        return self.get_current_block()
+
+    @property
+    def difficulty( self ) -> int:
+        return self._difficulty
+
+    @property
+    def total_issuance( self ) -> 'bittensor.Balance':
+        return Balance.from_rao( sum( self._balances.values() ) ) + self.total_stake
+
+    @property
+    def total_stake( self ) -> 'bittensor.Balance':
+        return Balance.from_tao( float( self._columns['stake'].sum() ) )
+
+    @property
+    def n( self ) -> int:
+        return len( self._columns['uid'] )
+
+    def get_n( self, block: int = None ) -> int:
+        return self.n
+
+    def neurons( self, block: int = None, page_size: int = 256 ) -> NeuronBatch:
+        r""" Returns a copy of the neurons, later extrinsics do not change it.
+        """
+        self._update_scores()
+        return NeuronBatch( **{ field: column.copy() for field, column in self._columns.items() } )
+
+    def neurons_map( self, block: int = None, page_size: int = 256 ) -> Dict[ int, Neuron ]:
+        return { neuron.uid: neuron for neuron in self.neurons( block ) }
+
+    def neuron_for_uid( self, uid: int, block: int = None ) -> Neuron:
+        if uid < 0 or uid >= self.n:
+            return NULL_NEURON
+        return self._batch()[ uid ]
+
+    def get_uid_for_hotkey( self, ss58_hotkey: str, block: int = None ) -> int:
+        return self._uid( ss58_hotkey )
+
+    def neuron_for_pubkey( self, ss58_hotkey: str, block: int = None ) -> Neuron:
+        return self.neuron_for_uid( self._uid( ss58_hotkey ) )
+
+    def get_balance( self, address: str, block: int = None ) -> Balance:
+        return Balance.from_rao( self._balances.get( address, 0 ) )
+
+    def get_balances( self, block: int = None ) -> Dict[ str, Balance ]:
+        return { address: Balance.from_rao( rao ) for address, rao in self._balances.items() }
+
+    def register( self, wallet: 'bittensor.Wallet', wait_for_inclusion: bool = False, wait_for_finalization: bool = True, prompt: bool = False ) -> bool:
+        r""" Registers the wallet hotkey at the next uid, without a proof of work.
+        """
+        hotkey = wallet.hotkey.ss58_address
+        if self._uid( hotkey ) != -1:
+            return True
+        uid = self.n
+        row = Neuron( uid = uid, active = 1, last_update = self.get_current_block(), hotkey = hotkey, coldkey = wallet.coldkeypub.ss58_address, weights = [], bonds = [] )
+        for field in Neuron._fields:
+            column = self._columns[field]
+            if column.dtype == object:
+                self._columns[field] = _object_column( column.tolist() + [ getattr( row, field ) ] )
+            else:
+                self._columns[field] = numpy.append( column, numpy.array( [ getattr( row, field ) ], dtype = column.dtype ) )
+        self._uids[ hotkey ] = uid
+        self._scores_stale = True
+        return True
+
+    def serve_axon( self, axon: 'bittensor.Axon', use_upnpc: bool = False, wait_for_inclusion: bool = False, wait_for_finalization: bool = True, prompt: bool = False ) -> bool:
+        r""" Serves the axon at its own ip, or at localhost if it listens on all interfaces.
+        """
+        ip = '127.0.0.1' if axon.ip in ( '[::]', '0.0.0.0', '::' ) else axon.ip
+        return self.serve( wallet = axon.wallet, ip = ip, port = axon.port, modality = axon.modality )
+
+    def serve( self, wallet: 'bittensor.wallet', ip: str, port: int, modality: int, wait_for_inclusion: bool = False, wait_for_finalization = True, prompt: bool = False ) -> bool:
+        uid = self._uid( wallet.hotkey.ss58_address )
+        if uid == -1:
+            return False
+        self._columns['version'][uid] = bittensor.__version_as_int__
+        self._columns['ip'][uid] = net.ip_to_int( ip )
+        self._columns['ip_type'][uid] = net.ip_version( ip )
+        self._columns['port'][uid] = port
+        self._columns['modality'][uid] = modality
+        self._columns['coldkey'][uid] = wallet.coldkeypub.ss58_address
+        return True
+
+    def set_weights( self, wallet: 'bittensor.wallet', uids: Union[ torch.LongTensor, list ], weights: Union[ torch.FloatTensor, list ], wait_for_inclusion: bool = False, wait_for_finalization: bool = False, prompt: bool = False ) -> bool:
+        uid = self._uid( wallet.hotkey.ss58_address )
+        if uid == -1:
+            return False
+        if isinstance( uids, list ):
+            uids = torch.tensor( uids, dtype = torch.int64 )
+        if isinstance( weights, list ):
+            weights = torch.tensor( weights, dtype = torch.float32 )
+        weight_uids, weight_vals = weight_utils.convert_weights_and_uids_for_emit( uids, weights )
+        self._columns['weights'][uid] = [ [ dest, value ] for dest, value in zip( weight_uids, weight_vals ) ]
+        self._columns['last_update'][uid] = self.get_current_block()
+        self._scores_stale = True
+        return True
+
+    def _move_stake( self, wallet: 'bittensor.wallet', rao: int ) -> bool:
+        r""" Moves rao from the coldkey balance to the hotkey stake, or back if negative.
+        """
+        uid = self._uid( wallet.hotkey.ss58_address )
+        coldkey = wallet.coldkeypub.ss58_address
+        if uid == -1 or rao > self._balances.get( coldkey, 0 ) or -rao > round( self._columns['stake'][uid] * RAOPERTAO ):
+            return False
+        self._balances[ coldkey ] = self._balances.get( coldkey, 0 ) - rao
+        self._columns['stake'][uid] += rao / RAOPERTAO
+        self._scores_stale = True
+        return True
+
+    def add_stake( self, wallet: 'bittensor.wallet', amount: Union[ Balance, float ] = None, wait_for_inclusion: bool = True, wait_for_finalization: bool = False, prompt: bool = False ) -> bool:
+        if amount == None:
+            return self._move_stake( wallet, self._balances.get( wallet.coldkeypub.ss58_address, 0 ) )
+        return self._move_stake( wallet, ( amount if isinstance( amount, Balance ) else Balance.from_tao( amount ) ).rao )
+
+    def unstake( self, wallet: 'bittensor.wallet', amount: Union[ Balance, float ] = None, wait_for_inclusion: bool = True, wait_for_finalization: bool = False, prompt: bool = False ) -> bool:
+        if amount == None:
+            uid = self._uid( wallet.hotkey.ss58_address )
+            return uid != -1 and self._move_stake( wallet, -round( self._columns['stake'][uid] * RAOPERTAO ) )
+        return self._move_stake( wallet, -( amount if isinstance( amount, Balance ) else Balance.from_tao( amount ) ).rao )
+
+    def transfer( self, wallet: 'bittensor.wallet', dest: str, amount: Union[ Balance, float ], wait_for_inclusion: bool = True, wait_for_finalization: bool = False, prompt: bool = False ) -> bool:
+        rao = ( amount if isinstance( amount, Balance ) else Balance.from_tao( amount ) ).rao
+        source = wallet.coldkeypub.ss58_address
+        if rao > self._balances.get( source, 0 ):
+            return False
+        self._balances[ source ] -= rao
+        self._balances[ dest ] = self._balances.get( dest, 0 ) + rao
+        return True
@@ -31,6 +31,7 @@ class prioritythreadpool:
             config: 'bittensor.config' = None,
             max_workers: int = None,
             maxsize: int = None,
+            fair_share: bool = None,
         ):
         r""" Initializes a priority thread pool.
             Args:
@@ -40,16 +41,20 @@ class prioritythreadpool:
 .                   The maximum number of threads in thread pool
                 maxsize (default=-1, type=int)
                     The maximum number of tasks in the priority queue
+                fair_share (default=False, type=bool)
+                    If true, requests are scheduled by weighted fair queuing across pubkeys
+                    with the request priority used as the pubkey weight.
         """        
         if config == None: 
             config = prioritythreadpool.config()
         config = copy.deepcopy( config )
         config.axon.priority.max_workers = max_workers if max_workers != None else config.axon.priority.max_workers
         config.axon.priority.maxsize = maxsize if maxsize != None else config.axon.priority.maxsize
+        config.axon.priority.fair_share = fair_share if fair_share != None else config.axon.priority.fair_share
 
         prioritythreadpool.check_config( config )
 
-        return priority_thread_pool_impl.PriorityThreadPoolExecutor(maxsize = config.axon.priority.maxsize, max_workers = config.axon.priority.max_workers)
+        return priority_thread_pool_impl.PriorityThreadPoolExecutor(maxsize = config.axon.priority.maxsize, max_workers = config.axon.priority.max_workers, fair_share = config.axon.priority.fair_share)
 
     @classmethod
     def add_args(cls, parser: argparse.ArgumentParser ):
@@ -58,6 +63,7 @@ class prioritythreadpool:
         try:
             parser.add_argument('--axon.priority.max_workers', type = int, help='''maximum number of threads in thread pool''', default = bittensor.defaults.axon.priority.max_workers)
             parser.add_argument('--axon.priority.maxsize', type=int, help='''maximum size of tasks in priority queue''', default = bittensor.defaults.axon.priority.maxsize)
+            parser.add_argument('--axon.priority.fair_share', action='store_true', help='''If set, schedules requests by weighted fair queuing across pubkeys (weights from the priority function) instead of strict priority''', default = bittensor.defaults.axon.priority.fair_share)
             
         except argparse.ArgumentError:
             # re-parsing arguments.
@@ -71,6 +77,7 @@ class prioritythreadpool:
         defaults.axon.priority = bittensor.Config()
         defaults.axon.priority.max_workers = os.getenv('BT_AXON_PRIORITY_MAX_WORKERS') if os.getenv('BT_AXON_PRIORITY_MAX_WORKERS') != None else 10
         defaults.axon.priority.maxsize = os.getenv('BT_AXON_PRIORITY_MAXSIZE') if os.getenv('BT_AXON_PRIORITY_MAXSIZE') != None else -1
+        defaults.axon.priority.fair_share = os.getenv('BT_AXON_PRIORITY_FAIR_SHARE') == 'True' if os.getenv('BT_AXON_PRIORITY_FAIR_SHARE') != None else False
     
     @classmethod   
     def config(cls) -> 'bittensor.Config':
@@ -87,3 +94,4 @@ class prioritythreadpool:
         """
         assert isinstance(config.axon.priority.max_workers, int), 'axon.priority.max_workers must be a int'
         assert isinstance(config.axon.priority.maxsize, int), 'axon.priority.maxsize must be a int'
+        assert isinstance(config.axon.priority.fair_share, bool), 'axon.priority.fair_share must be a bool'
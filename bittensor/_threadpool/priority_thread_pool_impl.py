@@ -14,7 +14,9 @@ import itertools
 import queue
 import random
 import threading
+import time
 import weakref
+from collections import OrderedDict
 
 from loguru import logger
 
@@ -36,11 +38,24 @@ _threads_queues = weakref.WeakKeyDictionary()
 _shutdown = False
 
 class _WorkItem(object):
-    def __init__(self, future, fn, args, kwargs):
+    def __init__(self, future, fn, args, kwargs, pubkey = None, deadline = None, queue_class = None):
         self.future = future
         self.fn = fn
         self.args = args
         self.kwargs = kwargs
+        self.pubkey = pubkey
+        self.deadline = deadline
+        self.queue_class = queue_class
+        self.enqueue_time = time.time()
+
+    def __lt__(self, other):
+        # Breaks ties between equal queue keys in arrival order.
+        return self.enqueue_time < other.enqueue_time
+
+    def expired(self, now):
+        r""" Returns True if the caller's deadline for this item has passed.
+        """
+        return self.deadline != None and now > self.deadline
 
     def run(self):
         """ Run the given work item
@@ -78,6 +93,15 @@ def _worker(executor_reference, work_queue, initializer, initargs):
             if priority == sys.maxsize:
                 del item
             elif item is not None:
+                executor = executor_reference()
+                if executor is not None:
+                    executor._on_dequeue(priority, item)
+                del executor
+                # Skip items whose caller has already given up on them.
+                if item.expired(time.time()):
+                    item.future.cancel()
+                    del item
+                    continue
                 item.run()
                 # Delete references to object. See issue16284
                 del item
@@ -115,7 +139,8 @@ class PriorityThreadPoolExecutor(_base.Executor):
     _counter = itertools.count().__next__
 
     def __init__(self, maxsize = -1, max_workers=None, thread_name_prefix='',
-                 initializer=None, initargs=()):
+                 initializer=None, initargs=(), fair_share = False,
+                 stats_idle_seconds = 600, max_stats_pubkeys = 10000):
         """Initializes a new ThreadPoolExecutor instance.
         Args:
             max_workers: The maximum number of threads that can be used to
@@ -123,6 +148,13 @@ class PriorityThreadPoolExecutor(_base.Executor):
             thread_name_prefix: An optional name prefix to give our threads.
             initializer: An callable used to initialize worker threads.
             initargs: A tuple of arguments to pass to the initializer.
+            fair_share: If True, items are ordered by weighted fair queuing
+                across pubkeys, using the submitted priority as the pubkey weight,
+                instead of by raw priority.
+            stats_idle_seconds: Seconds after which the queue statistics of a pubkey
+                without queued items are dropped.
+            max_stats_pubkeys: Maximum number of pubkeys whose queue statistics are held,
+                the least recently used ones without queued items are dropped first.
         """
         if max_workers is None:
             # Use this number because ThreadPoolExecutor is often
@@ -146,6 +178,20 @@ class PriorityThreadPoolExecutor(_base.Executor):
         self._initializer = initializer
         self._initargs = initargs
 
+        # Fair share state: per pubkey finish tags and the virtual clock,
+        # which is the finish tag of the last dequeued item.
+        self._fair_share = fair_share
+        self._virtual_time = 0.0
+        self._finish_tags = {}
+
+        # Queue statistics as [depth, average wait, expired, last update] per pubkey,
+        # least recently updated first, and per queue class.
+        self._stats_lock = threading.Lock()
+        self._stats_idle_seconds = stats_idle_seconds
+        self._max_stats_pubkeys = max_stats_pubkeys
+        self._pubkey_stats = OrderedDict()
+        self._class_stats = {}
+
     def submit(self, fn, *args, **kwargs):
         with self._shutdown_lock:
             if self._broken:
@@ -163,15 +209,121 @@ class PriorityThreadPoolExecutor(_base.Executor):
             eplison = random.uniform(0,0.01) * priority
             if 'priority' in kwargs:
                 del kwargs['priority']
+            pubkey = kwargs.pop('pubkey', None)
+            deadline = kwargs.pop('deadline', None)
+            queue_class = kwargs.pop('queue_class', None)
 
             f = _base.Future()
-            w = _WorkItem(f, fn, args, kwargs)
-
-            self._work_queue.put((-float(priority + eplison), w), block=False)
+            w = _WorkItem(f, fn, args, kwargs, pubkey = pubkey, deadline = deadline, queue_class = queue_class)
+
+            if self._fair_share:
+                key = self._finish_tag(pubkey, priority)
+            else:
+                key = -float(priority + eplison)
+
+            with self._stats_lock:
+                for stats in self._stats_rows(w):
+                    stats[0] += 1
+            try:
+                self._work_queue.put((key, w), block=False)
+            except queue.Full:
+                with self._stats_lock:
+                    for stats in self._stats_rows(w):
+                        stats[0] -= 1
+                raise
             self._adjust_thread_count()
             return f
     submit.__doc__ = _base.Executor.submit.__doc__
 
+    def _finish_tag(self, pubkey, weight):
+        r""" Returns the self-clocked fair queuing finish tag for a new item from pubkey.
+            Each item costs 1 / weight of virtual time, so a pubkey with twice the weight
+            is served twice as often while both pubkeys have queued work.
+        """
+        weight = max(float(weight), 1e-9)
+        start = max(self._virtual_time, self._finish_tags.get(pubkey, 0.0))
+        finish = start + 1.0 / weight
+        self._finish_tags[pubkey] = finish
+        return finish
+
+    def _on_dequeue(self, key, item):
+        r""" Updates the virtual clock and queue statistics when a worker pulls an item.
+        """
+        now = time.time()
+        wait = now - item.enqueue_time
+        pubkey = item.pubkey
+        with self._stats_lock:
+            pubkey_stats, class_stats = self._stats_rows(item, now)
+            for stats in ( pubkey_stats, class_stats ):
+                stats[0] = max(stats[0] - 1, 0)
+                stats[1] = wait if stats[1] == None else 0.9 * stats[1] + 0.1 * wait
+                if item.expired(now):
+                    stats[2] += 1
+            depth = pubkey_stats[0]
+            self._expire_stats(now)
+        if self._fair_share:
+            with self._shutdown_lock:
+                self._virtual_time = max(self._virtual_time, key)
+                # Forget idle pubkeys so the tag table stays bounded.
+                if depth <= 0 and self._finish_tags.get(pubkey, 0.0) <= self._virtual_time:
+                    self._finish_tags.pop(pubkey, None)
+
+    def _stats_rows(self, item, now = None):
+        r""" Returns the statistics rows of the pubkey and class of an item, marking the pubkey as recently updated.
+            Called with the stats lock held.
+        """
+        pubkey_stats = self._pubkey_stats.get(item.pubkey)
+        if pubkey_stats == None:
+            pubkey_stats = [0, None, 0, 0.0]
+            self._pubkey_stats[item.pubkey] = pubkey_stats
+        else:
+            self._pubkey_stats.move_to_end(item.pubkey)
+        pubkey_stats[3] = time.time() if now == None else now
+        class_stats = self._class_stats.get(item.queue_class)
+        if class_stats == None:
+            class_stats = [0, None, 0]
+            self._class_stats[item.queue_class] = class_stats
+        return pubkey_stats, class_stats
+
+    def _expire_stats(self, now):
+        r""" Drops the least recently updated pubkey statistics which are idle or over the max_stats_pubkeys bound,
+            pubkeys with queued items are kept. Called with the stats lock held.
+        """
+        while len(self._pubkey_stats) > 0:
+            pubkey, ( depth, _, _, last ) = next(iter(self._pubkey_stats.items()))
+            if depth > 0 or (len(self._pubkey_stats) <= self._max_stats_pubkeys and now - last <= self._stats_idle_seconds):
+                break
+            self._pubkey_stats.popitem(last = False)
+
+    @staticmethod
+    def _stats_dict(stats):
+        return {
+            'depth': stats[0],
+            'wait': stats[1] if stats[1] != None else 0.0,
+            'expired': stats[2],
+        }
+
+    def queue_stats(self):
+        r""" Returns queue statistics per pubkey.
+            Returns:
+                stats (:obj:`Dict[str, Dict[str, float]]`):
+                    Current queue depth, average queue wait time in seconds and
+                    number of expired items for each recently seen pubkey.
+        """
+        with self._stats_lock:
+            self._expire_stats(time.time())
+            return { pubkey: self._stats_dict(stats) for pubkey, stats in self._pubkey_stats.items() }
+
+    def class_stats(self):
+        r""" Returns queue statistics per queue class, e.g. the stake tier passed as queue_class to submit.
+            Returns:
+                stats (:obj:`Dict[object, Dict[str, float]]`):
+                    Current queue depth, average queue wait time in seconds and
+                    number of expired items for each queue class, items submitted without a class are under None.
+        """
+        with self._stats_lock:
+            return { queue_class: self._stats_dict(stats) for queue_class, stats in self._class_stats.items() }
+
 
     def _adjust_thread_count(self):
         # if idle threads are available, don't spin new threads
@@ -0,0 +1,205 @@
+""" Hosts a model in worker processes which are called through shared memory.
+"""
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import itertools
+import threading
+import concurrent.futures
+from typing import List
+
+import torch
+import torch.multiprocessing
+from loguru import logger
+
+from bittensor.utils.tensor_ring import TensorRing
+
+logger = logger.opt(colors=True)
+
+class ModelWorkerPool():
+    r""" Runs a model in worker processes, each with its own torch thread budget, so that model compute does not
+        contend on the GIL with request handling. The model parameters and gradients are moved to shared memory,
+        so the workers see the optimizer steps of the owning process, and backward calls in the workers accumulate
+        into the gradients it steps on. Inputs and outputs are passed through shared memory tensor rings.
+    """
+    def __init__(
+        self,
+        model: torch.nn.Module,
+        workers: int = 1,
+        threads: int = 1,
+        forward_method: str = 'encode_forward',
+        slots: int = 32,
+        slot_bytes: int = 8 * 1024 * 1024,
+        timeout: float = None,
+    ):
+        r""" Initializes the pool, workers are only created on start().
+            Args:
+                model (:obj:`torch.nn.Module`, `required`):
+                    model served by the workers.
+                workers (:type:`int`, `optional`):
+                    number of worker processes.
+                threads (:type:`int`, `optional`):
+                    torch.set_num_threads budget of each worker.
+                forward_method (:type:`str`, `optional`):
+                    name of the model method called with the inputs.
+                slots (:type:`int`, `optional`):
+                    number of shared memory slots of each tensor ring.
+                slot_bytes (:type:`int`, `optional`):
+                    size in bytes of each shared memory slot.
+                timeout (:type:`float`, `optional`):
+                    seconds to wait for a worker response before raising a TimeoutError.
+        """
+        self.model = model
+        self.workers = workers
+        self.threads = threads
+        self.forward_method = forward_method
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.timeout = timeout
+        self.processes = []
+        self.pending = {}
+        self.request_ids = itertools.count()
+        self.context = torch.multiprocessing.get_context('spawn')
+
+    def __del__(self):
+        self.stop()
+
+    def start( self ) -> 'ModelWorkerPool':
+        r""" Shares the model memory and starts the worker processes.
+        """
+        for parameter in self.model.parameters():
+            if parameter.requires_grad and parameter.grad == None:
+                parameter.grad = torch.zeros_like( parameter )
+            if parameter.grad != None:
+                parameter.grad.share_memory_()
+        self.model.share_memory()
+
+        self.requests_ring = TensorRing( self.slots, self.slot_bytes, context = self.context )
+        self.responses_ring = TensorRing( self.slots, self.slot_bytes, context = self.context )
+        self.requests = self.context.Queue()
+        self.responses = self.context.Queue()
+        self.receiver = threading.Thread( target = self._receive, daemon = True )
+        self.receiver.start()
+        for _ in range( self.workers ):
+            process = self.context.Process(
+                target = serve_model_worker,
+                args = ( self.model, [ parameter.grad for parameter in self.model.parameters() ], self.threads, self.forward_method, self.requests_ring, self.responses_ring, self.requests, self.responses ),
+                daemon = True
+            )
+            process.start()
+            self.processes.append( process )
+        logger.success("Model Workers:".ljust(20) + "<blue>{}</blue>", self.workers)
+        return self
+
+    def stop( self ) -> 'ModelWorkerPool':
+        r""" Stops the worker processes.
+        """
+        if len( self.processes ) == 0:
+            return self
+        for _ in self.processes:
+            self.requests.put( None )
+        for process in self.processes:
+            process.join( timeout = 5 )
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        self.responses.put( None )
+        self.receiver.join()
+        self.requests_ring.close( unlink = True )
+        self.responses_ring.close( unlink = True )
+        return self
+
+    def _receive( self ):
+        r""" Resolves pending calls as responses arrive from the workers.
+        """
+        while True:
+            response = self.responses.get()
+            if response == None:
+                break
+            request_id, handle, error = response
+            # Always read the response, even if the call timed out, so its slot is freed.
+            outputs = self.responses_ring.get( handle ) if handle != None else None
+            future = self.pending.pop( request_id, None )
+            if future == None:
+                continue
+            if error != None:
+                future.set_exception( Exception( error ) )
+            else:
+                future.set_result( outputs )
+
+    def _call( self, method: str, tensors: List[torch.Tensor] ) -> torch.Tensor:
+        r""" Sends a call to the next free worker and waits for its result.
+        """
+        request_id = next( self.request_ids )
+        future = concurrent.futures.Future()
+        self.pending[ request_id ] = future
+        handles = [ self.requests_ring.put( tensor ) for tensor in tensors ]
+        self.requests.put( ( request_id, method, handles ) )
+        try:
+            return future.result( timeout = self.timeout )
+        except concurrent.futures.TimeoutError:
+            self.pending.pop( request_id, None )
+            raise TimeoutError('Timed out waiting on the model workers')
+
+    def forward( self, inputs_x: torch.Tensor ) -> torch.Tensor:
+        r""" Returns the outputs of the model's forward method on the inputs, computed by a worker.
+        """
+        return self._call( 'forward', [ inputs_x ] )
+
+    def backward( self, inputs_x: torch.Tensor, grads_dy: torch.Tensor ):
+        r""" Accumulates the gradients of the model's forward method outputs w.r.t grads_dy into the shared gradients.
+        """
+        self._call( 'backward', [ inputs_x, grads_dy ] )
+
+
+def serve_model_worker(
+        model: torch.nn.Module,
+        grads: List[torch.Tensor],
+        threads: int,
+        forward_method: str,
+        requests_ring: TensorRing,
+        responses_ring: TensorRing,
+        requests: 'torch.multiprocessing.Queue',
+        responses: 'torch.multiprocessing.Queue',
+    ):
+    r""" Entry point of a model worker process, serves calls until it receives None.
+    """
+    torch.set_num_threads( threads )
+    # Gradients are not sent with the model, attach the shared ones.
+    for parameter, grad in zip( model.parameters(), grads ):
+        parameter.grad = grad
+    forward = getattr( model, forward_method )
+    parameter = next( model.parameters(), None )
+    device = parameter.device if parameter != None else torch.device('cpu')
+    while True:
+        request = requests.get()
+        if request == None:
+            break
+        request_id, method, handles = request
+        tensors = [ requests_ring.get( handle ) for handle in handles ]
+        try:
+            if method == 'forward':
+                with torch.no_grad():
+                    outputs = forward( tensors[0].to( device ) )
+                responses.put( ( request_id, responses_ring.put( outputs ), None ) )
+            else:
+                with torch.enable_grad():
+                    outputs = forward( tensors[0].to( device ) )
+                    torch.autograd.backward( tensors = [ outputs ], grad_tensors = [ tensors[1].to( device ) ] )
+                responses.put( ( request_id, None, None ) )
+        except Exception as e:
+            responses.put( ( request_id, None, 'Model worker error: {}'.format( repr(e) ) ) )
@@ -17,8 +17,12 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
 # DEALINGS IN THE SOFTWARE.
 
+import bisect
+import threading
 import time
 
+import numpy
+
 class timed_rolling_avg():
     """ A exponential moving average that updates values based on time since last update.
     """
@@ -84,6 +88,156 @@ class EventsPerSecondRollingAverage():
         return float(self.value)
 
 
+class LatencyHistogram():
+    """ A fixed bucket histogram of durations in seconds.
+        Observing a value is a bisect over the bucket bounds and a list increment, so it can be
+        called from many request threads without a lock. Racing increments may very rarely drop
+        a count, which is acceptable for monitoring.
+    """
+    BUCKETS = [ 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0 ]
+
+    def __init__(self, buckets = None):
+        self.buckets = list(buckets) if buckets != None else list(LatencyHistogram.BUCKETS)
+        # Last count is the overflow bucket (> buckets[-1]).
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """ Adds a duration to the histogram.
+        """
+        self.counts[ bisect.bisect_left( self.buckets, value ) ] += 1
+        self.sum += value
+
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def mean(self) -> float:
+        count = self.count()
+        return self.sum / count if count > 0 else 0.0
+
+    def quantile(self, q: float) -> float:
+        """ Returns the upper bound of the bucket containing the q-th quantile.
+        """
+        counts = list(self.counts)
+        total = sum(counts)
+        if total == 0:
+            return 0.0
+        target = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            cumulative += count
+            if cumulative >= target:
+                return self.buckets[ min(index, len(self.buckets) - 1) ]
+        return self.buckets[-1]
+
+    def to_dict(self) -> dict:
+        return {
+            'buckets': list(self.buckets),
+            'counts': list(self.counts),
+            'count': self.count(),
+            'mean': self.mean(),
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+        }
+
+
+class PubkeyStatsTable():
+    """ Per caller request statistics held in preallocated arrays, indexed by an interned id per pubkey.
+        Recording a request is a dict lookup and a few array increments. The arrays double in size when
+        they fill, interning and growth are done under a lock while updates are not, so racing updates
+        may very rarely drop a count, which is acceptable for monitoring.
+    """
+    def __init__(self, capacity: int = 64, n_codes: int = 32, alpha: float = 0.05):
+        self.alpha = alpha
+        self.index = {}
+        self.pubkeys = []
+        self.lock = threading.Lock()
+        self.n_requested = numpy.zeros( capacity, dtype = numpy.int64 )
+        self.n_success = numpy.zeros( capacity, dtype = numpy.int64 )
+        self.in_bytes = numpy.zeros( capacity, dtype = numpy.int64 )
+        self.out_bytes = numpy.zeros( capacity, dtype = numpy.int64 )
+        # Moving averages of the call time and of the queries per second.
+        self.query_time = numpy.zeros( capacity, dtype = numpy.float64 )
+        self.qps = numpy.zeros( capacity, dtype = numpy.float64 )
+        self.last_seen = numpy.zeros( capacity, dtype = numpy.float64 )
+        self.codes = numpy.zeros( ( capacity, n_codes ), dtype = numpy.int64 )
+
+    def __len__(self) -> int:
+        return len(self.pubkeys)
+
+    def intern(self, pubkey: str) -> int:
+        """ Returns the id of a pubkey, allocating one (and growing the arrays) for new pubkeys.
+        """
+        uid = self.index.get( pubkey )
+        if uid != None:
+            return uid
+        with self.lock:
+            uid = self.index.get( pubkey )
+            if uid != None:
+                return uid
+            uid = len(self.pubkeys)
+            if uid == len(self.n_requested):
+                self._grow( 2 * uid )
+            self.pubkeys.append( pubkey )
+            self.index[ pubkey ] = uid
+            return uid
+
+    def _grow(self, capacity: int):
+        for name in [ 'n_requested', 'n_success', 'in_bytes', 'out_bytes', 'query_time', 'qps', 'last_seen', 'codes' ]:
+            array = getattr( self, name )
+            grown = numpy.zeros( ( capacity, ) + array.shape[1:], dtype = array.dtype )
+            grown[ :len(array) ] = array
+            setattr( self, name, grown )
+
+    def record(self, pubkey: str, call_time: float, in_bytes: int, out_bytes: int, code: int, now: float = None):
+        """ Adds a request from pubkey to the table.
+        """
+        uid = self.intern( pubkey )
+        now = time.time() if now == None else now
+        n_requested = self.n_requested[ uid ] + 1
+        self.n_requested[ uid ] = n_requested
+        if code == 1:
+            self.n_success[ uid ] += 1
+        self.in_bytes[ uid ] += in_bytes
+        self.out_bytes[ uid ] += out_bytes
+        if n_requested == 1:
+            self.query_time[ uid ] = call_time
+        else:
+            self.query_time[ uid ] += self.alpha * ( call_time - self.query_time[ uid ] )
+            time_delta = now - self.last_seen[ uid ]
+            if time_delta > 0:
+                self.qps[ uid ] += self.alpha * ( 1 / time_delta - self.qps[ uid ] )
+        self.last_seen[ uid ] = now
+        if 0 <= code < self.codes.shape[1]:
+            self.codes[ uid, code ] += 1
+
+    def rows(self) -> dict:
+        """ Returns a dict of per pubkey stats, with the average bytes per request and the non zero return code counts.
+        """
+        n = len(self.pubkeys)
+        pubkeys = self.pubkeys[ :n ]
+        n_requested = self.n_requested[ :n ].tolist()
+        n_success = self.n_success[ :n ].tolist()
+        avg_inbytes = ( self.in_bytes[ :n ] / numpy.maximum( self.n_requested[ :n ], 1 ) ).tolist()
+        avg_outbytes = ( self.out_bytes[ :n ] / numpy.maximum( self.n_requested[ :n ], 1 ) ).tolist()
+        query_time = self.query_time[ :n ].tolist()
+        qps = self.qps[ :n ].tolist()
+        codes = self.codes[ :n ]
+        rows = {}
+        for uid, pubkey in enumerate( pubkeys ):
+            rows[ pubkey ] = {
+                'n_requested': n_requested[ uid ],
+                'n_success': n_success[ uid ],
+                'query_time': query_time[ uid ],
+                'avg_inbytes': avg_inbytes[ uid ],
+                'avg_outbytes': avg_outbytes[ uid ],
+                'qps': qps[ uid ],
+                'codes': { int(code): int(codes[ uid, code ]) for code in numpy.nonzero( codes[ uid ] )[0] },
+            }
+        return rows
+
+
 class Running_Average(object):
     def __init__(self, buffer_size=10):
         """
@@ -0,0 +1,106 @@
+""" A pool of shared memory slots for passing tensors between processes without pickling them.
+"""
+# The MIT License (MIT)
+# Copyright © 2021 Yuma Rao
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+# the Software.
+
+# THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+import queue
+import multiprocessing
+from multiprocessing import shared_memory
+from typing import Tuple
+
+import numpy
+import torch
+
+class TensorRing():
+    r""" A fixed ring of equally sized shared memory slots through which tensors are handed between processes.
+        put() copies a tensor into a free slot and returns a small picklable handle which is sent to the
+        reading process over a queue, get() copies the tensor out and returns the slot to the ring.
+        Tensors larger than a slot, or put while every slot is in use, travel inline in the handle instead.
+        The ring is passed to child processes as a Process argument, where it re-attaches to the memory by name.
+    """
+    def __init__( self, slots: int = 32, slot_bytes: int = 8 * 1024 * 1024, context: 'multiprocessing.context.BaseContext' = None ):
+        r""" Creates a new shared memory tensor ring.
+            Args:
+                slots (:type:`int`, `optional`):
+                    number of tensors which can be in flight through shared memory at once.
+                slot_bytes (:type:`int`, `optional`):
+                    size of each slot in bytes.
+                context (:obj:`multiprocessing.context.BaseContext`, `optional`):
+                    multiprocessing context used to create the free slot queue.
+        """
+        context = context if context != None else multiprocessing.get_context()
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.memory = shared_memory.SharedMemory( create = True, size = max( slots * slot_bytes, 1 ) )
+        self.free = context.Queue()
+        for slot in range( slots ):
+            self.free.put( slot )
+
+    def __getstate__( self ):
+        return { 'slots': self.slots, 'slot_bytes': self.slot_bytes, 'name': self.memory.name, 'free': self.free }
+
+    def __setstate__( self, state ):
+        self.slots = state['slots']
+        self.slot_bytes = state['slot_bytes']
+        self.memory = shared_memory.SharedMemory( name = state['name'] )
+        self.free = state['free']
+
+    def put( self, tensor: torch.Tensor, timeout: float = 0.1 ) -> Tuple:
+        r""" Writes a tensor into a free slot.
+            Args:
+                tensor (:obj:`torch.Tensor`, `required`):
+                    tensor to hand to the reading process.
+                timeout (:type:`float`, `optional`):
+                    seconds to wait for a free slot before sending the tensor inline.
+            Returns:
+                handle (:obj:`Tuple`):
+                    picklable handle which must be passed to exactly one get() or release().
+        """
+        array = tensor.detach().cpu().contiguous().numpy()
+        if array.nbytes <= self.slot_bytes:
+            try:
+                slot = self.free.get( timeout = timeout )
+                numpy.ndarray( array.shape, dtype = array.dtype, buffer = self.memory.buf, offset = slot * self.slot_bytes )[...] = array
+                return ( slot, array.shape, array.dtype.str )
+            except queue.Empty:
+                pass
+        return ( None, array, None )
+
+    def get( self, handle: Tuple ) -> torch.Tensor:
+        r""" Reads the tensor behind a handle and frees its slot.
+        """
+        slot, shape, dtype = handle
+        if slot == None:
+            return torch.from_numpy( shape )
+        try:
+            array = numpy.ndarray( shape, dtype = numpy.dtype( dtype ), buffer = self.memory.buf, offset = slot * self.slot_bytes ).copy()
+        finally:
+            self.free.put( slot )
+        return torch.from_numpy( array )
+
+    def release( self, handle: Tuple ):
+        r""" Frees the slot behind a handle without reading it.
+        """
+        if handle[0] != None:
+            self.free.put( handle[0] )
+
+    def close( self, unlink: bool = False ):
+        r""" Closes this process's view of the ring, unlink should be set by the creating process only.
+        """
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
@@ -17,7 +17,9 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER 
 # DEALINGS IN THE SOFTWARE.
 
+import itertools
 from typing import Tuple, List
+import numpy
 import torch
 
 U32_MAX = 4294967295
@@ -52,6 +54,71 @@ def convert_bond_uids_and_vals_to_tensor( n: int, uids: List[int], bonds: List[i
         row_bonds[ uid_j ] = int( bij ) 
     return row_bonds
 
+def convert_uids_and_vals_to_coo( rows: List[int], uids_and_vals: List[List[Tuple[int, int]]] ) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    r""" Stacks the chain (uid, value) lists of several neurons into coordinate format index arrays.
+        Args:
+            rows (:obj:`List[int]`):
+                uid of each neuron, the row of its values.
+            uids_and_vals (:obj:`List[List[Tuple[int, int]]]`):
+                the (uid, value) pairs of each neuron, i.e. neuron.weights or neuron.bonds.
+        Returns:
+            row (:obj:`numpy.ndarray`):
+                row index of each value.
+            col (:obj:`numpy.ndarray`):
+                column index (destination uid) of each value.
+            val (:obj:`numpy.ndarray`):
+                the int64 chain values.
+    """
+    counts = [ len( pairs ) for pairs in uids_and_vals ]
+    total = sum( counts )
+    pairs = numpy.fromiter( itertools.chain.from_iterable( itertools.chain.from_iterable( uids_and_vals ) ), dtype = numpy.int64, count = 2 * total ).reshape( total, 2 )
+    row = numpy.repeat( numpy.asarray( rows, dtype = numpy.int64 ), counts )
+    return row, pairs[:, 0], pairs[:, 1]
+
+def convert_coo_to_dense( n: int, row: numpy.ndarray, col: numpy.ndarray, val: numpy.ndarray, dtype: torch.dtype ) -> torch.Tensor:
+    r""" Scatters coordinate format values into a dense [n, n] tensor.
+        Returns:
+            dense (:obj:`torch.Tensor` of shape :obj:`[n, n]`):
+                tensor holding val at (row, col) and zeros elsewhere.
+    """
+    dense = torch.zeros( [ n, n ], dtype = dtype )
+    if len( row ) > 0:
+        dense[ torch.from_numpy( row ), torch.from_numpy( col ) ] = torch.from_numpy( val ).to( dtype )
+    return dense
+
+def convert_coo_to_sparse( n: int, row: numpy.ndarray, col: numpy.ndarray, val: numpy.ndarray, dtype: torch.dtype ) -> torch.Tensor:
+    r""" Builds a sparse [n, n] coo tensor from coordinate format values.
+        Returns:
+            sparse (:obj:`torch.Tensor` of shape :obj:`[n, n]`):
+                coalesced sparse coo tensor holding val at (row, col).
+    """
+    indices = torch.stack( [ torch.from_numpy( row ), torch.from_numpy( col ) ] ) if len( row ) > 0 else torch.zeros( [ 2, 0 ], dtype = torch.int64 )
+    return torch.sparse_coo_tensor( indices, torch.from_numpy( val ).to( dtype ), ( n, n ) ).coalesce()
+
+def normalize_bonds( bonds: torch.Tensor ) -> torch.FloatTensor:
+    r""" Normalizes bond ownership: each column of bonds is l1 normalized and halved, and each neuron holds the other half of its own bonds.
+        Args:
+            bonds (:obj:`torch.Tensor` of shape :obj:`[n, n]`):
+                dense or sparse coo chain bonds.
+        Returns:
+            bonds (:obj:`torch.FloatTensor` of shape :obj:`[n, n]`):
+                normalized bonds, in the layout of the passed bonds.
+    """
+    n = bonds.shape[0]
+    if not bonds.is_sparse:
+        bonds = torch.nn.functional.normalize( bonds.float(), p=1, dim=0, eps=1e-12 ) * 0.5
+        bonds.diagonal().add_( 0.5 )
+        return bonds
+    bonds = bonds.coalesce()
+    indices = bonds.indices()
+    values = bonds.values().float()
+    column_norms = torch.zeros( [ n ], dtype = torch.float32 ).index_add_( 0, indices[1], values.abs() )
+    values = values / column_norms[ indices[1] ].clamp( min = 1e-12 ) * 0.5
+    diagonal = torch.arange( n, dtype = torch.int64 )
+    indices = torch.cat( [ indices, torch.stack( [ diagonal, diagonal ] ) ], dim = 1 )
+    values = torch.cat( [ values, torch.full( [ n ], 0.5, dtype = torch.float32 ) ] )
+    return torch.sparse_coo_tensor( indices, values, ( n, n ) ).coalesce()
+
 def convert_weights_and_uids_for_emit( uids: torch.LongTensor, weights: torch.FloatTensor ) -> Tuple[List[int], List[int]]:
     r""" Converts weights into integer u32 representation that sum to MAX_INT_WEIGHT.
         Returns:
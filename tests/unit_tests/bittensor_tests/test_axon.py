@@ -1,6 +1,7 @@
 import torch
 import grpc
 import bittensor
+import threading
 import time
 import pytest
 import uuid
@@ -41,6 +42,30 @@ def test_forward_wandb():
     axon.update_stats_for_request( request, response, call_time, code )
     print( axon.to_wandb() )
 
+def test_forward_pubkey_stats():
+    axon = bittensor.axon(wallet = wallet, port = 8089)
+    inputs_raw = torch.rand(3, 3, bittensor.__network_dim__)
+    serializer = bittensor.serializer( serialzer_type = bittensor.proto.Serializer.MSGPACK )
+    inputs_serialized = serializer.serialize(inputs_raw, modality = bittensor.proto.Modality.TENSOR, from_type = bittensor.proto.TensorType.TORCH)
+    request = bittensor.proto.TensorMessage(
+        version = bittensor.__version_as_int__,
+        hotkey = wallet.hotkey.ss58_address,
+        tensors=[inputs_serialized]
+    )
+    response = axon.Forward( request, None )
+    row = axon.stats.pubkeys.rows()[ wallet.hotkey.ss58_address ]
+    assert row['n_requested'] == 1
+    assert row['avg_inbytes'] == request.ByteSize()
+    assert row['avg_outbytes'] == response.ByteSize()
+    assert row['codes'] == { bittensor.proto.ReturnCode.NotImplemented: 1 }
+    assert axon.stats.total_in_bytes == request.ByteSize()
+
+    metagraph = mock.MagicMock( hotkey_index = { wallet.hotkey.ss58_address: 7 } )
+    dataframe = axon.to_dataframe( metagraph )
+    assert dataframe.index.tolist() == [ 7 ]
+    assert dataframe.loc[ 7, 'axon_n_requested' ] == 1
+    assert dataframe.loc[ 7, 'axon_n_success' ] == 0
+
 
 def test_forward_not_implemented():
     inputs_raw = torch.rand(3, 3, bittensor.__network_dim__)
@@ -165,6 +190,35 @@ def test_forward_tensor_shape_error():
     response, code, call_time, message  = axon._forward( request )
     assert code == bittensor.proto.ReturnCode.RequestShapeException
 
+def test_forward_max_batch_size_error():
+    axon = bittensor.axon(wallet = wallet)
+    axon.request_limits[ bittensor.proto.Modality.TENSOR ].max_batch_size = 2
+    inputs_raw = torch.rand(3, 3, bittensor.__network_dim__)
+    serializer = bittensor.serializer( serialzer_type = bittensor.proto.Serializer.MSGPACK )
+    inputs_serialized = serializer.serialize(inputs_raw, modality = bittensor.proto.Modality.TENSOR, from_type = bittensor.proto.TensorType.TORCH)
+    request = bittensor.proto.TensorMessage(
+        version=bittensor.__version_as_int__,
+        hotkey = axon.wallet.hotkey.ss58_address,
+        tensors=[ inputs_serialized ]
+    )
+    with mock.patch.object( bittensor.serializer, '__new__', side_effect = Exception('deserialized') ):
+        response, code, call_time, message  = axon._forward( request )
+    assert code == bittensor.proto.ReturnCode.RequestShapeException
+
+def test_forward_shape_buffer_mismatch_error():
+    inputs_raw = torch.rand(3, 3, bittensor.__network_dim__)
+    serializer = bittensor.serializer( serialzer_type = bittensor.proto.Serializer.MSGPACK )
+    inputs_serialized = serializer.serialize(inputs_raw, modality = bittensor.proto.Modality.TENSOR, from_type = bittensor.proto.TensorType.TORCH)
+    del inputs_serialized.shape[:]
+    inputs_serialized.shape.extend( [ 3000, 3000, bittensor.__network_dim__ ] )
+    request = bittensor.proto.TensorMessage(
+        version=bittensor.__version_as_int__,
+        hotkey = axon.wallet.hotkey.ss58_address,
+        tensors=[ inputs_serialized ]
+    )
+    response, code, call_time, message  = axon._forward( request )
+    assert code == bittensor.proto.ReturnCode.RequestShapeException
+
 def test_forward_deserialization_empty():
     def forward( inputs_x: torch.Tensor):
         return None
@@ -531,6 +585,249 @@ def test_backward_response_success_text_priority():
     assert code == bittensor.proto.ReturnCode.Success
 
 
+def test_forward_latency_histograms():
+    def priority(pubkey:str, request_type:str, inputs_x):
+        return 100
+
+    axon = bittensor.axon(wallet = wallet, priority= priority)
+
+    def forward( inputs_x: torch.FloatTensor):
+        return torch.zeros( [inputs_x.shape[0], inputs_x.shape[1], bittensor.__network_dim__])
+    axon.attach_forward_callback( forward, modality=2)
+    inputs_raw = torch.rand(3, 3, bittensor.__network_dim__)
+    serializer = bittensor.serializer( serialzer_type = bittensor.proto.Serializer.MSGPACK )
+    inputs_serialized = serializer.serialize(inputs_raw, modality = bittensor.proto.Modality.TENSOR, from_type = bittensor.proto.TensorType.TORCH)
+    request = bittensor.proto.TensorMessage(
+        version = bittensor.__version_as_int__,
+        tensors=[inputs_serialized]
+    )
+    response, code, call_time, message = axon._forward( request )
+    assert code == bittensor.proto.ReturnCode.Success
+
+    stages = axon.latency_stats()['FORWARD']['TENSOR']
+    assert set(stages.keys()) == { 'deserialize', 'queue', 'compute', 'serialize', 'total' }
+    assert all( histogram['count'] == 1 for histogram in stages.values() )
+
+    dataframe = axon.to_dataframe( metagraph = None, latency = True )
+    assert len(dataframe) == 5
+    assert list(dataframe['count']) == [1] * 5
+    assert 'axon/latency/forward/tensor/total/p99' in axon.to_wandb()
+
+def test_latency_stats_server():
+    import json
+    import urllib.request
+    axon = bittensor.axon(wallet = wallet, port = 8087, stats_port = 0)
+    axon.start()
+    try:
+        # Served on loopback only by default.
+        assert axon.stats_server.server_address[0] == '127.0.0.1'
+        stats_port = axon.stats_server.server_address[1]
+        with urllib.request.urlopen( 'http://127.0.0.1:{}'.format(stats_port) ) as response:
+            assert json.loads( response.read() ) == axon.latency_stats()
+    finally:
+        axon.stop()
+    assert axon.stats_server == None
+
+
+def test_forward_frontend_pool():
+    def forward( inputs_x: torch.FloatTensor):
+        return torch.zeros( [inputs_x.shape[0], inputs_x.shape[1], bittensor.__network_dim__])
+    axon = bittensor.axon(wallet = wallet, port = 8088, frontends = 1, forward_tensor = forward)
+    assert axon.server == None
+
+    # Serve a frontend from this process, without spawning it.
+    pool = axon.frontend_pool
+    pool._open( axon )
+    frontend = bittensor._axon.frontend_impl.FrontendAxon(
+        index = 0,
+        requests_ring = pool.requests_ring,
+        responses_ring = pool.responses_ring,
+        requests = pool.requests,
+        responses = pool.responses[0],
+        wallet = wallet,
+        server = None,
+        ip = '127.0.0.1',
+        port = 8088,
+    )
+    inputs_raw = torch.rand(3, 3, bittensor.__network_dim__)
+    serializer = bittensor.serializer( serialzer_type = bittensor.proto.Serializer.MSGPACK )
+    inputs_serialized = serializer.serialize(inputs_raw, modality = bittensor.proto.Modality.TENSOR, from_type = bittensor.proto.TensorType.TORCH)
+    request = bittensor.proto.TensorMessage(
+        version = bittensor.__version_as_int__,
+        hotkey = wallet.hotkey.ss58_address,
+        tensors=[inputs_serialized]
+    )
+    response, code, call_time, message = frontend._forward( request )
+    assert code == bittensor.proto.ReturnCode.Success
+    assert 'compute' in frontend.latency_stats()['FORWARD']['TENSOR']
+    frontend.update_stats_for_request( request, response, call_time, code )
+
+    # Frontend stats are aggregated by the model owner.
+    pool.stats_queue.put( (0, frontend.stats_snapshot()) )
+    time.sleep(0.5)
+    assert axon.to_wandb()['axon/total_requests'] == 1
+    pool.responses[0].put( None )
+    axon.stop()
+
+
+def _frontend_axon( port: int, **kwargs ) -> 'bittensor.Axon':
+    def forward( inputs_x: torch.FloatTensor):
+        return torch.zeros( [inputs_x.shape[0], inputs_x.shape[1], bittensor.__network_dim__])
+    config = bittensor.axon.config()
+    config.axon.shm_slots = 4
+    config.axon.shm_slot_bytes = 1 << 20
+    axon = bittensor.axon( config = config, wallet = wallet, ip = '127.0.0.1', port = port, forward_tensor = forward, **kwargs )
+    axon.frontend_pool.stats_interval = 0.2
+    return axon
+
+def _grpc_forward( port: int, caller: 'bittensor.wallet' = wallet ):
+    channel = grpc.insecure_channel( '127.0.0.1:{}'.format(port) )
+    grpc.channel_ready_future( channel ).result( timeout = 60 )
+    stub = bittensor.grpc.BittensorStub( channel )
+    serializer = bittensor.serializer( serialzer_type = bittensor.proto.Serializer.MSGPACK )
+    inputs_serialized = serializer.serialize( torch.rand(3, 3, bittensor.__network_dim__), modality = bittensor.proto.Modality.TENSOR, from_type = bittensor.proto.TensorType.TORCH )
+    request = bittensor.proto.TensorMessage( version = bittensor.__version_as_int__, hotkey = caller.hotkey.ss58_address, tensors = [ inputs_serialized ] )
+    try:
+        return stub.Forward( request, timeout = 30, metadata = (
+            ('rpc-auth-header','Bittensor'),
+            ('bittensor-signature',sign(caller)),
+            ('bittensor-version',str(bittensor.__version_as_int__)),
+            ('request_type', str(bittensor.proto.RequestType.FORWARD)),
+        ))
+    finally:
+        channel.close()
+
+def test_forward_frontend_processes():
+    axon = _frontend_axon( 8089, frontends = 2 )
+    axon.start()
+    try:
+        # Both spawned frontends bind the axon port.
+        assert len( axon.frontend_pool.processes ) == 2
+        for _ in range(6):
+            response = _grpc_forward( 8089 )
+            assert response.return_code == bittensor.proto.ReturnCode.Success
+        assert all( [ process.is_alive() for process in axon.frontend_pool.processes ] )
+
+        # The stats of both processes are merged by the model owner.
+        deadline = time.time() + 10
+        while time.time() < deadline and ( len( axon.frontend_pool.stats_snapshots() ) < 2 or axon.to_wandb().get('axon/total_requests') != 6 ):
+            time.sleep( 0.2 )
+        assert len( axon.frontend_pool.stats_snapshots() ) == 2
+        assert axon.to_wandb()['axon/total_requests'] == 6
+    finally:
+        axon.stop()
+    assert axon.frontend_pool.processes == []
+
+def test_frontend_rejects_before_deserialization():
+    from types import SimpleNamespace
+    from substrateinterface import Keypair
+    blacklisted = SimpleNamespace( hotkey = Keypair.create_from_mnemonic( Keypair.generate_mnemonic() ) )
+    axon = _frontend_axon( 8090, frontends = 1, rate_limit = True, blacklist = lambda pubkey, request_type: pubkey == blacklisted.hotkey.ss58_address )
+    axon.frontend_pool.config.axon.rate_limit.stake_tiers = [ 0 ]
+    axon.frontend_pool.config.axon.rate_limit.forward_rates = [ 0.1 ]
+    axon.frontend_pool.config.axon.rate_limit.backward_rates = [ 0.1 ]
+    axon.frontend_pool.config.axon.rate_limit.burst_seconds = 1
+    axon.start()
+    try:
+        # The model owner rejects the first request and reports the verdict, the frontend rejects the next ones itself.
+        assert _grpc_forward( 8090, blacklisted ).return_code == bittensor.proto.ReturnCode.Unauthenticated
+        with pytest.raises( grpc.RpcError ) as error:
+            _grpc_forward( 8090, blacklisted )
+        assert error.value.code() == grpc.StatusCode.UNAUTHENTICATED
+
+        # A caller over its rate is told to back off by the frontend.
+        assert _grpc_forward( 8090 ).return_code == bittensor.proto.ReturnCode.Success
+        with pytest.raises( grpc.RpcError ) as error:
+            _grpc_forward( 8090 )
+        assert error.value.code() == grpc.StatusCode.RESOURCE_EXHAUSTED
+    finally:
+        axon.stop()
+
+def test_rate_limiter():
+    stakes = { 'low': 0, 'high': 100 }
+    limiter = bittensor._axon.rate_limiter_impl.RateLimiter(
+        stake_tiers = [ 0, 10 ],
+        forward_rates = [ 1, 10 ],
+        backward_rates = [ 0.5, 5 ],
+        burst_seconds = 2,
+        idle_seconds = 60,
+        max_pubkeys = 2,
+        stake = lambda pubkey: stakes[ pubkey ],
+    )
+    forward = bittensor.proto.RequestType.FORWARD
+    backward = bittensor.proto.RequestType.BACKWARD
+    # Bursts of 2 and 20 forward requests.
+    assert [ limiter.allow( 'low', forward, now = 0 ) for _ in range(3) ] == [ True, True, False ]
+    assert all( [ limiter.allow( 'high', forward, now = 0 ) for _ in range(20) ] )
+    assert not limiter.allow( 'high', forward, now = 0 )
+    # Backward has its own budget.
+    assert limiter.allow( 'low', backward, now = 0 )
+    # Refill at the tier rate.
+    assert limiter.allow( 'low', forward, now = 1 )
+    assert not limiter.allow( 'low', forward, now = 1 )
+    assert limiter.n_rejected == 3
+    # Idle and least recently used buckets are dropped.
+    assert limiter.allow( 'unknown', forward, now = 1 ) == True
+    assert len( limiter.buckets[ forward ] ) == 2 and 'high' not in limiter.buckets[ forward ]
+    limiter.allow( 'low', backward, now = 100 )
+    assert len( limiter.buckets[ backward ] ) == 1
+
+def test_rate_limit_interceptor():
+    limiter = bittensor._axon.rate_limiter_impl.RateLimiter( stake_tiers = [ 0 ], forward_rates = [ 0.1 ], backward_rates = [ 0.1 ], burst_seconds = 1 )
+    interceptor = bittensor._axon.AuthInterceptor( blacklist = None, rate_limiter = limiter )
+    meta = [ None, mock.MagicMock( value = sign( wallet ) ), None, mock.MagicMock( value = str( bittensor.proto.RequestType.FORWARD ) ) ]
+    assert interceptor.rate_limit_checking( meta )
+    assert not interceptor.rate_limit_checking( meta )
+
+def test_signature_verification_cache():
+    interceptor = bittensor._axon.AuthInterceptor( blacklist = None )
+    bittensor._axon._keypairs.pop( wallet.hotkey.ss58_address, None )
+    assert interceptor.vertification( [ None, mock.MagicMock( value = sign( wallet ) ) ] )
+    time.sleep( 0.001 )
+    assert interceptor.vertification( [ None, mock.MagicMock( value = sign( wallet ) ) ] )
+    stats = interceptor.verification_stats()
+    assert stats['n_verified'] == 2
+    assert stats['cache_misses'] == 1 and stats['cache_hits'] == 1
+    assert stats['verify_time']['count'] == 2
+
+def test_signature_verification_stats_threads():
+    interceptor = bittensor._axon.AuthInterceptor( blacklist = None )
+    signature = wallet.hotkey.sign( 'data' )
+    def verify():
+        for _ in range( 200 ):
+            interceptor.verify( wallet.hotkey.ss58_address, 'data', signature )
+    threads = [ threading.Thread( target = verify ) for _ in range( 8 ) ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = interceptor.verification_stats()
+    assert stats['n_verified'] == 1600
+    assert stats['cache_hits'] + stats['cache_misses'] == 1600
+
+def test_signature_verification_pool():
+    interceptor = bittensor._axon.AuthInterceptor( blacklist = None, verifier_workers = 1 )
+    try:
+        assert interceptor.vertification( [ None, mock.MagicMock( value = sign( wallet ) ) ] )
+        assert not interceptor.verify( wallet.hotkey.ss58_address, 'data', wallet.hotkey.sign( 'other data' ) )
+        assert interceptor.verification_stats()['n_failed'] == 1
+    finally:
+        interceptor.stop()
+
+def test_signature_verification_pool_restart():
+    config = bittensor.axon.config()
+    config.axon.verifier_workers = 1
+    axon = bittensor.axon( config = config, wallet = wallet, ip = '127.0.0.1', port = 8091 )
+    axon.stop()
+    assert axon.interceptor.verifier_pool == None
+    # A started axon verifies in a new pool.
+    axon.start()
+    try:
+        assert axon.interceptor.verifier_pool != None
+        assert axon.interceptor.vertification( [ None, mock.MagicMock( value = sign( wallet ) ) ] )
+    finally:
+        axon.stop()
+
 def test_grpc_forward_works():
     def forward( inputs_x:torch.FloatTensor):
         return torch.zeros( [1, 1, 1])
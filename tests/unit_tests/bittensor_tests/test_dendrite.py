@@ -42,6 +42,12 @@ def test_dendrite_forward_text_multiple_endpoints_tensor():
     resp1,  _, _ = dendrite.forward_text( endpoints, x )
     assert list(torch.stack(resp1, dim=0).shape) == [2, 2, 3, bittensor.__network_dim__]
 
+def test_dendrite_forward_text_endpoint_columns():
+    endpoints = bittensor.EndpointColumns.from_endpoints( [ neuron_obj, neuron_obj ] )
+    x = torch.tensor( [[ 1,2,3 ], [ 1,2,3 ]] )
+    resp1,  _, _ = dendrite.forward_text( endpoints[ torch.tensor( [ 0, 1 ] ) ], x )
+    assert list(torch.stack(resp1, dim=0).shape) == [2, 2, 3, bittensor.__network_dim__]
+
 def test_dendrite_forward_text_multiple_endpoints_tensor_list():
     endpoints_1 = neuron_obj.to_tensor()
     endpoints_2 = neuron_obj.to_tensor()
@@ -125,6 +125,31 @@ def test_endpoint_to_tensor():
     assert torch.equal(tensor_endpoint, converted_endpoint.to_tensor())
     assert converted_endpoint.check_format() == True
 
+def test_endpoint_columns():
+    endpoints = [ endpoint, bittensor.endpoint.dummy() ]
+    endpoints.append( bittensor.endpoint( version = 1, uid = 2, ip = '2001:db8::1', ip_type = 6, port = 8091, hotkey = test_wallet.coldkey.ss58_address, coldkey = test_wallet.hotkey.ss58_address, modality = 0 ) )
+    columns = bittensor.EndpointColumns.from_endpoints( endpoints )
+    assert len(columns) == 3
+    # torch.from_numpy warns on read-only arrays.
+    assert bittensor._endpoint.endpoint_columns_impl._encode_ips( [ '1.2.3.4' ] ).flags.writeable
+    assert list( columns ) == endpoints
+    assert columns[0] is columns[0]
+    assert columns.hotkeys() == [ e.hotkey for e in endpoints ]
+    assert columns.serving_mask().tolist() == [ True, False, True ]
+
+    # Column views select rows, and match the tensor encoding.
+    selected = columns[ torch.tensor( [2, 0] ) ]
+    assert isinstance( selected, bittensor.EndpointColumns )
+    assert list( selected ) == [ endpoints[2], endpoints[0] ]
+    legacy = bittensor.EndpointColumns.from_tensor( torch.stack( [ e.to_tensor() for e in endpoints ] ) )
+    assert all( torch.equal( a, b ) for a, b in zip( legacy.parameters(), columns.parameters() ) )
+
+    # Endpoint objects of unchanged rows are reused.
+    columns[2]
+    updated = bittensor.EndpointColumns.from_endpoints( endpoints[:2] + [ endpoint ] ).reuse( columns )
+    assert updated[0] is columns[0]
+    assert updated[2] is not columns[2]
+
 def test_thrash_equality_of_endpoint():
     n_tests = 10000
     for _ in range(n_tests):
@@ -1,6 +1,19 @@
 import bittensor
+import http.server
+import io
+import json
+import numpy
+import os
+import pickle
+import pytest
+import subprocess
+import sys
+import threading
 import torch
 import unittest
+import urllib.parse
+from bittensor._metagraph.background_impl import BackgroundSync
+from types import SimpleNamespace
 
 metagraph = None
 def test_create():
@@ -40,7 +53,7 @@ def test_state_dict():
     assert 'block' in state
     assert 'tau' in state
     assert 'weights' in state
-    assert 'endpoints' in state
+    assert 'endpoints.hotkey' in state
 
 def test_properties():
     metagraph.hotkeys
@@ -51,3 +64,405 @@ def test_properties():
     metagraph.S
     metagraph.D
     metagraph.C
+
+def _synthetic_metagraph():
+    hotkeys = [ bittensor.Keypair.create_from_mnemonic( bittensor.Keypair.generate_mnemonic() ).ss58_address for _ in range(3) ]
+    coldkey = bittensor.Keypair.create_from_mnemonic( bittensor.Keypair.generate_mnemonic() ).ss58_address
+    endpoints = [ bittensor.endpoint( version = 1, uid = uid, ip = '0.0.0.0', ip_type = 4, port = 8091, modality = 0, hotkey = hotkeys[uid], coldkey = coldkey ) for uid in range(2) ]
+    endpoints.append( bittensor.endpoint.dummy() )
+    n = len( endpoints )
+    state_dict = {
+        'version': torch.tensor( bittensor.__version_as_int__, dtype = torch.int64 ),
+        'n': torch.tensor( n, dtype = torch.int64 ),
+        'tau': torch.tensor( 0.5, dtype = torch.float32 ),
+        'block': torch.tensor( 0, dtype = torch.int64 ),
+        'uids': torch.arange( n, dtype = torch.int64 ),
+        'stake': torch.tensor( [ 1.0, 3.0, 2.0 ] ),
+        'ranks': torch.zeros( n ),
+        'trust': torch.zeros( n ),
+        'consensus': torch.zeros( n ),
+        'incentive': torch.zeros( n ),
+        'emission': torch.zeros( n ),
+        'dividends': torch.zeros( n ),
+        'active': torch.tensor( [ 1, 0, 1 ], dtype = torch.int64 ),
+        'last_update': torch.zeros( n, dtype = torch.int64 ),
+        'weights': torch.zeros( ( n, n ) ),
+        'bonds': torch.zeros( ( n, n ), dtype = torch.int64 ),
+        'endpoints': torch.stack( [ endpoint.to_tensor() for endpoint in endpoints ] ),
+    }
+    # The views are derived from local state only, so no subtensor connection is needed.
+    graph = bittensor._metagraph.metagraph_impl.Metagraph( subtensor = None ).load_from_state_dict( state_dict )
+    return graph, hotkeys, coldkey
+
+def test_views():
+    graph, hotkeys, coldkey = _synthetic_metagraph()
+    assert graph.hotkeys == [ hotkeys[0], hotkeys[1], '' ]
+    assert graph.hotkey_index == { hotkeys[0]: 0, hotkeys[1]: 1 }
+    assert graph.hotkey_to_uid( hotkeys[1] ) == 1
+    assert graph.hotkey_to_uid( hotkeys[2] ) == -1
+    assert graph.coldkey_to_uids( coldkey ) == [ 0, 1 ]
+    assert graph.coldkey_to_uids( hotkeys[2] ) == []
+    assert graph.active_uids.tolist() == [ 0, 2 ]
+    assert graph.serving_mask.tolist() == [ True, True, False ]
+    assert graph.stake_order.tolist() == [ 1, 2, 0 ]
+
+def test_views_invalidated_on_load():
+    graph, hotkeys, _ = _synthetic_metagraph()
+    views = graph.views
+    assert graph.views is views
+    graph.load_from_state_dict( graph.state_dict() )
+    assert graph.views is not views
+    assert graph.hotkey_to_uid( hotkeys[0] ) == 0
+
+def _neuron( uid, weights = [], bonds = [], last_update = 0 ):
+    hotkey = bittensor.Keypair.create_from_mnemonic( bittensor.Keypair.generate_mnemonic() ).ss58_address
+    return SimpleNamespace(
+        version = 1, uid = uid, hotkey = hotkey, coldkey = hotkey, ip = '0.0.0.0', ip_type = 4, port = 8091, modality = 0,
+        active = 1, stake = float(uid), rank = 0, trust = 0, consensus = 0, incentive = 0, dividends = 0, emission = 0,
+        last_update = last_update, weights = weights, bonds = bonds,
+    )
+
+def _subtensor( neurons, block = 10 ):
+    return SimpleNamespace( network = 'mock', get_current_block = lambda: block, neurons = lambda block = None: neurons )
+
+def test_sync_weights_and_bonds():
+    U32_MAX = bittensor.utils.weight_utils.U32_MAX
+    neurons = [
+        _neuron( 0, weights = [ [1, U32_MAX] ], bonds = [ [1, 4], [2, 12] ] ),
+        _neuron( 1 ),
+        _neuron( 2, weights = [ (0, U32_MAX // 2), (2, U32_MAX // 2) ], bonds = [ (0, 8) ] ),
+    ]
+    graph = bittensor._metagraph.metagraph_impl.Metagraph( subtensor = _subtensor( neurons ) ).sync()
+    expected_weights = torch.stack( [ bittensor.utils.weight_utils.convert_weight_uids_and_vals_to_tensor( 3, [ w[0] for w in n.weights ], [ w[1] for w in n.weights ] ) for n in neurons ] )
+    expected_bonds = torch.stack( [ bittensor.utils.weight_utils.convert_bond_uids_and_vals_to_tensor( 3, [ b[0] for b in n.bonds ], [ b[1] for b in n.bonds ] ) for n in neurons ] )
+    expected_bonds = torch.nn.functional.normalize( expected_bonds.float(), p=1, dim=0, eps=1e-12 ) * 0.5 + torch.eye( 3 ) * 0.5
+    assert torch.equal( graph.W, expected_weights )
+    assert torch.allclose( graph.B, expected_bonds )
+    assert graph.block.item() == 10
+    assert graph.hotkey_to_uid( neurons[2].hotkey ) == 2
+
+def test_sync_sparse(tmp_path):
+    U32_MAX = bittensor.utils.weight_utils.U32_MAX
+    neurons = [
+        _neuron( 0, weights = [ [1, U32_MAX] ], bonds = [ [1, 4], [2, 12] ] ),
+        _neuron( 1 ),
+        _neuron( 2, weights = [ (0, U32_MAX // 2), (2, U32_MAX // 2) ], bonds = [ (0, 8), (2, 8) ] ),
+    ]
+    dense = bittensor._metagraph.metagraph_impl.Metagraph( subtensor = _subtensor( neurons ) ).sync()
+    sparse = bittensor._metagraph.metagraph_impl.Metagraph( subtensor = _subtensor( neurons ), sparse = True ).sync()
+    assert sparse.W.is_sparse and sparse.B.is_sparse
+    assert sparse.W._nnz() == 3
+    assert torch.equal( sparse.W.to_dense(), dense.W )
+    assert torch.allclose( sparse.B.to_dense(), dense.B )
+
+    # Saved sparse state loads into either layout.
+    sparse.save_to_path( path = str(tmp_path), filename = 'sparse.pt' )
+    loaded = bittensor._metagraph.metagraph_impl.Metagraph( subtensor = None ).load_from_path( str(tmp_path) + '/sparse.pt' )
+    assert not loaded.W.is_sparse
+    assert torch.equal( loaded.W, dense.W )
+    dense.save_to_path( path = str(tmp_path), filename = 'dense.pt' )
+    loaded = bittensor._metagraph.metagraph_impl.Metagraph( subtensor = None, sparse = True ).load_from_path( str(tmp_path) + '/dense.pt' )
+    assert loaded.B.is_sparse
+    assert torch.allclose( loaded.B.to_dense(), dense.B )
+
+def test_sync_incremental():
+    U32_MAX = bittensor.utils.weight_utils.U32_MAX
+    neurons = [
+        _neuron( 0, weights = [ [1, U32_MAX] ], bonds = [ [1, 4] ], last_update = 1 ),
+        _neuron( 1, weights = [ [0, U32_MAX] ], last_update = 1 ),
+        _neuron( 2, weights = [ [2, U32_MAX] ], last_update = 1 ),
+    ]
+    for sparse in [ False, True ]:
+        subtensor = _subtensor( list(neurons) )
+        graph = bittensor._metagraph.metagraph_impl.Metagraph( subtensor = subtensor, sparse = sparse ).sync()
+        endpoints = graph.endpoint_objs
+
+        # Neuron 1 sets new weights and a new neuron registers.
+        updated = list(neurons)
+        updated[1] = _neuron( 1, weights = [ (0, U32_MAX // 2), (3, U32_MAX // 2) ], bonds = [ [0, 8] ], last_update = 5 )
+        updated.append( _neuron( 3, weights = [ [1, U32_MAX] ], last_update = 5 ) )
+        subtensor.neurons = lambda block = None: updated
+        graph.sync( incremental = True )
+        full = bittensor._metagraph.metagraph_impl.Metagraph( subtensor = subtensor, sparse = sparse ).sync()
+        assert graph.n.item() == 4
+        assert torch.equal( graph.W.to_dense(), full.W.to_dense() )
+        assert torch.allclose( graph.B.to_dense(), full.B.to_dense() )
+        assert all( torch.equal( a, b ) for a, b in zip( graph.endpoints.parameters(), full.endpoints.parameters() ) )
+        assert torch.equal( graph.last_update, full.last_update )
+        assert graph.hotkeys == full.hotkeys
+        assert graph.endpoint_objs[0] is endpoints[0]
+        assert graph.endpoint_objs[1] is not endpoints[1]
+
+    # A shrinking network falls back to a full sync.
+    subtensor.neurons = lambda block = None: neurons[:2]
+    graph.sync( incremental = True )
+    assert graph.n.item() == 2
+    assert torch.equal( graph.W.to_dense(), torch.tensor( [ [0, 1], [1, 0] ], dtype = torch.float32 ) )
+
+def test_shared_metagraph():
+    U32_MAX = bittensor.utils.weight_utils.U32_MAX
+    neurons = [
+        _neuron( 0, weights = [ [1, U32_MAX] ], bonds = [ [1, 4] ] ),
+        _neuron( 1, weights = [ [0, U32_MAX] ] ),
+    ]
+    subtensor = _subtensor( neurons )
+    name = 'bt-test-{}'.format( os.getpid() )
+    graph = bittensor._metagraph.metagraph_impl.Metagraph( subtensor = subtensor, sparse = True ).share( name )
+    try:
+        graph.sync()
+        attached = bittensor.Metagraph.attach( name )
+        assert attached.n.item() == 2
+        assert torch.equal( attached.W, graph.W.to_dense() )
+        assert attached.hotkeys == graph.hotkeys
+        assert attached.endpoint_objs[1] == graph.endpoint_objs[1]
+
+        # Unchanged states are not reloaded, published ones replace the held state.
+        weights = attached.W
+        assert attached.sync().W is weights
+        neurons.append( _neuron( 2, weights = [ [0, U32_MAX] ] ) )
+        graph.sync()
+        attached.sync()
+        assert attached.n.item() == 3
+        assert torch.equal( attached.W, graph.W.to_dense() )
+        assert attached.hotkeys == graph.hotkeys
+        assert torch.equal( weights, torch.tensor( [ [0, 1], [1, 0] ], dtype = torch.float32 ) )
+    finally:
+        graph.unshare()
+    with pytest.raises( FileNotFoundError ):
+        bittensor.Metagraph.attach( name )
+
+_SHARED_READER = """
+import json, sys, torch, bittensor
+attached = bittensor.Metagraph.attach( sys.argv[1] )
+print( json.dumps( { 'n': attached.n.item(), 'W': attached.W.tolist(), 'hotkeys': attached.hotkeys } ) )
+"""
+
+def test_shared_metagraph_other_process():
+    U32_MAX = bittensor.utils.weight_utils.U32_MAX
+    neurons = [
+        _neuron( 0, weights = [ [1, U32_MAX] ] ),
+        _neuron( 1, weights = [ [0, U32_MAX] ] ),
+    ]
+    name = 'bt-test-spawn-{}'.format( os.getpid() )
+    graph = bittensor._metagraph.metagraph_impl.Metagraph( subtensor = _subtensor( neurons ) ).share( name )
+    try:
+        graph.sync()
+        result = subprocess.run( [ sys.executable, '-c', _SHARED_READER, name ], capture_output = True, text = True, timeout = 300 )
+        assert result.returncode == 0, result.stderr
+        assert 'BufferError' not in result.stderr
+        state = json.loads( result.stdout.strip().splitlines()[-1] )
+        assert state['n'] == 2
+        assert state['W'] == graph.W.tolist()
+        assert state['hotkeys'] == graph.hotkeys
+    finally:
+        graph.unshare()
+
+def test_changes():
+    neurons = [ _neuron( uid ) for uid in range(4) ]
+    subtensor = _subtensor( neurons )
+    graph = bittensor._metagraph.metagraph_impl.Metagraph( subtensor = subtensor )
+    received = []
+    graph.subscribe( received.append )
+    graph.sync()
+    assert received[0].new_uids.tolist() == [0, 1, 2, 3]
+    assert received[0].previous_n == 0
+
+    previous_hotkey = neurons[1].hotkey
+    updated = list( neurons )
+    updated[1] = _neuron( 1 )
+    updated[2] = SimpleNamespace( **{ **vars( neurons[2] ), 'port': 9000, 'active': 0 } )
+    updated[3] = SimpleNamespace( **{ **vars( neurons[3] ), 'stake': 10.0 } )
+    updated.append( _neuron( 4 ) )
+    subtensor.neurons = lambda block = None: updated
+    graph.sync( incremental = True )
+    changes = received[1]
+    assert changes is graph.last_changes
+    assert changes.new_uids.tolist() == [4]
+    assert changes.removed_uids.tolist() == []
+    assert changes.hotkey_changed.tolist() == [1]
+    assert changes.endpoint_changed.tolist() == [2]
+    assert changes.deactivated.tolist() == [2] and changes.activated.tolist() == []
+    assert changes.stake_changed.tolist() == [3]
+    assert changes.stake_changed_above( 10 ).tolist() == []
+    assert changes.stake_changed_above( 1 ).tolist() == [3]
+    assert changes.previous_endpoints[ changes.hotkey_changed ].hotkeys() == [ previous_hotkey ]
+
+    # Unchanged syncs are empty, failing subscribers do not stop the others.
+    def fail( changes ):
+        raise ValueError()
+    graph.unsubscribe( received.append )
+    graph.subscribe( fail )
+    graph.subscribe( received.append )
+    graph.sync()
+    assert received[2].is_empty()
+
+def test_background_sync():
+    neurons = [ _neuron( uid ) for uid in range(2) ]
+    subtensor = _subtensor( neurons )
+    graph = bittensor._metagraph.metagraph_impl.Metagraph( subtensor = subtensor ).sync()
+    received = []
+    graph.subscribe( lambda changes: received.append( ( changes, threading.current_thread() ) ) )
+    endpoints = graph.endpoint_objs
+    background = BackgroundSync( graph )
+
+    # The current metagraph is untouched while the copy syncs.
+    release = threading.Event()
+    def neurons_after_release( block = None ):
+        release.wait( 10 )
+        return neurons + [ _neuron( 2 ) ]
+    subtensor.neurons = neurons_after_release
+    assert background.start( incremental = True )
+    assert not background.start()
+    assert background.swap() == None
+    assert graph.n.item() == 2 and received == []
+
+    release.set()
+    synced = background.swap( wait = True )
+    assert synced is background.metagraph and synced is not graph
+    assert synced.n.item() == 3 and graph.n.item() == 2
+    assert synced.hotkeys[:2] == graph.hotkeys
+    assert synced.endpoint_objs[0] is endpoints[0]
+    assert len( received ) == 1
+    assert received[0][0].new_uids.tolist() == [2]
+    assert received[0][1] is threading.current_thread()
+
+    # Failed syncs are not swapped in.
+    def fail( block = None ):
+        raise ValueError()
+    subtensor.neurons = fail
+    background.start()
+    assert background.swap( wait = True ) == None
+    assert background.metagraph is synced
+
+def test_snapshot(tmp_path):
+    U32_MAX = bittensor.utils.weight_utils.U32_MAX
+    neurons = [
+        _neuron( 0, weights = [ [1, U32_MAX] ], bonds = [ [1, 4] ] ),
+        _neuron( 1, weights = [ [0, U32_MAX] ] ),
+    ]
+    for sparse in [ False, True ]:
+        graph = bittensor._metagraph.metagraph_impl.Metagraph( subtensor = _subtensor( neurons ), sparse = sparse ).sync()
+        path = str(tmp_path) + '/mock.snapshot'
+        graph.save_snapshot( path )
+        # Saving over a snapshot replaces it.
+        graph.save_snapshot( path )
+        loaded = bittensor._metagraph.metagraph_impl.Metagraph( subtensor = None, sparse = sparse ).load_from_path( path )
+        assert loaded.n.item() == 2 and loaded.block.item() == 10
+        assert torch.equal( loaded.W.to_dense(), graph.W.to_dense() )
+        assert torch.allclose( loaded.B.to_dense(), graph.B.to_dense() )
+        assert all( torch.equal( a, b ) for a, b in zip( loaded.endpoints.parameters(), graph.endpoints.parameters() ) )
+        assert loaded.hotkeys == graph.hotkeys
+        assert loaded.W.is_sparse == sparse
+
+    # Empty metagraphs round trip.
+    empty = bittensor._metagraph.metagraph_impl.Metagraph( subtensor = None )
+    empty.save_snapshot( str(tmp_path) + '/empty.snapshot' )
+    assert bittensor._metagraph.metagraph_impl.Metagraph( subtensor = None ).load_snapshot( str(tmp_path) + '/empty.snapshot' ).n.item() == 0
+
+def test_archive(tmp_path):
+    U32_MAX = bittensor.utils.weight_utils.U32_MAX
+    base = [ _neuron( uid, weights = [ [ (uid + 1) % 3, U32_MAX ] ], bonds = [ [uid, 1] ], last_update = 1 ) for uid in range(3) ]
+    states = { 10: base }
+    states[11] = base[:1] + [ _neuron( 1, weights = [ [0, U32_MAX] ], last_update = 11 ) ] + base[2:]
+    states[12] = states[11] + [ _neuron( 3, weights = [ [3, U32_MAX] ], last_update = 12 ) ]
+    states[13] = [ _neuron( uid, last_update = 13 ) for uid in range(4) ]
+    subtensor = SimpleNamespace( network = 'mock', get_current_block = lambda: 13, neurons = lambda block = None: states[block] )
+    archive = bittensor._metagraph.archive_impl.MetagraphArchive( str(tmp_path), base_interval = 100, max_delta_fraction = 0.5 )
+    graph = bittensor._metagraph.metagraph_impl.Metagraph( subtensor = subtensor, archive = archive )
+    expected = {}
+    for block in [ 12, 10, 11, 13 ]:
+        expected[block] = graph.sync( block = block ).W.clone()
+    # 10 and 13 changed too much to be deltas.
+    assert sorted( archive.bases ) == [ 10, 12, 13 ]
+    assert archive.deltas == { 11: 10 }
+
+    # Archived blocks are served without the chain.
+    reopened = bittensor._metagraph.archive_impl.MetagraphArchive( str(tmp_path) )
+    assert reopened.blocks() == [ 10, 11, 12, 13 ]
+    offline = bittensor._metagraph.metagraph_impl.Metagraph( subtensor = SimpleNamespace( network = 'mock' ), archive = reopened )
+    assert torch.equal( offline.sync( block = 11 ).W, expected[11] )
+    assert offline.hotkeys == [ n.hotkey for n in states[11] ]
+    assert [ ( graph.block.item(), graph.n.item() ) for graph in offline.history( 11, 13 ) ] == [ (11, 3), (12, 4), (13, 4) ]
+    assert torch.equal( offline.W, expected[13] )
+
+def test_archive_threads(tmp_path):
+    # A metagraph and its background copy record into the same archive.
+    NeuronBatch = bittensor._subtensor.neuron_impl.NeuronBatch
+    archive = bittensor._metagraph.archive_impl.MetagraphArchive( str(tmp_path), base_interval = 10 )
+    states = { block: NeuronBatch.from_neurons( [ _neuron( uid, last_update = block if uid == 0 else 1 ) for uid in range(4) ] ) for block in range( 40 ) }
+    def record( blocks ):
+        for block in blocks:
+            archive.record( block, states[block] )
+    threads = [ threading.Thread( target = record, args = ( range( start, 40, 4 ), ) ) for start in range(4) ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert archive.blocks() == list( range( 40 ) )
+    reopened = bittensor._metagraph.archive_impl.MetagraphArchive( str(tmp_path) )
+    for block in range( 40 ):
+        assert reopened.get( block ).last_update.tolist() == [ block, 1, 1, 1 ]
+
+class _IpfsHandler( http.server.BaseHTTPRequestHandler ):
+    r""" Stand-in for the ipfs http api, serving the objects of the server's content dict.
+    """
+    def do_POST( self ):
+        url = urllib.parse.urlparse( self.path )
+        arg = urllib.parse.parse_qs( url.query )['arg'][0]
+        self.server.requests.append( ( url.path, arg ) )
+        if url.path == '/api/v0/name/resolve':
+            body = json.dumps( { 'Path': '/ipfs/' + self.server.names[ arg ] } ).encode()
+        elif url.path == '/api/v0/object/get':
+            body = json.dumps( { 'Links': [ { 'Name': name, 'Hash': content_hash } for name, content_hash in self.server.links.items() ] } ).encode()
+        else:
+            body = self.server.content[ arg ]
+        self.send_response( 200 )
+        self.send_header( 'Content-Length', str( len(body) ) )
+        self.end_headers()
+        self.wfile.write( body )
+
+    def log_message( self, *args ):
+        pass
+
+def test_ipfs_cache(tmp_path, monkeypatch):
+    U32_MAX = bittensor.utils.weight_utils.U32_MAX
+    neurons = [ _neuron( 0, weights = [ [1, U32_MAX] ] ), _neuron( 1, weights = [ [0, U32_MAX] ] ) ]
+    server = http.server.ThreadingHTTPServer( ( '127.0.0.1', 0 ), _IpfsHandler )
+    server.requests = []
+    ipfs = bittensor.Ipfs()
+    server.names = { ipfs.latest_neurons_ipns: 'QmLatest', ipfs.historical_neurons_ipns: 'QmHistory' }
+    server.links = { 'nakamoto-7.pkl': 'QmBlock7' }
+    server.content = { 'QmLatest': pickle.dumps( neurons ), 'QmBlock7': pickle.dumps( [ _neuron( 0 ) ] ) }
+    threading.Thread( target = server.serve_forever, daemon = True ).start()
+    monkeypatch.setenv( 'BT_IPFS_API', 'http://127.0.0.1:{}/api/v0'.format( server.server_address[1] ) )
+    monkeypatch.setenv( 'BT_IPFS_CACHE_DIR', str(tmp_path / 'ipfs') )
+    archive = bittensor._metagraph.archive_impl.MetagraphArchive( str(tmp_path / 'archive') )
+    try:
+        graph = bittensor._metagraph.metagraph_impl.Metagraph( subtensor = SimpleNamespace( network = 'local', get_current_block = lambda: 10 ), archive = archive )
+        expected = bittensor._metagraph.metagraph_impl.Metagraph( subtensor = _subtensor( neurons ) ).sync()
+        assert torch.equal( graph.sync().W, expected.W )
+        # An unchanged hash is served from the local cache.
+        graph.sync()
+        assert [ path for path, _ in server.requests ].count( '/api/v0/cat' ) == 1
+        assert graph.hotkeys == [ n.hotkey for n in neurons ]
+
+        # The latest sync may be older than the current block, so it is not archived under it.
+        assert archive.blocks() == []
+        assert graph.sync( block = 7 ).n.item() == 1
+        assert archive.blocks() == [ 7 ]
+        graph.sync( block = 7 )
+        assert [ path for path, _ in server.requests ].count( '/api/v0/object/get' ) == 1
+        assert [ path for path, _ in server.requests ].count( '/api/v0/cat' ) == 2
+
+        # Payloads may only hold neuron types.
+        with pytest.raises( pickle.UnpicklingError ):
+            bittensor._metagraph.ipfs_cache_impl.decode_neurons( pickle.dumps( [ os.getcwd ] ) )
+        batch = bittensor._subtensor.neuron_impl.NeuronBatch.from_neurons( neurons )
+        for protocol in range( 3, pickle.HIGHEST_PROTOCOL + 1 ):
+            assert list( bittensor._metagraph.ipfs_cache_impl.decode_neurons( pickle.dumps( batch, protocol = protocol ) ) ) == list( batch )
+        columns = batch.to_columns()
+        payload = io.BytesIO()
+        numpy.savez( payload, **columns )
+        assert list( bittensor._metagraph.ipfs_cache_impl.decode_neurons( payload.getvalue() ).hotkey ) == [ n.hotkey for n in neurons ]
+    finally:
+        server.shutdown()
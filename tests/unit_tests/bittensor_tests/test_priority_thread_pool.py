@@ -1,4 +1,5 @@
 import bittensor
+import time
 from unittest.mock import MagicMock
 
 priority_pool = bittensor.prioritythreadpool(max_workers=1)
@@ -14,6 +15,57 @@ def test_priority_thread_pool():
     assert save[0] == 0
     assert save[1] == 9
 
+def test_priority_thread_pool_fair_share():
+    fair_pool = bittensor.prioritythreadpool(max_workers=1, fair_share=True)
+    save = []
+    def save_pubkey(pubkey,save):
+        time.sleep(0.01)
+        save += [pubkey]
+    with fair_pool:
+        # Blocks the single worker while the queue fills up.
+        fair_pool.submit(time.sleep, 0.1, priority=1, pubkey='block')
+        for _ in range(10):
+            fair_pool.submit(save_pubkey, 'heavy', save, priority=1000, pubkey='heavy')
+        for _ in range(2):
+            fair_pool.submit(save_pubkey, 'light', save, priority=500, pubkey='light')
+
+    # The light caller has half the weight and is served twice in the first 6 items.
+    assert save[:6].count('light') == 2
+    assert len(save) == 12
+
+def test_priority_thread_pool_expired():
+    pool = bittensor.prioritythreadpool(max_workers=1)
+    save = []
+    def save_number(number,save):
+        save += [number]
+    with pool:
+        pool.submit(time.sleep, 0.1, priority=100, pubkey='block')
+        future = pool.submit(save_number, 1, save, priority=1, pubkey='late', deadline=time.time() + 0.01)
+    assert save == []
+    assert future.cancelled()
+    assert pool.queue_stats()['late']['expired'] == 1
+    assert pool.queue_stats()['late']['depth'] == 0
+
+def test_priority_thread_pool_stats_bounded():
+    pool = bittensor.prioritythreadpool(max_workers=1)
+    pool._max_stats_pubkeys = 4
+    with pool:
+        for x in range(10):
+            pool.submit(time.sleep, 0, priority=1, pubkey='pubkey{}'.format(x), queue_class=x % 2)
+    # Idle pubkeys past the bound are dropped, the classes keep the totals.
+    stats = pool.queue_stats()
+    assert len(stats) == 4 and all( stats['depth'] == 0 for stats in stats.values() )
+    class_stats = pool.class_stats()
+    assert set(class_stats) == {0, 1}
+    assert all( stats['depth'] == 0 for stats in class_stats.values() )
+
+    pool = bittensor.prioritythreadpool(max_workers=1)
+    pool._stats_idle_seconds = 0
+    with pool:
+        pool.submit(time.sleep, 0, priority=1, pubkey='idle')
+    time.sleep(0.01)
+    assert pool.queue_stats() == {}
+    assert pool.class_stats()[None]['depth'] == 0
 
 if __name__ == "__main__":
-    test_priority_thread_pool()
\ No newline at end of file
+    test_priority_thread_pool()
@@ -1,5 +1,15 @@
 from typing import DefaultDict
+from types import SimpleNamespace
 import bittensor
+import numpy
+import base64
+import hashlib
+import json
+import pickle
+import socket
+import websocket
+import threading
+import time
 import pytest
 import unittest
 from unittest.mock import MagicMock
@@ -379,3 +389,365 @@ class TestSubtensor(unittest.TestCase):
 #     assert (type(weight_uids[0][0]) == int)
 #     assert (type(weight_uids[0][1]) == list)
 #     assert (type(weight_uids[0][1][0]) == int)
+
+def _neuron_dict( uid ):
+    hotkey = '5C4hrfjw9DjXZTzV3MwzrrAr9P1MJhSrvWGWqi1eSuyUpnhM' if uid == 4 else 'hotkey{}'.format(uid)
+    return dict( version = 1, ip = 0, port = 0, ip_type = 4, uid = uid, modality = 0, hotkey = hotkey, coldkey = 'coldkey{}'.format(uid),
+        active = 1, last_update = 0, priority = 0, stake = 0, rank = 0, trust = 0, consensus = 0, incentive = 0, dividends = 0, emission = 0, bonds = [], weights = [] )
+
+class _MapSubstrate():
+    r""" Serves a Neurons storage map where the value of uid 2 fails to decode and uid 4 is unregistered.
+    """
+    def __init__( self, n ):
+        self.n = n
+        self.queried = []
+    def __enter__( self ):
+        return self
+    def __exit__( self, *args ):
+        pass
+    def query_map( self, module, storage_function, block_hash = None, page_size = 100 ):
+        return [ ( MagicMock( value = uid ), None if uid == 2 else MagicMock( value = _neuron_dict( uid ) ) ) for uid in reversed( range( self.n ) ) ]
+    def query( self, module, storage_function, params = None, block_hash = None ):
+        if storage_function == 'N':
+            return MagicMock( value = self.n )
+        self.queried.append( params[0] )
+        return MagicMock( value = _neuron_dict( params[0] ) )
+
+def test_neurons_map():
+    substrate = _MapSubstrate( 5 )
+    subtensor = bittensor._subtensor.subtensor_impl.Subtensor( substrate = substrate, network = 'mock', chain_endpoint = 'mock' )
+    neurons = subtensor.neurons()
+    assert [ n.uid for n in neurons ] == [ 0, 1, 2, 3, 4 ]
+    assert neurons[3].hotkey == 'hotkey3'
+    assert neurons[4].is_null and not neurons[3].is_null
+    assert substrate.queried == [ 2 ]
+
+    # A uid which still fails after retries is left null rather than dropped.
+    def neuron_for_uid( uid, block = None ):
+        raise ConnectionError('dropped')
+    subtensor.neuron_for_uid = neuron_for_uid
+    neurons = subtensor.neurons()
+    assert [ n.uid for n in neurons ] == [ 0, 1, 2, 3, 4 ]
+    assert neurons[2].is_null and not neurons[3].is_null
+    graph = bittensor._metagraph.metagraph_impl.Metagraph( subtensor = SimpleNamespace( network = 'mock', get_current_block = lambda: 1, neurons = lambda block = None: neurons ) ).sync()
+    assert graph.n.item() == 5 and graph.hotkeys[3] == 'hotkey3'
+
+def test_neuron_batch():
+    NeuronBatch = bittensor._subtensor.neuron_impl.NeuronBatch
+    neurons = [ bittensor._subtensor.neuron_impl.Neuron.from_dict( dict( _neuron_dict( uid ), stake = 2000000000, weights = [ [0, 1] ] ) ) for uid in range( 3 ) ]
+    batch = NeuronBatch.from_neurons( neurons )
+    assert len(batch) == 3
+    assert batch.stake.dtype == numpy.float64 and batch.uid.dtype == numpy.int64
+    assert batch[1] == neurons[1]
+    assert list( batch ) == neurons
+    assert batch[ batch.uid > 0 ].hotkey.tolist() == [ 'hotkey1', 'hotkey2' ]
+    assert batch.weights.shape == ( 3, )
+    assert list( pickle.loads( pickle.dumps( batch ) ) ) == neurons
+    columns = batch.to_columns()
+    assert all( column.dtype != object for column in columns.values() )
+    assert list( NeuronBatch.from_columns( columns ) ) == neurons
+    assert bittensor._subtensor.subtensor_impl.Subtensor._null_neuron() is bittensor._subtensor.subtensor_impl.Subtensor._null_neuron()
+    # Default records share no mutable state and are hashable.
+    null_neuron = bittensor._subtensor.neuron_impl.NULL_NEURON
+    assert null_neuron.weights == () and null_neuron.bonds == ()
+    assert hash( null_neuron ) == hash( bittensor._subtensor.neuron_impl.Neuron( is_null = True ) )
+
+class _CountingSubstrate( _MapSubstrate ):
+    r""" Counts the storage reads and serves a chain head which moves on demand.
+    """
+    def __init__( self, n ):
+        super().__init__( n )
+        self.head = '0xhead0'
+        self.calls = 0
+    def get_chain_head( self ):
+        return self.head
+    def get_block_hash( self, block ):
+        return '0xblock{}'.format( block )
+    def get_block_number( self, block_hash ):
+        return 100
+    def query( self, module, storage_function, params = None, block_hash = None ):
+        self.calls += 1
+        if storage_function == 'Difficulty':
+            return MagicMock( value = 10 if ( block_hash or self.head ) == '0xhead0' else 20 )
+        return super().query( module, storage_function, params, block_hash )
+
+@pytest.mark.parametrize( 'env, field', [ ( 'BT_SUBTENSOR_QUERY_CACHE', 'query_cache' ), ( 'BT_SUBTENSOR_SUBSCRIBE_BLOCKS', 'subscribe_blocks' ) ] )
+def test_flag_env_defaults( monkeypatch, env, field ):
+    defaults = bittensor.Config()
+    monkeypatch.setenv( env, 'False' )
+    bittensor.subtensor.add_defaults( defaults )
+    assert defaults.subtensor[field] == False
+    monkeypatch.setenv( env, 'True' )
+    bittensor.subtensor.add_defaults( defaults )
+    assert defaults.subtensor[field] == True
+
+def test_query_cache():
+    substrate = _CountingSubstrate( 5 )
+    subtensor = bittensor._subtensor.subtensor_impl.Subtensor( substrate = substrate, network = 'mock', chain_endpoint = 'mock' )
+    assert subtensor.difficulty == 10 and subtensor.difficulty == 10
+    assert substrate.calls == 2
+
+    cache = subtensor.enable_query_cache( head_ttl = 60 )
+    substrate.calls = 0
+    assert [ subtensor.difficulty for _ in range( 3 ) ] == [ 10, 10, 10 ]
+    assert subtensor.get_n() == 5 and subtensor.get_n() == 5
+    assert substrate.calls == 2
+    assert cache.stats()['hits'] == 3 and cache.stats()['misses'] == 2 and cache.stats()['head_queries'] == 1
+
+    # A new head drops the reads at the previous one.
+    substrate.head = '0xhead1'
+    cache.set_head( substrate.head )
+    assert subtensor.difficulty == 20
+    assert substrate.calls == 3
+
+    # Reads at an explicit block survive head changes.
+    assert subtensor.neuron_for_uid( 1, block = 7 ).hotkey == 'hotkey1'
+    cache.set_head( '0xhead2' )
+    assert subtensor.neuron_for_uid( 1, block = 7 ).hotkey == 'hotkey1'
+    assert substrate.calls == 4
+
+    subtensor.disable_query_cache()
+    subtensor.difficulty
+    assert substrate.calls == 5
+
+class _HeadsSubstrate():
+    r""" Sends three new heads to a subscription, then waits until closed.
+    """
+    def __init__( self ):
+        self.closed = threading.Event()
+        self.websocket = None
+    def rpc_request( self, method, params, result_handler = None ):
+        assert method == 'chain_subscribeNewHeads'
+        for number in range( 1, 4 ):
+            header = { 'parentHash': '0x' + '00' * 32, 'number': hex( number ), 'stateRoot': '0x' + '11' * 32, 'extrinsicsRoot': '0x' + '22' * 32, 'digest': { 'logs': [] } }
+            if result_handler( { 'params': { 'result': header, 'subscription': 'sub' } }, number - 1, 'sub' ) != None:
+                return
+        self.closed.wait()
+        raise ConnectionError('closed')
+    def close( self ):
+        self.closed.set()
+
+def test_chain_clock():
+    chain_clock_impl = bittensor._subtensor.chain_clock_impl
+    # Polkadot genesis header.
+    genesis = { 'parentHash': '0x' + '00' * 32, 'number': '0x0', 'stateRoot': '0x29d0d972cd27cbc511e9589fcb7a4506d5eb6a9e8df205f00472e5ab354a4e17',
+        'extrinsicsRoot': '0x03170a2e7597b7b7e3d84c05391d139a62b157e78786d8c082f29dcf4c111314', 'digest': { 'logs': [] } }
+    assert chain_clock_impl.header_hash( genesis ) == '0x91b171bb158e2d3848fa23a9f1c25182fb8e20313b2c1eb49219da7a70ce90c3'
+    assert [ chain_clock_impl._compact( value ).hex() for value in [ 1, 64, 16384, 1 << 30 ] ] == [ '04', '0101', '02000100', '0300000040' ]
+
+    substrate = _CountingSubstrate( 5 )
+    subtensor = bittensor._subtensor.subtensor_impl.Subtensor( substrate = substrate, network = 'mock', chain_endpoint = 'mock' )
+    subtensor._connect = _HeadsSubstrate
+    cache = subtensor.enable_query_cache( head_ttl = 0 )
+    clock = subtensor.subscribe_blocks( block_time = 60 )
+    assert clock.wait_for_block( 3, timeout = 5 ) == 3
+    assert subtensor.get_current_block() == 3 and subtensor.block == 3
+    assert subtensor.wait_for_block( 4, timeout = 0.1 ) == None
+
+    # The query cache follows the subscribed head instead of querying it.
+    subtensor.difficulty
+    subtensor.difficulty
+    assert cache.head_queries == 0 and cache.head_hash == clock.head_hash and substrate.calls == 1
+
+    # Between heads the block advances by the block time.
+    clock.block_time = 0.05
+    time.sleep( 0.12 )
+    assert subtensor.get_current_block() >= 5
+
+    # A stalled subscription is not extrapolated further, block reads query the chain.
+    time.sleep( 0.1 )
+    assert clock.block == None and subtensor.get_current_block() == 100
+    subtensor.unsubscribe_blocks()
+    assert not clock.running() and subtensor.chain_clock == None
+
+class _MockChainServer():
+    r""" Local websocket json rpc server which answers system_health, system_properties and chain_getBlockHash after delay seconds.
+    """
+    def __init__( self, delay = 0.0 ):
+        self.delay = delay
+        self.requests = 0
+        self.connections = []
+        self.listener = socket.socket( socket.AF_INET, socket.SOCK_STREAM )
+        self.listener.bind( ( '127.0.0.1', 0 ) )
+        self.listener.listen()
+        self.url = 'ws://127.0.0.1:{}'.format( self.listener.getsockname()[1] )
+        threading.Thread( target = self._accept, daemon = True ).start()
+
+    def _accept( self ):
+        while True:
+            try:
+                connection, _ = self.listener.accept()
+            except OSError:
+                return
+            self.connections.append( connection )
+            threading.Thread( target = self._serve, args = ( connection, ), daemon = True ).start()
+
+    @staticmethod
+    def _read( connection, size ):
+        data = b''
+        while len( data ) < size:
+            chunk = connection.recv( size - len( data ) )
+            if not chunk:
+                raise ConnectionError('closed')
+            data += chunk
+        return data
+
+    def _serve( self, connection ):
+        try:
+            request = b''
+            while b'\r\n\r\n' not in request:
+                request += self._read( connection, 1 )
+            key = [ line.split( b':', 1 )[1].strip() for line in request.split( b'\r\n' ) if line.lower().startswith( b'sec-websocket-key' ) ][0]
+            accept = base64.b64encode( hashlib.sha1( key + b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11' ).digest() )
+            connection.sendall( b'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Accept: ' + accept + b'\r\n\r\n' )
+            while True:
+                first, second = self._read( connection, 2 )
+                length = second & 0x7f
+                if length == 126:
+                    length = int.from_bytes( self._read( connection, 2 ), 'big' )
+                elif length == 127:
+                    length = int.from_bytes( self._read( connection, 8 ), 'big' )
+                mask = self._read( connection, 4 )
+                payload = bytes( byte ^ mask[ index % 4 ] for index, byte in enumerate( self._read( connection, length ) ) )
+                if first & 0x0f == 8:
+                    return
+                message = json.loads( payload )
+                self.requests += 1
+                time.sleep( self.delay )
+                if message['method'] == 'chain_getBlockHash':
+                    result = '0xhash{}'.format( message['params'][0] )
+                else:
+                    result = { 'system_health': { 'peers': 1 }, 'system_properties': { 'ss58Format': 42 } }[ message['method'] ]
+                response = json.dumps( { 'jsonrpc': '2.0', 'result': result, 'id': message['id'] } ).encode()
+                header = bytes( [ 0x81, len( response ) ] ) if len( response ) < 126 else bytes( [ 0x81, 126 ] ) + len( response ).to_bytes( 2, 'big' )
+                connection.sendall( header + response )
+        except ( ConnectionError, OSError ):
+            pass
+        finally:
+            connection.close()
+
+    def stop( self ):
+        # Shutting down wakes the accepting thread, closing alone does not.
+        self.listener.shutdown( socket.SHUT_RDWR )
+        self.listener.close()
+        for connection in self.connections:
+            try:
+                connection.shutdown( socket.SHUT_RDWR )
+            except OSError:
+                pass
+
+class _RpcClient():
+    r""" Json rpc websocket client with the substrate calls the pool test makes.
+    """
+    def __init__( self, url ):
+        self.websocket = websocket.create_connection( url )
+        self.request_id = 0
+    def rpc_request( self, method, params ):
+        self.request_id += 1
+        self.websocket.send( json.dumps( { 'jsonrpc': '2.0', 'method': method, 'params': params, 'id': self.request_id } ) )
+        return json.loads( self.websocket.recv() )
+    def get_block_hash( self, block ):
+        return self.rpc_request( 'chain_getBlockHash', [ block ] )['result']
+    def close( self ):
+        self.websocket.close()
+
+def test_substrate_pool():
+    connection_pool_impl = bittensor._subtensor.connection_pool_impl
+    fast, slow = _MockChainServer(), _MockChainServer( delay = 0.05 )
+    pool = connection_pool_impl.SubstratePool( [ slow.url, fast.url ], size = 2, health_interval = 0, connect = _RpcClient )
+    assert pool.check() == 2
+    latency = { endpoint['url']: endpoint['latency'] for endpoint in pool.stats() }
+    assert latency[ slow.url ] > latency[ fast.url ]
+
+    # Queries reuse the persistent connection of the fastest endpoint, nested checkouts share it.
+    requests = slow.requests
+    with pool as substrate:
+        with pool as nested:
+            assert nested is substrate
+        assert substrate.get_block_hash( 1 ) == '0xhash1'
+    assert pool.get_block_hash( 2 ) == '0xhash2'
+    assert slow.requests == requests and len( fast.connections ) == 1
+    assert pool.url == fast.url
+
+    # A failed endpoint is skipped on the retry.
+    fast.stop()
+    with pytest.raises( connection_pool_impl.CONNECTION_ERRORS ):
+        pool.get_block_hash( 3 )
+    assert pool.get_block_hash( 3 ) == '0xhash3' and slow.requests == requests + 1
+    stats = { endpoint['url']: endpoint for endpoint in pool.stats() }
+    assert stats[ fast.url ]['failures'] == 1 and not stats[ fast.url ]['healthy'] and stats[ fast.url ]['connections'] == 0
+    subtensor = bittensor._subtensor.subtensor_impl.Subtensor( substrate = pool, network = 'mock', chain_endpoint = 'mock' )
+    assert subtensor.connect( failure = False )
+    pool.close()
+    slow.stop()
+
+    # Reconnects beyond the budget fail without connecting.
+    dead = connection_pool_impl.SubstratePool( [ fast.url ], size = 1, health_interval = 0, max_reconnects = 1, connect = _RpcClient )
+    with pytest.raises( ConnectionError, match = 'could be connected' ):
+        dead.get_block_hash( 1 )
+    with pytest.raises( ConnectionError, match = 'budget' ):
+        dead.get_block_hash( 1 )
+
+def _mock_wallet():
+    keypair = Keypair.create_from_mnemonic( Keypair.generate_mnemonic() )
+    coldkeypair = Keypair.create_from_mnemonic( Keypair.generate_mnemonic() )
+    return SimpleNamespace( hotkey = keypair, coldkeypub = coldkeypair )
+
+def test_mock_subtensor():
+    from bittensor._subtensor.subtensor_mock_impl import MockSubtensor
+
+    # Equal seeds give equal networks.
+    first = MockSubtensor( n = 64, seed = 7 ).neurons()
+    second = MockSubtensor( n = 64, seed = 7 ).neurons()
+    other = MockSubtensor( n = 64, seed = 8 ).neurons()
+    for field in ( 'stake', 'incentive', 'port', 'hotkey', 'weights' ):
+        assert getattr( first, field ).tolist() == getattr( second, field ).tolist()
+    assert first.hotkey.tolist() != other.hotkey.tolist()
+    assert abs( first.incentive.sum() - 1 ) < 1e-6
+
+    # A 10k neuron network builds and syncs into a metagraph.
+    start = time.time()
+    subtensor = MockSubtensor( n = 10000, seed = 0, weights_per_uid = 16, serving_fraction = 0.5 )
+    metagraph = bittensor.metagraph( subtensor = subtensor ).sync()
+    assert metagraph.n.item() == 10000
+    assert time.time() - start < 60
+    assert 0.4 < ( metagraph.endpoints.port.data > 0 ).float().mean().item() < 0.6
+    assert metagraph.hotkeys[5] == subtensor.neuron_for_uid( 5 ).hotkey
+
+    # Extrinsics apply to the state, blocks only advance when waited for.
+    subtensor = MockSubtensor( n = 8, seed = 0, difficulty = 1000 )
+    wallet = _mock_wallet()
+    assert subtensor.difficulty == 1000
+    assert subtensor.get_current_block() == 0
+    assert subtensor.wait_for_block( 3 ) == 3 and subtensor.get_current_block() == 3
+    assert subtensor.neuron_for_pubkey( wallet.hotkey.ss58_address ).is_null
+    assert subtensor.register( wallet )
+    uid = subtensor.get_uid_for_hotkey( wallet.hotkey.ss58_address )
+    assert uid == 8 and subtensor.n == 9 and len( subtensor.neurons() ) == 9
+    assert subtensor.serve( wallet, ip = '8.8.8.8', port = 8091, modality = 0 )
+    neuron = subtensor.neuron_for_uid( uid )
+    assert neuron.port == 8091 and bittensor.utils.networking.int_to_ip( neuron.ip ) == '8.8.8.8'
+    assert subtensor.set_weights( wallet, uids = [ 0, 1 ], weights = [ 0.5, 0.5 ] )
+    neuron = subtensor.neuron_for_uid( uid )
+    assert [ dest for dest, _ in neuron.weights ] == [ 0, 1 ] and neuron.last_update == 3
+
+    assert subtensor.get_balance( wallet.coldkeypub.ss58_address ).rao == 0
+    assert not subtensor.add_stake( wallet, amount = 1 )
+    source = subtensor.neuron_for_uid( 0 ).coldkey
+    balance = subtensor.get_balance( source )
+    source_wallet = SimpleNamespace( coldkeypub = SimpleNamespace( ss58_address = source ) )
+    assert subtensor.transfer( source_wallet, wallet.coldkeypub.ss58_address, amount = balance )
+    assert subtensor.get_balance( source ).rao == 0
+    total_stake = subtensor.total_stake
+    assert subtensor.add_stake( wallet, amount = 1 )
+    assert subtensor.neuron_for_uid( uid ).stake == 1
+    assert abs( subtensor.total_stake.tao - total_stake.tao - 1 ) < 1e-6
+    assert subtensor.unstake( wallet )
+    assert subtensor.neuron_for_uid( uid ).stake == 0
+    assert subtensor.get_balance( wallet.coldkeypub.ss58_address ) == balance
+
+    # The factory builds a mock network from the config.
+    config = bittensor.subtensor.config()
+    config.subtensor.mock.n = 16
+    subtensor = bittensor.subtensor( config = config, network = 'mock' )
+    assert isinstance( subtensor, MockSubtensor ) and subtensor.n == 16 and subtensor.connect()
@@ -0,0 +1,21 @@
+import torch
+from bittensor.utils.model_worker_pool import ModelWorkerPool
+
+def test_model_worker_pool():
+    model = torch.nn.Linear( 4, 2 )
+    pool = ModelWorkerPool( model, workers = 2, forward_method = 'forward', timeout = 60 ).start()
+    try:
+        inputs = torch.rand( 3, 4 )
+        outputs = pool.forward( inputs )
+        assert torch.allclose( outputs, model( inputs ).detach(), atol = 1e-6 )
+
+        # Worker gradients accumulate into the shared gradients of this process.
+        pool.backward( inputs, torch.ones( 3, 2 ) )
+        assert torch.allclose( model.bias.grad, torch.full( (2,), 3.0 ) )
+
+        # Updates made in this process are seen by the workers.
+        with torch.no_grad():
+            model.bias += 1
+        assert torch.allclose( pool.forward( inputs ), model( inputs ).detach(), atol = 1e-6 )
+    finally:
+        pool.stop()
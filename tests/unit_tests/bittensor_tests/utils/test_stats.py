@@ -0,0 +1,36 @@
+import bittensor.utils.stats as stat_utils
+
+def test_latency_histogram():
+    histogram = stat_utils.LatencyHistogram()
+    assert histogram.count() == 0
+    assert histogram.quantile(0.99) == 0.0
+    for _ in range(98):
+        histogram.observe( 0.003 )
+    histogram.observe( 0.2 )
+    histogram.observe( 100 )
+    assert histogram.count() == 100
+    assert histogram.quantile(0.5) == 0.005
+    assert histogram.quantile(0.99) == 0.25
+    assert histogram.quantile(1.0) == histogram.buckets[-1]
+    assert histogram.counts[-1] == 1
+    stats = histogram.to_dict()
+    assert stats['count'] == 100
+    assert abs( stats['mean'] - (98 * 0.003 + 0.2 + 100) / 100 ) < 1e-9
+
+def test_pubkey_stats_table():
+    table = stat_utils.PubkeyStatsTable( capacity = 2, n_codes = 24 )
+    for uid in range(5):
+        table.record( str(uid), call_time = 0.5, in_bytes = 100, out_bytes = 10, code = 1, now = 10.0 )
+    table.record( '0', call_time = 1.5, in_bytes = 300, out_bytes = 30, code = 2, now = 10.5 )
+    assert len(table) == 5
+    assert len(table.n_requested) == 8
+    assert table.index['4'] == 4
+    rows = table.rows()
+    assert rows['0']['n_requested'] == 2
+    assert rows['0']['n_success'] == 1
+    assert rows['0']['avg_inbytes'] == 200
+    assert rows['0']['avg_outbytes'] == 20
+    assert abs( rows['0']['query_time'] - (0.5 + 0.05 * 1.0) ) < 1e-9
+    assert abs( rows['0']['qps'] - 0.05 * 2 ) < 1e-9
+    assert rows['0']['codes'] == { 1: 1, 2: 1 }
+    assert rows['4'] == { 'n_requested': 1, 'n_success': 1, 'query_time': 0.5, 'avg_inbytes': 100, 'avg_outbytes': 10, 'qps': 0.0, 'codes': { 1: 1 } }
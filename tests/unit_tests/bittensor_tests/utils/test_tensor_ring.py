@@ -0,0 +1,16 @@
+import torch
+from bittensor.utils.tensor_ring import TensorRing
+
+def test_tensor_ring():
+    ring = TensorRing( slots = 1, slot_bytes = 1024 )
+    inputs = torch.rand(4, 8)
+    handle = ring.put( inputs )
+    assert handle[0] == 0
+    # No free slot left, the tensor is sent inline.
+    inline = ring.put( torch.ones(2), timeout = 0.01 )
+    assert inline[0] == None
+    assert torch.equal( ring.get( handle ), inputs )
+    assert torch.equal( ring.get( inline ), torch.ones(2) )
+    # Too large for a slot.
+    assert ring.put( torch.zeros(1000) )[0] == None
+    ring.close( unlink = True )